@@ -0,0 +1,84 @@
+"""
+渲染后元素树的内存测试：渲染约5万个节点的页面，统计渲染结果占用的内存和gc跟踪的对象数。
+同时把渲染结果转换为原来的Element(name, props, True)树（每个节点有__dict__），对比两种渲染树的内存
+
+    python benchmarks/memory.py
+"""
+import gc
+import time
+import tracemalloc
+
+from fryweb.element import Element
+from fryweb.page import Page
+
+
+def Row(index):
+    return Element('tr', {
+        'children': [
+            Element('td', {'class': 'px-2', 'children': [str(index)]}),
+            Element('td', {'children': [Element('a', {'href': f'/item/{index}', 'children': ['item']})]}),
+            Element('td', {'text-sm': True, 'children': ['text']}),
+        ]})
+
+
+def Table(rows):
+    return Element('table', {'children': [Element(Row, {'index': i}) for i in range(rows)]})
+
+
+def count(element):
+    n = 0
+    stack = [element]
+    while stack:
+        element = stack.pop()
+        n += 1
+        stack.extend(ch for ch in element.props.get('children', []) if hasattr(ch, 'props'))
+    return n
+
+
+def as_element(element):
+    """
+    把RenderedElement树转换为原来的渲染结果：rendered为True的Element树
+    """
+    if not hasattr(element, 'props'):
+        return element
+    props = dict(element.props)
+    if 'children' in props:
+        props['children'] = [as_element(ch) for ch in props['children']]
+    result = Element(element.name, props, True)
+    result.cid = element.cid
+    result.page = element.page
+    return result
+
+
+def measure(old):
+    gc.collect()
+    tracked = len(gc.get_objects())
+    tracemalloc.start()
+    begin = time.perf_counter()
+    element = Element(Table, {'rows': 10000}).render(Page())
+    end = time.perf_counter()
+    if old:
+        # 渲染中分配的字符串两种树共用，只替换节点和props
+        element = as_element(element)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracked = len(gc.get_objects()) - tracked
+    return element, end-begin, current, peak, tracked
+
+
+def main():
+    print(f"{'':17}{'Element':>14}{'RenderedElement':>18}")
+    _, _, old_current, _, old_tracked = measure(True)
+    element, elapsed, current, peak, tracked = measure(False)
+    nodes = count(element)
+    print(f"{'nodes:':17}{nodes:>14}{nodes:>18}")
+    print(f"{'retained memory:':17}{old_current/1024/1024:>12.2f}MB{current/1024/1024:>16.2f}MB")
+    print(f"{'bytes/node:':17}{old_current/nodes:>14.0f}{current/nodes:>18.0f}")
+    print(f"{'gc objects/node:':17}{old_tracked/nodes:>14.2f}{tracked/nodes:>18.2f}")
+    print(f"render:          {elapsed*1000:.2f}ms")
+    print(f"peak memory:     {peak/1024/1024:.2f}MB")
+
+
+if __name__ == '__main__':
+    main()
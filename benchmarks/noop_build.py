@@ -0,0 +1,72 @@
+"""
+没有文件变化时增量编译的时间：1000个fry文件，分别使用编译清单和不使用编译清单（读取源文件计算hash）
+
+    python benchmarks/noop_build.py [count]
+"""
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+root = Path(tempfile.mkdtemp())
+os.environ['FRYWEB_BUILD_ROOT'] = str(root / 'build')
+os.environ['FRYWEB_STATIC_ROOT'] = str(root / 'static')
+os.environ['FRYWEB_PUBLIC_ROOT'] = str(root / 'public')
+
+from fryweb.fry.generator import FryGenerator
+from fryweb.js.generator import JsGenerator
+
+
+source = '''\
+from fryweb import Element
+
+def Card{index}(title, count):
+    <template>
+      <div w-full text-sm>
+        <h2 font-bold>{{title}}</h2>
+        <p>{{count}} items</p>
+      </div>
+    </template>
+'''
+
+logger = logging.getLogger('benchmark')
+logger.setLevel(logging.WARNING)
+
+
+def build(clean):
+    begin = time.perf_counter()
+    FryGenerator(logger, [(str(root / 'src'), '**/*.fry')], clean=clean).generate()
+    return time.perf_counter() - begin
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    src = root / 'src' / 'app'
+    src.mkdir(parents=True)
+    for i in range(count):
+        (src / f'card{i}.fry').write_text(source.format(index=i), encoding='utf-8')
+    # 只比较编译本身，不调用esbuild打包
+    JsGenerator.bundle = lambda self: None
+    try:
+        cold = build(clean=True)
+        with_manifest = min(build(clean=False) for _ in range(3))
+        manifest = root / 'build' / '.frybuild.json'
+        without_manifest = []
+        for _ in range(3):
+            manifest.unlink(missing_ok=True)
+            without_manifest.append(build(clean=False))
+        without_manifest = min(without_manifest)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    print(f'{count} files')
+    print(f"{'build':>20} {'time':>10}")
+    print(f"{'clean':>20} {cold*1000:>8.1f}ms")
+    print(f"{'no-op (hash)':>20} {without_manifest*1000:>8.1f}ms")
+    print(f"{'no-op (manifest)':>20} {with_manifest*1000:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
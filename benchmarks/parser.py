@@ -0,0 +1,78 @@
+"""
+fry解析器测试：手写解析器与parsimonious的一致性、速度和内存
+
+    python benchmarks/parser.py [file.fry ...]
+
+1. 一致性：对tests下全部fry文件（或命令行指定的文件），比较两个解析器生成的语法树，
+   解析失败的文件比较错误信息；
+2. 速度和内存：把这些文件拼接成一个大文件，分别统计解析时间和tracemalloc峰值内存。
+"""
+import glob
+import sys
+import time
+import tracemalloc
+
+from fryweb.fry.grammar import grammar
+from fryweb.fry.parser import parse
+
+
+def try_parse(fn, source):
+    try:
+        return fn(source), None
+    except Exception as e:
+        return None, f'{type(e).__name__}: {e}'
+
+
+def conformance(files):
+    failed = 0
+    for path in files:
+        with open(path, 'r') as f:
+            source = f.read()
+        expected = try_parse(grammar.parse, source)
+        actual = try_parse(parse, source)
+        if expected != actual:
+            failed += 1
+            print(f'MISMATCH {path}')
+    print(f'conformance: {len(files)-failed}/{len(files)} files')
+    return failed == 0
+
+
+def measure(fn, source, repeat):
+    fn(source)
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        fn(source)
+    elapsed = (time.perf_counter() - begin) / repeat
+    tracemalloc.start()
+    fn(source)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    files = sys.argv[1:] or sorted(glob.glob('tests/**/*.fry', recursive=True))
+    if not files:
+        print('no fry files')
+        return
+    ok = conformance(files)
+
+    sources = []
+    for path in files:
+        with open(path, 'r') as f:
+            source = f.read()
+        if try_parse(grammar.parse, source)[1] is None:
+            sources.append(source)
+    # 多个合法fry文件以换行拼接后仍是合法的fry文件
+    large = '\n'.join(sources) * 20
+    print(f'large file: {len(large)} chars')
+    print(f"{'parser':>12} {'time':>10} {'peak memory':>14}")
+    for name, fn in (('parsimonious', grammar.parse), ('fryparser', parse)):
+        elapsed, peak = measure(fn, large, 3)
+        print(f'{name:>12} {elapsed*1000:>8.1f}ms {peak/1024/1024:>12.1f}MB')
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+渲染性能测试：组件嵌套深度和元素树大小增长时，渲染耗时应线性增长。
+
+    python benchmarks/render.py
+"""
+import time
+
+from fryweb.element import BaseElement, Element
+from fryweb.page import Page
+from fryweb.css.style import class_cache_stats
+
+
+def Item(index, children=None):
+    return Element('li', {
+        'call-client-script': ['bench_Item', [('index', index)]],
+        'text-sm': True,
+        'hover': 'bg-cyan-100 text-cyan-900',
+        'children': [
+            Element('span', {'*': Element.ClientEmbed(0), 'children': [str(index)]}),
+            children,
+        ]})
+
+
+def Nested(depth, width, children=None):
+    if depth == 0:
+        return Element('ul', {'children': [Element(Item, {'index': i}) for i in range(width)]})
+    return Element('div', {
+        'call-client-script': ['bench_Nested', []],
+        'p-2': True,
+        'children': [
+            Element('p', {'@click': Element.ClientEmbed(0), 'children': [f'level {depth}']}),
+            Element(Nested, {'depth': depth-1, 'width': width, 'children': children}),
+        ]})
+
+
+def count(element):
+    n = 1
+    for ch in element.props.get('children', []):
+        if isinstance(ch, BaseElement):
+            n += count(ch)
+    return n
+
+
+def bench(depth, width, repeat=5):
+    best = None
+    for _ in range(repeat):
+        page = Page()
+        element = Element(Nested, {'depth': depth, 'width': width})
+        begin = time.perf_counter()
+        element = element.render(page)
+        end = time.perf_counter()
+        if best is None or end - begin < best:
+            best = end - begin
+    nodes = count(element)
+    return nodes, best
+
+
+def main():
+    print(f"{'depth':>6} {'width':>6} {'nodes':>8} {'render':>10} {'per node':>10}")
+    for depth, width in [(10, 10), (50, 10), (100, 10), (200, 10),
+                         (10, 100), (10, 1000), (10, 5000)]:
+        nodes, seconds = bench(depth, width)
+        print(f"{depth:>6} {width:>6} {nodes:>8} {seconds*1000:>8.2f}ms {seconds/nodes*1e6:>8.2f}us")
+    stats = class_cache_stats()
+    print(f"class cache: hits={stats['hits']} misses={stats['misses']} hit_rate={stats['hit_rate']:.4f}")
+
+
+if __name__ == '__main__':
+    main()
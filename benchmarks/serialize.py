@@ -0,0 +1,101 @@
+"""
+元素树渲染和序列化为html文本的性能测试
+
+测试用的元素树都是编写页面时的Element树（html元素嵌套和组件嵌套），先render再序列化，
+baseline是改为显式栈之前的递归序列化（嵌套yield from），深度超过recursionlimit时
+抛出RecursionError。render和序列化都使用显式栈，不受元素树深度限制。
+
+    python benchmarks/serialize.py
+"""
+import sys
+import time
+
+from fryweb import Element, render
+from fryweb.element import BaseElement, children_attr_name
+
+
+def baseline_iter_html(element):
+    """
+    改为显式栈之前的序列化实现，每层元素嵌套一层生成器，每段html都要经过所有祖先生成器
+    """
+    if not element.rendered:
+        yield '<Element(not rendered)>'
+        return
+    children = element.props.get(children_attr_name, None)
+    attrs = element.html_attrs()
+    if children is None:
+        yield f'<{element.name}{attrs} />'
+    else:
+        yield f'<{element.name}{attrs}>'
+        for ch in children:
+            if isinstance(ch, BaseElement):
+                yield from baseline_iter_html(ch)
+            else:
+                yield str(ch)
+        yield f'</{element.name}>'
+
+
+def baseline_str(element):
+    return ''.join(baseline_iter_html(element))
+
+
+def wide(nodes):
+    items = [Element('li', {'class': 'item', 'children': [f'item {i}']})
+             for i in range(nodes-1)]
+    return Element('ul', {'children': items})
+
+
+def deep(depth):
+    element = Element('span', {'children': ['leaf']})
+    for i in range(depth-1):
+        element = Element('div', {'class': f'level-{i}', 'children': [element]})
+    return element
+
+
+def Level(depth):
+    if depth == 0:
+        return Element('span', {'children': ['leaf']})
+    return Element('div', {'class': f'level-{depth}', 'children': [Element(Level, {'depth': depth-1})]})
+
+
+def nested(depth):
+    return Element(Level, {'depth': depth-1})
+
+
+def bench(func, repeat=5):
+    best = None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = func()
+        end = time.perf_counter()
+        if best is None or end - begin < best:
+            best = end - begin
+    return result, best
+
+
+def main():
+    print(f"recursion limit: {sys.getrecursionlimit()}")
+    print(f"{'tree':>16} {'chars':>10} {'render':>12} {'baseline str':>14} {'str':>12} {'bytes':>12}")
+    trees = [('wide 10000', wide, 10000),
+             ('deep 500', deep, 500),
+             ('deep 1000', deep, 1000),
+             ('deep 10000', deep, 10000),
+             ('components 1000', nested, 1000),
+             ('components 10000', nested, 10000)]
+    for name, build, size in trees:
+        # render会修改组件元素的属性，每次都重新构造元素树
+        element, render_seconds = bench(lambda: render(build(size)))
+        try:
+            _, baseline_seconds = bench(lambda: baseline_str(element))
+            baseline = f'{baseline_seconds*1000:>12.2f}ms'
+        except RecursionError:
+            baseline = f"{'RecursionError':>14}"
+        text, seconds = bench(lambda: str(element))
+        assert baseline == f"{'RecursionError':>14}" or baseline_str(element) == text
+        _, bytes_seconds = bench(element.to_bytes)
+        print(f"{name:>16} {len(text):>10} {render_seconds*1000:>10.2f}ms {baseline} "
+              f"{seconds*1000:>10.2f}ms {bytes_seconds*1000:>10.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+页面外壳（文档头、尾部和脚本）每次请求的开销测试
+
+    python benchmarks/shell.py
+"""
+import time
+
+from fryweb.page import PageShell, page_shell, html_head, html_tail, hydrate_script, autoreload_script
+
+
+metas = {'description': 'fryweb benchmark', 'keywords': 'fryweb'}
+properties = {'og:title': 'fryweb', 'og:type': 'website'}
+
+
+def bench(fn, repeat=10000):
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    end = time.perf_counter()
+    return (end - begin) / repeat
+
+
+def main():
+    def rebuild():
+        # 每次请求重新生成文档头、尾部和脚本
+        hydrate_script()
+        autoreload_script()
+        return html_head('title', metas=metas, properties=properties) + html_tail
+
+    shell = PageShell(metas=metas, properties=properties)
+
+    def held_shell():
+        return shell.head('title') + shell.tail
+
+    def cached_shell():
+        shell = page_shell(metas=metas, properties=properties)
+        return shell.head('title') + shell.tail
+
+    assert rebuild() == cached_shell() == held_shell()
+    print(f"{'shell':>14} {'per request':>14}")
+    for name, fn in [('rebuild', rebuild), ('cached shell', cached_shell), ('held shell', held_shell)]:
+        print(f"{name:>14} {bench(fn)*1000000:>12.2f}us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+语法树遍历测试：py、js、css三个visitor分别遍历语法树与MultiVisitor一次遍历的时间对比
+
+    python benchmarks/visit.py [file.fry ...]
+"""
+import glob
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# js visitor准备阶段会在build_root下创建目录
+os.environ.setdefault('FRYWEB_BUILD_ROOT', tempfile.mkdtemp())
+
+from fryweb.fry.base import MultiVisitor
+from fryweb.fry.generator import PyGenerator
+from fryweb.fry.parser import parse
+from fryweb.js.generator import JsGenerator
+from fryweb.css.generator import CssGenerator
+
+
+logger = logging.getLogger('benchmark')
+logger.setLevel(logging.ERROR)
+
+
+def load(files):
+    trees = []
+    for path in files:
+        with open(path, 'r') as f:
+            source = f.read()
+        path = Path(path).resolve()
+        try:
+            tree = parse(source)
+            # 跳过故意写错的测试文件
+            generator = PyGenerator(logger)
+            generator.prepare('0', Path('.'), path.with_suffix('.py'))
+            generator.visit(tree)
+        except Exception:
+            continue
+        trees.append((path, tree))
+    return trees
+
+
+def main(repeat=20):
+    files = sys.argv[1:] or sorted(glob.glob('tests/**/*.fry', recursive=True))
+    trees = load(files)
+    if not trees:
+        print('no fry files')
+        return
+    py = PyGenerator(logger)
+    js = JsGenerator(logger)
+    css = CssGenerator(logger)
+
+    def prepare(path):
+        py.prepare('0', Path('.'), path.with_suffix('.py'))
+        js.prepare('0', path.parent, path)
+        return css.prepare()
+
+    stages = {'py': 0.0, 'js': 0.0, 'css': 0.0, 'combined': 0.0}
+    for _ in range(repeat):
+        for path, tree in trees:
+            cssvisitor = prepare(path)
+            begin = time.perf_counter()
+            separate = [py.visit(tree)]
+            end = time.perf_counter()
+            stages['py'] += end - begin
+            js.visit(tree)
+            begin, end = end, time.perf_counter()
+            stages['js'] += end - begin
+            cssvisitor.visit(tree)
+            begin, end = end, time.perf_counter()
+            stages['css'] += end - begin
+
+            cssvisitor = prepare(path)
+            begin = time.perf_counter()
+            combined = MultiVisitor([py, js, cssvisitor]).visit(tree)
+            stages['combined'] += time.perf_counter() - begin
+            assert combined[0] == separate[0]
+
+    separate = stages['py'] + stages['js'] + stages['css']
+    print(f'{len(trees)} files x {repeat}')
+    print(f"{'stage':>10} {'per file':>12}")
+    for name in ('py', 'js', 'css'):
+        print(f'{name:>10} {stages[name]/repeat/len(trees)*1000:>10.3f}ms')
+    print(f"{'separate':>10} {separate/repeat/len(trees)*1000:>10.3f}ms")
+    print(f"{'combined':>10} {stages['combined']/repeat/len(trees)*1000:>10.3f}ms")
+    print(f"speedup: {separate/stages['combined']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
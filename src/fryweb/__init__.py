@@ -1,2 +1,5 @@
-from .element import Element
-from .page import html, render
+from .element import Element, Stream, Suspense
+from .page import PageShell, page_shell, html, html_stream, html_bytes, render, render_many, render_bytes, ahtml, ahtml_stream, arender
+from .cache import FragmentCache, fragment_cache, ResponseCache, response_cache
+from .registry import ComponentRegistry, registry
+from .profile import Profiler, profile
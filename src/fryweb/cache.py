@@ -0,0 +1,435 @@
+"""
+组件片段缓存
+
+组件的渲染结果中带有页面内的组件实例ID（data-fryid、data-fryref、data-fryembed、
+data-frytid以及页面上的组件信息），缓存时将这些ID保存为相对于组件渲染前页面上
+组件实例数量的偏移，再次使用时按当前页面的组件实例数量重新编号。
+
+用法：
+
+    from fryweb.cache import fragment_cache
+
+    @fragment_cache.cached
+    def NavMenu(active):
+        ...
+
+组件渲染结果只应由组件参数决定，参数需要是可hash的值。参数中有元素、
+js嵌入值或者不可hash的值时不使用缓存。
+
+远程组件响应缓存：
+
+    from fryweb.cache import response_cache
+
+    @response_cache.cached(max_age=60, ttl=300)
+    def Weather(city):
+        ...
+
+views.component对这样的组件返回ETag和Cache-Control，处理If-None-Match条件请求，
+并在服务端按ttl秒缓存响应内容。
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+import types
+
+from fryweb.element import (
+    BaseElement, RenderedElement, Stream, ClientEmbed, ClientRef, html_attr,
+    component_id_attr_name, client_embed_attr_name, client_ref_attr_name,
+    component_template_id_atttr_name, children_attr_name, suspense_attr_name,
+)
+
+
+class Uncacheable(Exception):
+    pass
+
+
+def relative(cid, base, count):
+    rel = int(cid) - base
+    if rel < 1 or rel > count:
+        # 引用了组件之外的组件实例，不能缓存
+        raise Uncacheable
+    return rel
+
+
+def relative_value(k, v, base, count):
+    """
+    将属性值中的组件实例ID转换为相对ID
+    """
+    if k == component_id_attr_name:
+        return [relative(cid, base, count) for cid in v.split()]
+    elif k == component_template_id_atttr_name:
+        return relative(v, base, count)
+    elif k == client_embed_attr_name:
+        return [(relative(e.component, base, count), e.embed_id) for e in v]
+    elif k == client_ref_attr_name:
+        return [(r.name, relative(r.component, base, count)) for r in v]
+    return v
+
+
+def rebase_value(k, v, base):
+    """
+    将相对ID转换为当前页面中的组件实例ID
+    """
+    if k == component_id_attr_name:
+        return ' '.join(str(rel + base) for rel in v)
+    elif k == component_template_id_atttr_name:
+        return v + base
+    elif k == client_embed_attr_name:
+        embeds = []
+        for rel, embed_id in v:
+            embed = ClientEmbed(embed_id)
+            embed.component = rel + base
+            embeds.append(embed)
+        return embeds
+    elif k == client_ref_attr_name:
+        refs = []
+        for name, rel in v:
+            ref = ClientRef(name)
+            ref.component = rel + base
+            refs.append(ref)
+        return refs
+    return v
+
+
+relocatable_attrs = (component_id_attr_name, component_template_id_atttr_name,
+                     client_embed_attr_name, client_ref_attr_name)
+
+
+def attr_parts(k, v, parts):
+    """
+    相对ID以int加入parts，序列化时再加上组件实例ID
+    """
+    parts.append(f' {k}="')
+    if k == component_id_attr_name:
+        for i, rel in enumerate(v):
+            if i > 0:
+                parts.append(' ')
+            parts.append(rel)
+    elif k == component_template_id_atttr_name:
+        parts.append(v)
+    elif k == client_embed_attr_name:
+        for i, (rel, embed_id) in enumerate(v):
+            parts.append(' ' if i > 0 else '')
+            parts.append(rel)
+            parts.append(f'/{embed_id}')
+    elif k == client_ref_attr_name:
+        for i, (name, rel) in enumerate(v):
+            parts.append(f' {name}-' if i > 0 else f'{name}-')
+            parts.append(rel)
+    parts.append('"')
+
+
+def fragment_parts(children, base, count):
+    """
+    将渲染后的孩子列表序列化为字符串和相对ID组成的列表，遍历方式与iter_html相同
+    """
+    parts = []
+    stack = []
+    current = iter(children)
+    close = None
+    while True:
+        for ch in current:
+            if isinstance(ch, Stream):
+                # 流式孩子只能输出一次
+                raise Uncacheable
+            elif not isinstance(ch, BaseElement):
+                parts.append(str(ch))
+            elif not ch.rendered:
+                parts.append('<Element(not rendered)>')
+            elif suspense_attr_name in ch.props:
+                # 延迟渲染边界的内容不在组件渲染结果中
+                raise Uncacheable
+            else:
+                parts.append(f'<{ch.name}')
+                for k, v in ch.props.items():
+                    if k == children_attr_name:
+                        continue
+                    if k in relocatable_attrs:
+                        attr_parts(k, relative_value(k, v, base, count), parts)
+                    else:
+                        attr = html_attr(k, v)
+                        if attr:
+                            parts.append(' ' + attr)
+                chs = ch.props.get(children_attr_name, None)
+                if chs is None:
+                    parts.append(' />')
+                else:
+                    parts.append('>')
+                    stack.append((current, close))
+                    current = iter(chs)
+                    close = f'</{ch.name}>'
+                    break
+        else:
+            if close is not None:
+                parts.append(close)
+            if not stack:
+                break
+            current, close = stack.pop()
+    # 合并相邻的字符串
+    merged = []
+    for part in parts:
+        if merged and isinstance(part, str) and isinstance(merged[-1], str):
+            merged[-1] += part
+        else:
+            merged.append(part)
+    return merged
+
+
+class Fragment(object):
+    """
+    缓存的组件渲染结果，组件实例ID都是相对于渲染前页面上组件实例数量base的偏移
+    """
+    def __init__(self, page, base, element, cnumber):
+        count = len(page.components) - base
+        # 组件自身是否有实例编号，有时为base+1
+        self.registered = cnumber != 0
+        self.name = element.name
+        self.props = {}
+        for k, v in element.props.items():
+            if k == children_attr_name:
+                v = fragment_parts(v, base, count)
+            else:
+                v = relative_value(k, v, base, count)
+            self.props[k] = v
+        # 组件自身和子孙组件的组件信息和引用关系
+        self.components = []
+        for cid in range(base + 1, base + count + 1):
+            c = dict(page.components[cid])
+            c.pop('cid', None)
+            c['refs'] = self.relative_refs(c['refs'], base, count)
+            childrefs = {name: set(relative(i, base, count) for i in ids)
+                         for name, ids in page.cid2childrefs.get(cid, {}).items()}
+            self.components.append((c, childrefs))
+        self.hasjs = any('setup' in c for c, _ in self.components)
+
+    def relative_refs(self, refs, base, count):
+        result = {}
+        for name, ids in refs.items():
+            if isinstance(ids, list):
+                result[name] = [relative(i, base, count) for i in ids]
+            else:
+                result[name] = relative(ids, base, count)
+        return result
+
+    def rebase_refs(self, refs, base):
+        result = {}
+        for name, ids in refs.items():
+            if isinstance(ids, list):
+                result[name] = [i + base for i in ids]
+            else:
+                result[name] = ids + base
+        return result
+
+    def apply(self, page, base, component):
+        """
+        将缓存的渲染结果放到页面中，返回渲染后的组件根元素和组件实例编号。
+        component不为None时，组件已经分配了实例编号base+1
+        """
+        for i, (c, childrefs) in enumerate(self.components):
+            c = dict(c)
+            c['refs'] = self.rebase_refs(c['refs'], base)
+            cid = base + 1 + i
+            if i == 0 and component is not None:
+                component.update(c)
+            else:
+                page.add_component(c)
+            page.cid2childrefs[cid] = {name: set(rel + base for rel in ids)
+                                       for name, ids in childrefs.items()}
+        if self.hasjs:
+            page.hasjs = True
+        props = {}
+        for k, v in self.props.items():
+            if k == children_attr_name:
+                v = [''.join([p if p.__class__ is str else str(p + base) for p in v])]
+            else:
+                v = rebase_value(k, v, base)
+            props[k] = v
+        element = RenderedElement(self.name, props)
+        element.page = page
+        return element, base + 1 if self.registered else 0
+
+
+class FragmentCache(object):
+    """
+    组件片段缓存，按组件和组件参数缓存渲染结果，超过maxsize时淘汰最久未使用的
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.fragments = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, fn):
+        """
+        装饰器，标记组件函数使用本缓存
+        """
+        fn.fry_cache = self
+        return fn
+
+    def key(self, fn, props, registered=False):
+        """
+        返回组件参数对应的缓存key，不能缓存时返回None。
+        registered表示组件在执行前已分配实例编号（被父组件引用或是组件模板）
+        """
+        for v in props.values():
+            if isinstance(v, (BaseElement, Stream, ClientEmbed, ClientRef, list, dict, set, types.GeneratorType)):
+                return None
+        try:
+            key = (fn, registered, frozenset(props.items()))
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def get(self, key, page, base, component):
+        with self.lock:
+            fragment = self.fragments.get(key)
+            if fragment is None:
+                self.misses += 1
+                return None
+            self.fragments.move_to_end(key)
+            self.hits += 1
+        return fragment.apply(page, base, component)
+
+    def put(self, key, page, base, element, cnumber):
+        try:
+            fragment = Fragment(page, base, element, cnumber)
+        except Uncacheable:
+            return
+        with self.lock:
+            self.fragments[key] = fragment
+            self.fragments.move_to_end(key)
+            while len(self.fragments) > self.maxsize:
+                self.fragments.popitem(last=False)
+
+    def invalidate(self, fn=None, **props):
+        """
+        清除缓存：
+        * 不带参数时清除全部缓存；
+        * 只指定组件函数时清除该组件的全部缓存；
+        * 同时指定组件参数时只清除对应的一项缓存。
+        """
+        with self.lock:
+            if fn is None:
+                self.fragments.clear()
+            elif props:
+                for registered in (False, True):
+                    key = self.key(fn, props, registered)
+                    if key is not None:
+                        self.fragments.pop(key, None)
+            else:
+                for key in [key for key in self.fragments if key[0] is fn]:
+                    del self.fragments[key]
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self.fragments),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+# 默认的组件片段缓存
+fragment_cache = FragmentCache()
+
+
+def strong_etag(body):
+    """
+    根据响应内容生成强ETag
+    """
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+class ResponseCache(object):
+    """
+    远程组件响应缓存，按组件和组件参数缓存序列化后的响应内容及其ETag，
+    每项缓存ttl秒后过期，超过maxsize时淘汰最久未使用的
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.responses = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, max_age=60, ttl=60, public=True):
+        """
+        装饰器，标记组件函数的远程响应可以缓存：
+        * max_age: 浏览器和CDN可以缓存的秒数（Cache-Control: max-age）；
+        * ttl: 服务端缓存响应内容的秒数，为0时每次都重新渲染，只做ETag比较；
+        * public: 为False时只允许浏览器缓存（Cache-Control: private）。
+        """
+        def decorator(fn):
+            fn.fry_response_cache = (self, max_age, ttl, public)
+            return fn
+        return decorator
+
+    def key(self, fn, args):
+        try:
+            return (fn, json.dumps(args, sort_keys=True))
+        except (TypeError, ValueError):
+            return None
+
+    def get(self, key):
+        """
+        返回缓存的(etag, body)，没有或已过期时返回None
+        """
+        with self.lock:
+            item = self.responses.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self.responses[key]
+                self.misses += 1
+                return None
+            self.responses.move_to_end(key)
+            self.hits += 1
+            return item[1], item[2]
+
+    def put(self, key, body, ttl):
+        """
+        缓存响应内容，返回其ETag
+        """
+        etag = strong_etag(body)
+        if key is None or ttl <= 0:
+            return etag
+        with self.lock:
+            self.responses[key] = (time.monotonic() + ttl, etag, body)
+            self.responses.move_to_end(key)
+            while len(self.responses) > self.maxsize:
+                self.responses.popitem(last=False)
+        return etag
+
+    def invalidate(self, fn=None, **args):
+        """
+        清除缓存，参数含义与FragmentCache.invalidate相同
+        """
+        with self.lock:
+            if fn is None:
+                self.responses.clear()
+            elif args:
+                self.responses.pop(self.key(fn, args), None)
+            else:
+                for key in [key for key in self.responses if key[0] is fn]:
+                    del self.responses[key]
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self.responses),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+
+# 默认的远程组件响应缓存
+response_cache = ResponseCache()
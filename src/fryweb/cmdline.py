@@ -197,11 +197,12 @@ def run_builder_loop(should_exit_event, build_finished_event):
 class WithStaticFiles:
     def __init__(self, app):
         self.app = app
-        self.staticfiles_app = StaticFiles(directory=fryconfig.static_root)
+        self.staticfiles_app = StaticFiles(directory=fryconfig.snapshot().static_root)
 
     async def __call__(self, scope, receive, send):
-        if 'path' in scope and scope['path'].startswith(fryconfig.static_url):
-            scope['root_path'] = fryconfig.static_url.rstrip('/')
+        static_url = fryconfig.snapshot().static_url
+        if 'path' in scope and scope['path'].startswith(static_url):
+            scope['root_path'] = static_url.rstrip('/')
             await self.staticfiles_app(scope, receive, send)
         else:
             await self.app(scope, receive, send)
@@ -220,12 +221,24 @@ def cli():
 
 
 @click.command()
+@click.option("--hoist-static", is_flag=True, default=False, help="Pre-render fully static html subtrees into string constants.")
+@click.option("--jobs", "-j", default=1, help="Number of processes compiling .fry files, 0 for cpu count.")
+@click.option("--build-cache", default=None, help="Directory of the persistent build cache, overrides FRYWEB_BUILD_CACHE.")
+@click.option("--parser", type=click.Choice(['fry', 'parsimonious']), default=None, help="Parser of .fry files, overrides FRYWEB_PARSER.")
 @click.argument("app_spec", default='', required=False)
-def build(app_spec):
+def build(hoist_static, jobs, build_cache, parser, app_spec):
     Config(app='')
+    if hoist_static:
+        os.environ['FRYWEB_HOIST_STATIC'] = '1'
+    if build_cache is not None:
+        os.environ['FRYWEB_BUILD_CACHE'] = build_cache
+    if parser is not None:
+        os.environ['FRYWEB_PARSER'] = parser
+    if hoist_static or build_cache is not None or parser is not None:
+        fryconfig.reload()
     fryconfig.set_app_spec(app_spec)
     fryconfig.add_app_syspaths()
-    generator = FryGenerator(logger)
+    generator = FryGenerator(logger, jobs=jobs)
     generator.generate()
 
 
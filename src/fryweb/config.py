@@ -44,9 +44,48 @@ def is_wsgi_app(app):
         pass
     return False
 
+class ConfigSnapshot():
+    """
+    配置快照：创建时读取全部配置并解析好路径，之后作为普通属性读取，不再访问环境变量。
+    快照只读，环境变量改变后调用fryconfig.reload()生成新的快照
+    """
+    names = ('js_url', 'css_url', 'check_reload_url', 'debug', 'static_root',
+             'public_root', 'build_root', 'semantic_theme', 'plugins',
+             'hoist_static', 'compact_payload', 'static_url', 'js_file',
+             'css_file', 'build_cache', 'build_cache_size', 'parser', 'version')
+    __slots__ = names
+
+    def __init__(self, config):
+        for name in self.names:
+            object.__setattr__(self, name, getattr(config, name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Config snapshot is read-only, can't set '{name}'")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Config snapshot is read-only, can't delete '{name}'")
+
+
 class FryConfig():
     def __init__(self):
         self.app_spec = ''
+        self._snapshot = None
+
+    def snapshot(self):
+        """
+        返回当前配置快照，热点代码（每次请求、每个文件）从快照读取配置
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.reload()
+        return snapshot
+
+    def reload(self):
+        """
+        重新读取环境变量，生成新的配置快照
+        """
+        self._snapshot = ConfigSnapshot(self)
+        return self._snapshot
 
     def set_app_spec(self, app_spec=''):
         """
@@ -178,6 +217,26 @@ class FryConfig():
     def plugins(self):
         return self.item('FRYWEB_PLUGINS', [])
 
+    @property
+    def hoist_static(self):
+        """
+        编译时是否将完全静态的html子树预先渲染为html字符串常量
+        """
+        value = self.item('FRYWEB_HOIST_STATIC', False)
+        if isinstance(value, str):
+            return value.lower() not in ('', '0', 'false', 'no', 'off')
+        return value
+
+    @property
+    def compact_payload(self):
+        """
+        是否将页面上所有组件的水合数据合并为一个json脚本输出，没有js的组件不输出
+        """
+        value = self.item('FRYWEB_COMPACT_PAYLOAD', False)
+        if isinstance(value, str):
+            return value.lower() not in ('', '0', 'false', 'no', 'off')
+        return value
+
     @property
     def static_url(self):
         """
@@ -193,6 +252,32 @@ class FryConfig():
     def css_file(self):
         return self.static_root / self.css_url
 
+    @property
+    def build_cache(self):
+        """
+        持久编译缓存目录，保存各fry文件编译生成的py、js和attr文件，全量编译时不清空。
+        没有设置时不使用编译缓存
+        """
+        value = self.item('FRYWEB_BUILD_CACHE', '')
+        if not value:
+            return None
+        return Path(value).resolve()
+
+    @property
+    def build_cache_size(self):
+        """
+        编译缓存的最大字节数，超出时删除最久没有使用的缓存项，环境变量以MB为单位
+        """
+        return int(self.item('FRYWEB_BUILD_CACHE_SIZE', 256)) * 1024 * 1024
+
+    @property
+    def parser(self):
+        """
+        fry源码解析器：fry为手写解析器（默认），parsimonious为按fry.ppeg解析的原实现，
+        两者生成的语法树相同，手写解析器出现问题时可以切换回parsimonious
+        """
+        return self.item('FRYWEB_PARSER', 'fry')
+
     @property
     def version(self):
         return '0.3.4'
@@ -1 +1,2 @@
 from .utilities import random_color
+from .style import class_cache_stats
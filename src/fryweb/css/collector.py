@@ -5,7 +5,7 @@ import time
 import re
 
 from fryweb.fileiter import FileIter
-from fryweb.fry.grammar import grammar
+from fryweb.fry.parser import parse
 from fryweb.spec import is_valid_html_attribute
 from fryweb.element import class_attr_name
 
@@ -203,7 +203,7 @@ class CssVisitor(NodeVisitor):
 class ParserCollector(BaseCollector):
     def collect_from_content(self, data):
         begin = time.perf_counter()
-        tree = grammar.parse(data)
+        tree = parse(data)
         end = time.perf_counter()
         print(f"css parse: {end-begin}")
         begin = end
@@ -215,10 +215,18 @@ class ParserCollector(BaseCollector):
 
 class FryCollector:
     def collect_attrs(self, tree, hash, attrfile):
+        self.prepare().visit(tree)
+        self.write(hash, attrfile)
+
+    def prepare(self):
+        """
+        开始收集一个文件，返回遍历语法树的CssVisitor
+        """
         self.attrs = defaultdict(set)
         self.classes = set()
-        visitor = CssVisitor(self.collect_kv)
-        visitor.visit(tree)
+        return CssVisitor(self.collect_kv)
+
+    def write(self, hash, attrfile):
         with attrfile.open('w', encoding='utf-8') as f:
             f.write(f'# fry {hash}\n')
             for k, v in self.all_attrs():
@@ -1830,7 +1830,7 @@ default_theme = {
 suffixes  = ['-bg',  '-bgx',  '-el',  '-elx',  '-elxx',  '-bd',  '-bdx',  '-bdxx',  '',  'x',  '-t',  '-tx']
 asuffixes = ['-bga', '-bgax', '-ela', '-elax', '-elaxx', '-bda', '-bdax', '-bdaxx', 'a', 'ax', '-ta', '-tax']
 def theme_color_styles():
-    theme = fryconfig.semantic_theme or default_theme
+    theme = fryconfig.snapshot().semantic_theme or default_theme
     gray, colored = check_theme(theme)
     common_style = {}
     light_style = {
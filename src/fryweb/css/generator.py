@@ -14,9 +14,15 @@ class CssGenerator():
 
     def collect(self, tree, hash, attrfile):
         self.collector.collect_attrs(tree, hash, attrfile)
+
+    def prepare(self):
+        return self.collector.prepare()
+
+    def write(self, hash, attrfile):
+        self.collector.write(hash, attrfile)
     
     def all_attrs(self):
-        for file in fryconfig.build_root.rglob('*.attr'):
+        for file in fryconfig.snapshot().build_root.rglob('*.attr'):
             with file.open('r', encoding='utf-8') as f:
                 for line in f:
                     line = line.strip();
@@ -26,21 +32,21 @@ class CssGenerator():
                     yield k, v
 
     def generate(self):
-        fryconfig.css_file.parent.mkdir(parents=True, exist_ok=True)
+        fryconfig.snapshot().css_file.parent.mkdir(parents=True, exist_ok=True)
         preflight = os.path.join(os.path.dirname(__file__), 'preflight.css')
         preflight = Path(preflight)
-        with fryconfig.css_file.open('w', encoding='utf-8') as f:
+        with fryconfig.snapshot().css_file.open('w', encoding='utf-8') as f:
             with preflight.open('r', encoding='utf-8') as pf:
                 f.write(pf.read())
             f.write(theme_color_styles())
             from fryweb.css.plugin import plugin_basecss
             basecss = plugin_basecss()
             f.write(basecss)
-            preflight = fryconfig.public_root / 'preflight.css'
+            preflight = fryconfig.snapshot().public_root / 'preflight.css'
             if preflight.is_file():
                 with preflight.open('r', encoding='utf-8') as pf:
                     f.write(pf.read())
-            preflight = fryconfig.public_root / 'css/preflight.css'
+            preflight = fryconfig.snapshot().public_root / 'css/preflight.css'
             if preflight.is_file():
                 with preflight.open('r', encoding='utf-8') as pf:
                     f.write(pf.read())
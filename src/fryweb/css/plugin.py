@@ -12,7 +12,7 @@ dynamic_utilities = {}
 semantic_colors = {}
 
 def load_plugins():
-    for pid, plugin in enumerate(fryconfig.plugins):
+    for pid, plugin in enumerate(fryconfig.snapshot().plugins):
         module = import_module(plugin)
         if module:
             load_plugin(pid, module)
@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 from .modifiers import is_modifier, add_modifier
 from .utilities import Utility
@@ -240,3 +241,37 @@ class CSS():
 
     def text(self):
         return '\n'.join(self.lines()) + '\n\n'
+
+
+# 运行时属性值到class名的转换结果只和(key, value)有关，进程内缓存起来，
+# 避免每次渲染都构造CSS对象并做utility解析
+CLASS_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=CLASS_CACHE_SIZE)
+def utility_class(key, value):
+    """
+    返回utility属性key=value对应的class名
+    """
+    return CSS(key, value).to_class()
+
+
+def class_cache_stats():
+    """
+    返回utility_class缓存的命中统计
+    """
+    info = utility_class.cache_info()
+    total = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'maxsize': info.maxsize,
+        'hit_rate': info.hits / total if total else 0.0,
+    }
+
+
+def clear_class_cache():
+    """
+    清空utility_class缓存
+    """
+    utility_class.cache_clear()
@@ -1,8 +1,11 @@
 from fryweb.utils import component_name
 from fryweb.config import fryconfig
 from fryweb.spec import is_valid_html_attribute
-from fryweb.css.style import CSS
+from fryweb.css.style import CSS, utility_class
+from fryweb.profile import phase
 import types
+import inspect
+import asyncio
 
 def escape(s):
     return s.replace('"', '\\"')
@@ -12,17 +15,120 @@ class RenderException(Exception):
     pass
 
 
-def render_children(children, page):
+def html_attr(k, v):
+    """
+    返回单个属性的html文本，不需要输出的属性返回空字符串
+    """
+    if isinstance(v, dict):
+        values = []
+        for k1, v1 in v.items():
+            values.append(f"{k1}: {v1};")
+        value = ' '.join(values)
+    elif isinstance(v, (list, tuple, types.GeneratorType)):
+        value = ' '.join(str(x) for x in v)
+    elif v is True:
+        value = ''
+    elif v is False:
+        return ''
+    else:
+        value = str(v)
+    if value:
+        return f'{k}="{escape(value)}"'
+    else:
+        return k
+
+
+def render_children(children, page, owner):
     chs = []
     for ch in children:
-        if isinstance(ch, list): #tuple和GeneratorType都已在Element.render第四步转化为list
-            chs += render_children(ch, page)
+        # tuple和GeneratorType在这里直接展开，Generator只被遍历这一次
+        if isinstance(ch, (list, tuple, types.GeneratorType)):
+            chs += render_children(ch, page, owner)
         elif isinstance(ch, Element):
-            chs.append(ch.render(page))
+            chs.append(ch.render(page, owner))
+        elif isinstance(ch, Stream):
+            # 流式孩子不在这里展开，只记录渲染上下文，序列化时再逐个渲染
+            chs.append(ch.bind(page, owner))
+        elif isinstance(ch, Suspense):
+            chs += ch.bind(page, owner)
         else:
             chs.append(ch)
     return chs
 
+def iter_rendered(children, page, owner):
+    """
+    render_children的惰性版本，每次渲染并返回一个孩子
+    """
+    for ch in children:
+        if isinstance(ch, (list, tuple, types.GeneratorType)):
+            yield from iter_rendered(ch, page, owner)
+        elif isinstance(ch, Element):
+            yield ch.render(page, owner)
+        elif isinstance(ch, Stream):
+            yield ch.bind(page, owner)
+        elif isinstance(ch, Suspense):
+            yield from ch.bind(page, owner)
+        else:
+            yield ch
+
+def own_value(value, owner):
+    """
+    将父组件传给子组件的属性值中的元素标记为属于父组件，
+    同时将tuple和Generator转化为list（Generator必须在父组件上下文中遍历）
+    """
+    if isinstance(value, (Element, Stream, Suspense)):
+        if value.owner == 0:
+            value.owner = owner
+        return value
+    elif isinstance(value, (list, tuple, types.GeneratorType)):
+        return [own_value(v, owner) for v in value]
+    else:
+        return value
+
+def expand_value(value):
+    """
+    将属性值中的tuple和Generator转化为list，Generator只被遍历这一次
+    """
+    if isinstance(value, (list, tuple, types.GeneratorType)):
+        return [expand_value(v) for v in value]
+    return value
+
+def iter_elements(value, defer=False):
+    """
+    遍历属性值中的元素，defer为True时不进入延迟渲染边界的content
+    """
+    if isinstance(value, Element):
+        yield value
+    elif isinstance(value, list):
+        for v in value:
+            yield from iter_elements(v, defer)
+    elif isinstance(value, Suspense):
+        yield from iter_elements(value.fallback, defer)
+        if not defer:
+            yield from iter_elements(value.content, defer)
+
+async def resolve_tree(element, defer=False):
+    """
+    异步渲染的第一阶段：执行元素树中的所有组件函数（包括async def组件），
+    结果保存到组件元素上。元素树中同一轮可执行的组件（兄弟组件，以及不
+    相互嵌套的其他组件）用asyncio.gather并发执行。
+    defer为True时延迟渲染边界中的组件不在这里执行。
+    """
+    components = []
+    element.pending_components(components, defer)
+    if components:
+        await asyncio.gather(*(c.resolve(defer) for c in components))
+
+# 编码后的开始和结束标签常量：name -> (b'<name', b'</name>')
+encoded_tags = {}
+
+def encoded_tag(name):
+    tag = encoded_tags.get(name)
+    if tag is None:
+        tag = (f'<{name}'.encode(), f'</{name}>'.encode())
+        encoded_tags[name] = tag
+    return tag
+
 def combine_style(style1, style2):
     if isinstance(style1, dict) and isinstance(style2, dict):
         result = {}
@@ -97,6 +203,14 @@ client_ref_attr_name = 'data-fryref'
 # 组件名的html元素属性名，只放在组件script上
 component_name_attr_name = 'data-fryname'
 
+# 紧凑模式下页面所有组件水合数据的json脚本上的无值属性名
+payload_attr_name = 'data-frypayload'
+
+# 延迟渲染边界的占位元素属性名，值为页面内的延迟内容编号
+suspense_attr_name = 'data-frysuspense'
+# 延迟内容的<template>属性名，值与占位元素的编号相同
+deferred_attr_name = 'data-frydeferred'
+
 # 组件元素作为一个模板时的无值属性名，组件元素用，不会最终生成到html中
 component_template_attr_name = 'frytemplate'
 
@@ -117,13 +231,144 @@ ref_attr_name = 'ref'
 # 引用列表属性名
 refall_attr_name = 'refall'
 
-class Element(object):
+class Stream(object):
+    """
+    可流式输出的孩子列表，如逐行读取数据库游标的Generator。
+    渲染时不展开，在序列化时才逐个渲染并输出，只能被遍历一次，
+    大列表不需要在内存中全部保存下来。
+    arender渲染的页面由ahtml或ahtml_stream序列化时，孩子中可以有async def组件，
+    每个孩子渲染前先执行其中的组件函数；用str()等同步方式序列化时会报错。
+    """
+    def __init__(self, items):
+        self.items = items
+        # 与Element一样，父组件传给子组件时标记为属于父组件
+        self.owner = 0
+        self.page = None
 
-    def __init__(self, name, props=None, rendered=False):
-        self.name = name
-        self.props = {} if props is None else props
-        self.rendered = rendered
-        self.cid = 0
+    def bind(self, page, owner):
+        self.page = page
+        if self.owner == 0:
+            self.owner = owner
+        return self
+
+    def __iter__(self):
+        if self.page is None:
+            raise RenderException("Stream should be rendered before serialization")
+        items, self.items = self.items, ()
+        if self.page.aio:
+            return self.iter_resolved(items)
+        return iter_rendered(items, self.page, self.owner)
+
+    def iter_resolved(self, items):
+        """
+        异步渲染的页面中，每个孩子渲染之前先输出Resolving标记，
+        异步序列化时在标记处执行孩子中的组件函数，孩子中可以有async def组件
+        """
+        for item in items:
+            item = expand_value(item)
+            components = []
+            for element in iter_elements(item, self.page.defer):
+                element.pending_components(components, self.page.defer)
+            if components:
+                yield Resolving(components, self.page.defer)
+            yield from iter_rendered((item,), self.page, self.owner)
+
+
+class Suspense(object):
+    """
+    延迟渲染边界。在允许延迟渲染的页面中（html_stream和ahtml_stream），渲染时只输出
+    包含fallback的占位元素，content在页面其余部分输出之后才渲染，以<template>输出
+    在body末尾，再由内联脚本替换占位元素，content中的慢组件不再阻塞页面其余部分。
+    其他页面中直接渲染content。
+    """
+    def __init__(self, content, fallback=None, tag='div'):
+        self.content = expand_value(content)
+        self.fallback = expand_value(fallback)
+        self.tag = tag
+        # 与Element一样，父组件传给子组件时标记为属于父组件
+        self.owner = 0
+        self.sid = 0
+        self.done = False
+        # 异步渲染时执行content中组件函数的task
+        self.task = None
+
+    def bind(self, page, owner):
+        """
+        渲染时调用，返回渲染后的孩子列表
+        """
+        if self.owner == 0:
+            self.owner = owner
+        if not page.defer:
+            return render_children([self.content], page, self.owner)
+        self.sid = page.add_deferred(self)
+        children = render_children([self.fallback], page, self.owner) if self.fallback is not None else []
+        placeholder = RenderedElement(self.tag, {suspense_attr_name: self.sid, children_attr_name: children})
+        placeholder.page = page
+        return [placeholder]
+
+    def render(self, page):
+        """
+        渲染延迟的content
+        """
+        self.done = True
+        return render_children([self.content], page, self.owner)
+
+    async def resolve(self):
+        """
+        执行content中的组件函数，内层的延迟渲染边界留到之后执行
+        """
+        components = []
+        for element in iter_elements(self.content, True):
+            element.pending_components(components, True)
+        if components:
+            await asyncio.gather(*(c.resolve(True) for c in components))
+
+
+class Pending(str):
+    """
+    延迟内容之前的标记，作为空字符串序列化。异步序列化时在这里等待延迟内容中的
+    组件执行完成，先完成的先输出，ready是接下来要输出的延迟渲染边界
+    """
+    def __new__(cls, pending):
+        marker = super().__new__(cls, '')
+        marker.pending = pending
+        marker.ready = None
+        return marker
+
+    async def wait(self):
+        for suspense in self.pending:
+            if suspense.task is None:
+                suspense.task = asyncio.ensure_future(suspense.resolve())
+        done, _ = await asyncio.wait([s.task for s in self.pending],
+                                     return_when=asyncio.FIRST_COMPLETED)
+        for suspense in self.pending:
+            if suspense.task in done:
+                self.ready = suspense
+                break
+        # 组件函数的异常在这里抛出
+        self.ready.task.result()
+
+
+class Resolving(str):
+    """
+    流式孩子中待执行组件之前的标记，作为空字符串序列化。
+    异步序列化时在这里执行组件函数，同步序列化时忽略，组件在渲染时直接执行
+    """
+    def __new__(cls, components, defer):
+        marker = super().__new__(cls, '')
+        marker.components = components
+        marker.defer = defer
+        return marker
+
+    async def wait(self):
+        await asyncio.gather(*(c.resolve(self.defer) for c in self.components))
+
+
+class BaseElement(object):
+    """
+    Element和RenderedElement的公共部分：属性访问和序列化
+    """
+    __slots__ = ()
 
     def is_component(self):
         if self.rendered:
@@ -147,283 +392,634 @@ class Element(object):
                 return value
         return None
 
-    def tolist(self):
-        def convert(v):
-            if isinstance(v, (tuple, types.GeneratorType)):
-                return list(v)
+    def html_attrs(self):
+        attrs = [html_attr(k, v) for k, v in self.props.items() if k != children_attr_name]
+        attrs = [attr for attr in attrs if attr]
+        if attrs:
+            return ' ' + ' '.join(attrs)
+        else:
+            return ''
+
+    def iter_html(self):
+        """
+        以生成器方式逐段生成渲染后元素的html文本，前面的兄弟元素序列化完成后即可输出，
+        无需等待整棵元素树序列化完成。
+        使用显式栈遍历元素树，不受元素树深度和递归深度限制。
+        """
+        # 栈中保存各层祖先元素的孩子迭代器和结束标签
+        stack = []
+        current = iter((self,))
+        close = None
+        while True:
+            for ch in current:
+                if not isinstance(ch, BaseElement):
+                    if isinstance(ch, Stream):
+                        stack.append((current, close))
+                        current = iter(ch)
+                        close = None
+                        break
+                    # 字符串原样输出，保留Pending标记
+                    yield ch if isinstance(ch, str) else str(ch)
+                elif not ch.rendered:
+                    yield '<Element(not rendered)>'
+                else:
+                    children = ch.props.get(children_attr_name, None)
+                    attrs = ch.html_attrs()
+                    if children is None:
+                        yield f'<{ch.name}{attrs} />'
+                    else:
+                        yield f'<{ch.name}{attrs}>'
+                        stack.append((current, close))
+                        current = iter(children)
+                        close = f'</{ch.name}>'
+                        break
             else:
-                return v
-        def handle(v):
-            if isinstance(v, Element):
-                v.props = {key: convert(value) for key, value in v.props.items()}
-                handle(v.props)
-            elif isinstance(v, dict):
-                for key, value in v.items():
-                    value = convert(value)
-                    v[key] = value
-                    handle(value)
-            elif isinstance(v, list):
-                for i, value in enumerate(v):
-                    value = convert(value)
-                    v[i] = value
-                    handle(value)
-        handle(self)
-
-    def hook_client_embed(self, component):
-        def hook(v):
-            if isinstance(v, (ClientEmbed, ClientRef)):
-                v.hook(component)
-            elif isinstance(v, list): #tuple和GeneratorType在render第四步都已转化为list
-                for lv in v:
-                    hook(lv)
-            elif isinstance(v, dict):
-                for lv in v.values():
-                    hook(lv)
-            elif isinstance(v, Element):
-                hook(v.props)
-        hook(self.props)
-
-    def collect_client_embed(self, component):
-        # 本函数中处理的component已经过渲染，所有element全是html element
-        def collect(e):
-            children = e.props.get(children_attr_name, [])
-            for ch in children:
-                if isinstance(ch, Element):
-                    collect(ch)
-            embeds = e.props.get(client_embed_attr_name, [])
-            refs = e.props.get(client_ref_attr_name, [])
-            for key in list(e.props.keys()):
-                if key in (client_embed_attr_name, children_attr_name):
-                    continue
-                value = e.props.get(key)
-                if isinstance(value, ClientEmbed) and value.component == component:
-                    if e.name == 'script': # 暂时保留，已不支持
-                        value.embed_id = f'{value.embed_id}-object-{key}'
-                    elif key[0] == '@':
-                        value.embed_id = f'{value.embed_id}-event-{key[1:]}'
-                    elif key.startswith('$$'):
-                        value.embed_id = f'{value.embed_id}-attr-{key[2:]}'
-                    elif key == '*':
-                        value.embed_id = f'{value.embed_id}-text'
-                    elif key == '!':
-                        value.embed_id = f'{value.embed_id}-html'
+                if close is not None:
+                    yield close
+                if not stack:
+                    return
+                current, close = stack.pop()
+
+    def write_bytes(self, buf, encoding='utf-8'):
+        """
+        将渲染后的元素直接序列化为编码后的字节，追加到buf(bytearray)中，
+        不生成中间的html字符串。遍历方式与iter_html相同。
+        """
+        stack = []
+        current = iter((self,))
+        close = None
+        while True:
+            for ch in current:
+                if isinstance(ch, str):
+                    buf += ch.encode(encoding)
+                elif not isinstance(ch, BaseElement):
+                    if isinstance(ch, Stream):
+                        stack.append((current, close))
+                        current = iter(ch)
+                        close = None
+                        break
+                    buf += str(ch).encode(encoding)
+                elif not ch.rendered:
+                    buf += b'<Element(not rendered)>'
+                else:
+                    children = ch.props.get(children_attr_name, None)
+                    start, end = encoded_tag(ch.name)
+                    buf += start
+                    attrs = ch.html_attrs()
+                    if attrs:
+                        buf += attrs.encode(encoding)
+                    if children is None:
+                        buf += b' />'
                     else:
-                        raise RenderException(f"Invalid client embed key '{key}' for element '{e.name}'")
-                    embeds.append(value)
-                    e.props.pop(key)
-                elif isinstance(value, ClientRef) and value.component == component:
-                    refs.append(value)
-                    e.props.pop(key)
-            if embeds:
-                e.props[client_embed_attr_name] = embeds
-            if refs:
-                e.props[client_ref_attr_name] = refs
-        collect(self)
+                        buf += b'>'
+                        stack.append((current, close))
+                        current = iter(children)
+                        close = end
+                        break
+            else:
+                if close is not None:
+                    buf += close
+                if not stack:
+                    return buf
+                current, close = stack.pop()
 
-    def render(self, page):
+    def to_bytes(self, encoding='utf-8'):
+        return self.write_bytes(bytearray(), encoding)
+
+    def __str__(self):
+        return ''.join(self.iter_html())
+
+
+class Element(BaseElement):
+    """
+    编写页面时使用的元素，组件函数返回的元素树由Element组成，渲染后得到RenderedElement树
+    """
+
+    def __init__(self, name, props=None, rendered=False, classified=False):
+        self.name = name
+        self.props = {} if props is None else props
+        self.rendered = rendered
+        # 属性已在编译期分类，utility属性已转换为class，其余都是html属性
+        self.classified = classified
+        self.cid = 0
+        # 创建本元素的组件实例ID，0表示由渲染时所在的组件决定
+        self.owner = 0
+        # 异步渲染时预先执行组件函数得到的原始组件元素树
+        self.resolved = None
+
+    def pending_components(self, components, defer=False):
+        """
+        收集元素树中待执行的组件元素（不进入组件内部），
+        同时将html元素children中的tuple和Generator展开为list
+        """
+        if self.rendered or self.resolved is not None:
+            return
+        if callable(self.name):
+            components.append(self)
+            return
+        for k, v in self.props.items():
+            if k == children_attr_name:
+                v = self.props[k] = expand_value(v)
+            for element in iter_elements(v, defer):
+                element.pending_components(components, defer)
+
+    async def resolve(self, defer=False):
+        """
+        执行组件函数，async def组件函数返回的awaitable在这里await，
+        然后继续执行组件元素树中的其他组件
+        """
+        for k, v in self.props.items():
+            self.props[k] = expand_value(v)
+        # 父组件传来的frytemplate/ref/refall/@event/class不传给组件函数，
+        # 与render中的预处理保持一致。组件元素是另一个组件的根元素时，
+        # 其call-client-script属性由外层组件的call_component取出，也不传给组件函数
+        kwargs = {k: v for k, v in self.props.items()
+                  if not (isinstance(v, ClientRef) or k[0] == '@' or
+                          k in (class_attr_name, component_template_attr_name,
+                                call_client_script_attr_name))}
+        result = self.name(**kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        if not isinstance(result, BaseElement):
+            raise RuntimeError(f"Function '{self.name.__name__}' should return Element")
+        self.resolved = result
+        await resolve_tree(result, defer)
+
+    async def arender(self, page, owner=0):
+        """
+        render的异步版本，支持async def组件。
+        先并发执行元素树中的所有组件函数，再按顺序同步渲染，组件实例ID的分配与render一致。
+        """
+        # 流式孩子在序列化时才渲染，其中的组件由异步序列化执行，见Stream.iter_resolved
+        page.aio = True
+        with phase(page, 'resolve'):
+            await resolve_tree(self, page.defer)
+        with phase(page, 'render'):
+            return self.render(page, owner)
+
+    def render(self, page, owner=0):
         """
         返回渲染后的元素。
         所有组件元素被渲染为基础元素（HTML元素），子元素列表中的子元素列表被摊平，属性值中不应再有元素
+
+        owner是当前元素所在组件的实例ID。渲染过程只遍历元素树一次，遍历的同时完成
+        tuple/Generator的展开、js嵌入值与组件实例的挂接以及js嵌入值的收集。
+        使用显式栈遍历元素树：html元素的孩子和组件函数返回的元素树压入栈中渲染，
+        不递归调用render，元素树的深度不受python递归深度限制。
         """
         if self.rendered:
             return self
+        # 栈中是正在渲染的祖先元素的渲染状态(HtmlFrame/ComponentFrame)
+        stack = []
+        frame = self.start(page, owner)
+        try:
+            while True:
+                child = frame.next()
+                if child is not None:
+                    stack.append(frame)
+                    frame = child.start(page, frame.owner)
+                else:
+                    element = frame.finish()
+                    if not stack:
+                        return element
+                    frame = stack.pop()
+                    frame.send(element)
+        except BaseException:
+            # 渲染出错时结束栈中各组件的性能分析计时，frame可能同时在栈顶
+            frame.unwind()
+            while stack:
+                stack.pop().unwind()
+            raise
+
+    def start(self, page, owner):
+        """
+        开始渲染本元素，返回渲染状态
+        """
+        # 父组件传给子组件的元素在标记时已确定所属组件
+        owner = self.owner or owner
 
         if callable(self.name): #inspect.isfunction(self.name):
-            # 渲染函数组件元素流程：
-            # 1. 生成页面内组件实例对应的script元素，附加到页面后，
-            #    得到组件实例唯一编号。
-            #    组件函数每执行一次，返回该组件的一个实例。页面中
-            #    每个组件实例都有一个页面内唯一编号。
-            #    将组件名和组件实例ID附加到代表组件的script元素上，
-            #    script是用来记录当前组件信息的，包括组件id，名字，
-            #    以及后面可能的组件js参数
+            return self.start_component(page, owner)
+        elif isinstance(self.name, str):
+            return HtmlFrame(self, page, owner)
+        else:
+            raise RenderException(f"invalid element name '{self.name}'")
+
+    def start_component(self, page, owner):
+        """
+        执行组件函数，返回组件的渲染状态，组件元素树在渲染栈中渲染
+        """
+        # 渲染函数组件元素流程：
+        # 1. 生成页面内组件实例对应的script元素，附加到页面后，
+        #    得到组件实例唯一编号。
+        #    组件函数每执行一次，返回该组件的一个实例。页面中
+        #    每个组件实例都有一个页面内唯一编号。
+        #    将组件名和组件实例ID附加到代表组件的script元素上，
+        #    script是用来记录当前组件信息的，包括组件id，名字，
+        #    以及后面可能的组件js参数。
+        #    只有浏览器端需要的组件实例才分配编号：被父组件引用的组件和组件模板
+        #    在这里分配；有js脚本的组件（编译时生成了call-client-script）在执行
+        #    组件函数后分配；纯服务端组件不分配编号，没有任何水合开销。
+        frame = ComponentFrame(self, page)
+        frame.base = len(page.components)
+        istemplate = frame.istemplate = self.props.pop(component_template_attr_name, False)
+        component = None
+        cnumber = 0
+        if istemplate or any(isinstance(v, ClientRef) for v in self.props.values()):
             component = {}
             cnumber = page.add_component(component)
 
-            # 2. 预处理父组件传来的frytemplate/ref/refall/@event/class
-            #    2.1 将本组件上定义的给父组件js脚本用的ref/refall记录到page
-            #        上，在生成父组件的script元素时加到data-fryref上；
-            #    2.2 将父组件传来的@event事件处理函数暂存，渲染完成后添加到
-            #        本组件树的树根元素上;
-            #    2.3 将父组件传来的class值暂存，渲染完成后附加到本组件树的数根元素上。
-            peventhandlers = []
-            pclass = ''
-            istemplate = self.props.pop(component_template_attr_name, False)
-            for key, value in list(self.props.items()):
-                if isinstance(value, ClientRef):
-                    self.props.pop(key)
-                    pcid = value.component
-                    if pcid == 0:
-                        raise RuntimeError(f"Invalid ClientRef {value.name}")
-                    name = 't:' + value.name if istemplate else value.name
-                    page.add_ref(pcid, name, cnumber)
-                elif key[0] == '@':
-                    name = key[1:]
-                    if istemplate:
-                        raise RuntimeError(f"Can't attach event handler {name} to a frytemplate")
-                    self.props.pop(key)
-                    value.embed_id = f'{value.embed_id}-event-{name}'
-                    peventhandlers.append(value)
-                elif key == 'class':
-                    self.props.pop(key)
-                    pclass = value
-
-            # 3. 执行组件函数，返回未渲染的原始组件元素树
-            #    唯一不是合法python identifier的ref(:jsname)、refall(:jsname)和已经在上一步
-            #    删除，此时self.props的key应该都是合法的python identifier，可以
-            #    **self.props用来给函数调用传参。
-            #    元素树中的js嵌入值以ClientEmbed对象表示，元素树中
-            #    的ClientEmbed对象只能是新生成的本组件js嵌入值。
-            #    本组件js嵌入值中(暂时)不带组件实例唯一编号，通过下一步hook_client_embed
-            #    将组件实例唯一编号附加到js嵌入值中。
-            #    其中：
-            #    * 元素树中html元素属性和文本中的js嵌入值都被移到
-            #      所在元素的data-fryembed属性值列表中；
-            #    * 元素树中子组件元素属性中的js嵌入值只有ref和refall，已经在
-            #      上一步中处理，所以子组件元素属性中不存在js嵌入值
-            result = self.name(**self.props)
-            if not isinstance(result, Element):
-                raise RuntimeError(f"Function '{self.name.__name__}' should return Element")
+        # 2. 预处理父组件传来的frytemplate/ref/refall/@event/class
+        #    2.1 将本组件上定义的给父组件js脚本用的ref/refall记录到page
+        #        上，在生成父组件的script元素时加到data-fryref上；
+        #    2.2 将父组件传来的@event事件处理函数暂存，渲染完成后添加到
+        #        本组件树的树根元素上;
+        #    2.3 将父组件传来的class值暂存，渲染完成后附加到本组件树的数根元素上。
+        peventhandlers = frame.peventhandlers
+        for key, value in list(self.props.items()):
+            if isinstance(value, ClientRef):
+                self.props.pop(key)
+                value.hook(owner)
+                pcid = value.component
+                if pcid == 0:
+                    raise RuntimeError(f"Invalid ClientRef {value.name}")
+                name = 't:' + value.name if istemplate else value.name
+                page.add_ref(pcid, name, cnumber)
+            elif key[0] == '@':
+                name = key[1:]
+                if istemplate:
+                    raise RuntimeError(f"Can't attach event handler {name} to a frytemplate")
+                self.props.pop(key)
+                value.hook(owner)
+                value.embed_id = f'{value.embed_id}-event-{name}'
+                peventhandlers.append(value)
+            elif key == 'class':
+                self.props.pop(key)
+                frame.pclass = value
+            else:
+                #    2.4 其他属性值中的元素（如children）由父组件创建，
+                #        其中的js嵌入值属于父组件，先将它们标记为父组件所有
+                self.props[key] = own_value(value, owner)
 
-            # 4. 转化Generator/tuple为list，Generator只能遍历一次，后面会有多次的遍历
-            #    tuple无法改变内部数据，也变为list
-            result.tolist()
+        # 3. 执行组件函数，组件元素树在渲染栈中渲染完成后由ComponentFrame.finish
+        #    记录组件信息。
+        #    使用片段缓存的组件，缓存命中时直接使用缓存中的渲染结果，
+        #    缓存中的组件实例ID按本页面的组件实例编号重新编号
+        #    打开性能分析时记录组件的执行和渲染时间
+        profiler = frame.profiler = page.profiler
+        if profiler is not None:
+            profiler.enter()
+        try:
+            cache = frame.cache = getattr(self.name, 'fry_cache', None)
+            key = frame.key = cache.key(self.name, self.props, cnumber != 0) if cache is not None else None
+            cached = cache.get(key, page, frame.base, component) if key is not None else None
+            if cached is None:
+                self.call_component(frame, component, cnumber)
+            else:
+                frame.result, frame.owner = cached
+                frame.cached = True
+        except BaseException:
+            frame.unwind()
+            raise
+        return frame
 
-            # 5. 将组件实例唯一编号挂载到组件元素树的所有本组件生成的
-            #    js嵌入值上，使每个js嵌入值具有页面内唯一标识，
-            #    标识格式为：组件实例唯一编号/js嵌入值在组件内唯一编号
-            result.hook_client_embed(cnumber)
+    def call_component(self, frame, component, cnumber):
+        """
+        执行组件函数，组件还没有实例编号但有js脚本时，在这里分配编号。
+        返回的组件元素树作为frame的根元素，在渲染栈中渲染
+        """
+        # 3.1 执行组件函数，返回未渲染的原始组件元素树
+        #    唯一不是合法python identifier的ref(:jsname)、refall(:jsname)和已经在render的预处理中
+        #    删除，此时self.props的key应该都是合法的python identifier，可以
+        #    **self.props用来给函数调用传参。
+        #    元素树中的js嵌入值以ClientEmbed对象表示，元素树中
+        #    的ClientEmbed对象只能是新生成的本组件js嵌入值。
+        #    本组件js嵌入值中(暂时)不带组件实例唯一编号，在渲染组件元素树时
+        #    将组件实例唯一编号附加到js嵌入值中。
+        #    其中：
+        #    * 元素树中html元素属性和文本中的js嵌入值都被移到
+        #      所在元素的data-fryembed属性值列表中；
+        #    * 元素树中子组件元素属性中的js嵌入值只有ref和refall，已经在
+        #      render的预处理中处理，所以子组件元素属性中不存在js嵌入值
+        if self.resolved is not None:
+            result = self.resolved
+            self.resolved = None
+        else:
+            result = self.name(**self.props)
+            if inspect.iscoroutine(result):
+                result.close()
+                if getattr(frame.page, 'aio', False):
+                    # 异步渲染的页面中，只有流式孩子中的组件会在这里执行
+                    raise RuntimeError(f"Async component '{self.name.__name__}' in a Stream should be serialized by ahtml or ahtml_stream")
+                raise RuntimeError(f"Async component '{self.name.__name__}' should be rendered by arender")
+        if not isinstance(result, BaseElement):
+            raise RuntimeError(f"Function '{self.name.__name__}' should return Element")
 
-            # 6. 从原始组件元素树根元素的属性中取出calljs属性值
-            calljs = result.props.pop(call_client_script_attr_name, False)
+        # 3.2 从原始组件元素树根元素的属性中取出calljs属性值，
+        #     有js脚本的组件在渲染组件元素树之前分配实例编号
+        calljs = result.props.pop(call_client_script_attr_name, False)
+        if calljs and not cnumber:
+            component = {}
+            cnumber = frame.page.add_component(component)
+        frame.calljs = calljs
+        frame.component = component
+        frame.owner = cnumber
 
-            # 7. 原始组件元素树渲染为最终的html元素树，
-            element = result.render(page)
-            element.cid = cnumber
+        # 3.3 原始组件元素树渲染为最终的html元素树，渲染是一次遍历完成的：
+        #    * Generator/tuple在遍历到时展开为list，Generator只被遍历这一次；
+        #    * 将组件实例唯一编号挂载到组件元素树的所有本组件生成的
+        #      js嵌入值上，使每个js嵌入值具有页面内唯一标识，
+        #      标识格式为：组件实例唯一编号/js嵌入值在组件内唯一编号；
+        #    * 同时将js嵌入值收集到所在html元素的`client_embed_attr_name('data-fryembed')`
+        #      和`client_ref_attr_name('data-fryref')`属性上。
+        if result.rendered:
+            frame.result = result
+        else:
+            frame.root = result
 
-            # 8. 此时已hook到组件实例的js嵌入值已挂载到html元素树上的合适
-            #    位置，将这些js嵌入值收集到`client_embed_attr_name('data-fryembed')`
-            #    和`client_ref_attr_name('data-fryref')`属性上
-            element.collect_client_embed(cnumber)
-            
-            # 9. 将组件实例ID附加到组件html元素树树根元素的组件id列表'data-fryid'上
-            cid = element.props.get(component_id_attr_name, '')
-            element.props[component_id_attr_name] = f'{cnumber} {cid}' if cid else str(cnumber)
 
-            # 10. 将父组件传来的事件处理函数记录到根元素上
-            embeds = element.props.get(client_embed_attr_name, [])
-            embeds += peventhandlers
-            if embeds:
-                element.props[client_embed_attr_name] = embeds
-
-            # 11. 将父组件传来的class附加到根元素上
-            selfclass = element.props.get(class_attr_name, '')
-            if selfclass and pclass:
-                selfclass += ' ' + pclass
-            elif pclass:
-                selfclass = pclass
-            if selfclass:
-                element.props[class_attr_name] = selfclass
-
-            # 12. 将子组件实例的引用附加到script上(ref和refall都编码到refs中了)
-            component['name'] = component_name(self.name)
-            component['refs'] = page.child_refs(cnumber)
-
-            # 13. 若当前组件存在js代码，记录组件与脚本关系，然后将组件js参数加到script脚本上
-            if calljs:
-                uuid, args = calljs
-                component['setup'] = uuid
-                component['args'] = {k:v for k,v in args}
-                page.hasjs = True
+class HtmlFrame(object):
+    """
+    html元素的渲染状态：处理元素属性，孩子中的元素依次压入渲染栈渲染，
+    孩子都渲染完成后生成RenderedElement
+    """
+    __slots__ = ('element', 'page', 'owner', 'keys', 'props', 'classes', 'embeds', 'refs', 'children', 'iters')
 
-            # 14. 对于组件模板，使用<template>包装起来
-            if istemplate:
-                props = {
-                    component_template_id_atttr_name: cnumber,
-                    children_attr_name: [element]
-                }
-                element = Element('template', props, True)
-        elif isinstance(self.name, str):
-            props = {}
-            #style = {} 
-            classes = []
-            for k in list(self.props.keys()):
-                v = self.props[k]
-                if k == children_attr_name:
-                    props[k] = render_children(v, page)
-                elif isinstance(v, Element):
-                    props[k] = v.render(page)
-                #elif k == utility_attr_name:
-                #    if isinstance(v, (list, tuple, types.GeneratorType)):
-                #        v = ' '.join(v)
-                #    elif not isinstance(v, str):
-                #        raise RenderException(f"Invalid $style value: '{v}'")
-                #    style = combine_style(style, convert_utilities(v))
-                #elif k == style_attr_name:
-                #    style = combine_style(style, v)
-                elif is_valid_html_attribute(self.name, k):
+    def __init__(self, element, page, owner):
+        self.element = element
+        self.page = page
+        self.owner = owner
+        self.keys = iter(list(element.props))
+        self.props = {}
+        #style = {}
+        self.classes = []
+        self.embeds = []
+        self.refs = []
+        self.children = None
+        # 孩子列表及其中嵌套的list/tuple/Generator的迭代器
+        self.iters = []
+        self.attributes()
+
+    def attributes(self):
+        """
+        按顺序处理元素属性，遇到children时返回，孩子渲染完成后再处理其余属性
+        """
+        element = self.element
+        name = element.name
+        eprops = element.props
+        page = self.page
+        owner = self.owner
+        props = self.props
+        classes = self.classes
+        embeds = self.embeds
+        refs = self.refs
+        for k in self.keys:
+            v = eprops[k]
+            if k == children_attr_name:
+                self.children = props[k] = []
+                self.iters.append(iter(v))
+                return
+            if isinstance(v, (tuple, types.GeneratorType)):
+                v = list(v)
+            if isinstance(v, Element):
+                props[k] = v.render(page, owner)
+            elif isinstance(v, ClientEmbed):
+                v.hook(owner)
+                if not v.component:
                     props[k] = v
-                elif v is True:
-                    classes.append(k)
-                elif isinstance(v, str):
-                    values = v.split()
-                    if not values:
-                        values = ['']
-                    classes.extend(CSS(k, value).to_class() for value in values) 
+                elif name == 'script': # 暂时保留，已不支持
+                    v.embed_id = f'{v.embed_id}-object-{k}'
+                    embeds.append(v)
+                elif k[0] == '@':
+                    v.embed_id = f'{v.embed_id}-event-{k[1:]}'
+                    embeds.append(v)
+                elif k.startswith('$$'):
+                    v.embed_id = f'{v.embed_id}-attr-{k[2:]}'
+                    embeds.append(v)
+                elif k == '*':
+                    v.embed_id = f'{v.embed_id}-text'
+                    embeds.append(v)
+                elif k == '!':
+                    v.embed_id = f'{v.embed_id}-html'
+                    embeds.append(v)
+                else:
+                    raise RenderException(f"Invalid client embed key '{k}' for element '{name}'")
+            elif isinstance(v, ClientRef):
+                v.hook(owner)
+                if v.component:
+                    refs.append(v)
                 else:
                     props[k] = v
-            if classes:
-                currclass = props.get(class_attr_name, '')
-                classes = ' '.join(classes)
-                if currclass:
-                    currclass += ' ' + classes
+            #elif k == utility_attr_name:
+            #    if isinstance(v, (list, tuple, types.GeneratorType)):
+            #        v = ' '.join(v)
+            #    elif not isinstance(v, str):
+            #        raise RenderException(f"Invalid $style value: '{v}'")
+            #    style = combine_style(style, convert_utilities(v))
+            #elif k == style_attr_name:
+            #    style = combine_style(style, v)
+            elif element.classified or is_valid_html_attribute(name, k):
+                props[k] = v
+            elif v is True:
+                classes.append(k)
+            elif isinstance(v, str):
+                values = v.split()
+                if not values:
+                    values = ['']
+                classes.extend(utility_class(k, value) for value in values)
+            else:
+                props[k] = v
+
+    def next(self):
+        """
+        返回下一个需要渲染的孩子元素，孩子都已渲染时返回None。
+        孩子中的list/tuple/Generator在遍历到时展开，Generator只被遍历这一次
+        """
+        iters = self.iters
+        children = self.children
+        while iters:
+            for ch in iters[-1]:
+                if isinstance(ch, (list, tuple, types.GeneratorType)):
+                    iters.append(iter(ch))
+                    break
+                elif isinstance(ch, Element):
+                    if not ch.rendered:
+                        return ch
+                    children.append(ch)
+                elif isinstance(ch, Stream):
+                    # 流式孩子不在这里展开，只记录渲染上下文，序列化时再逐个渲染
+                    children.append(ch.bind(self.page, self.owner))
+                elif isinstance(ch, Suspense):
+                    children += ch.bind(self.page, self.owner)
                 else:
-                    currclass = classes
-                props[class_attr_name] = currclass
-            #if style:
-            #    props[style_attr_name] = style
-            element = Element(self.name, props, True)
-        else:
-            raise RenderException(f"invalid element name '{self.name}'")
+                    children.append(ch)
+            else:
+                iters.pop()
+        return None
 
+    def send(self, element):
+        self.children.append(element)
+
+    def finish(self):
+        # children之后的属性
+        self.attributes()
+        props = self.props
+        classes = self.classes
+        if classes:
+            currclass = props.get(class_attr_name, '')
+            classes = ' '.join(classes)
+            if currclass:
+                currclass += ' ' + classes
+            else:
+                currclass = classes
+            props[class_attr_name] = currclass
+        #if style:
+        #    props[style_attr_name] = style
+        if self.embeds:
+            props[client_embed_attr_name] = self.embeds
+        if self.refs:
+            props[client_ref_attr_name] = self.refs
+        page = self.page
+        element = RenderedElement(self.element.name, props)
+        # 编译期预渲染静态子树时page为None
+        profiler = page.profiler if page is not None else None
+        if profiler is not None:
+            profiler.element()
         element.page = page
         return element
 
+    def unwind(self):
+        pass
 
-    def __str__(self):
-        if not self.rendered:
-            return '<Element(not rendered)>'
 
-        children = self.props.pop(children_attr_name, None)
-        attrs = []
-        for k, v in self.props.items():
-            if isinstance(v, dict):
-                values = []
-                for k1, v1 in v.items():
-                    values.append(f"{k1}: {v1};")
-                value = ' '.join(values)
-            elif isinstance(v, (list, tuple, types.GeneratorType)):
-                value = ' '.join(str(x) for x in v)
-            elif v is True:
-                value = ''
-            elif v is False:
-                continue
-            else:
-                value = str(v)
-            if value:
-                attrs.append(f'{k}="{escape(value)}"')
-            else:
-                attrs.append(k)
-        if attrs:
-            attrs = ' ' + ' '.join(attrs)
-        else:
-            attrs = ''
-        if children is None:
-            return f'<{self.name}{attrs} />'
-        else:
-            children = ''.join(str(ch) for ch in children)
-            return f'<{self.name}{attrs}>{children}</{self.name}>'
+class ComponentFrame(object):
+    """
+    组件元素的渲染状态：组件函数已经执行，组件元素树(root)渲染完成后，
+    将组件信息记录到页面上，并处理父组件传来的事件处理函数和class
+    """
+    __slots__ = ('element', 'page', 'owner', 'root', 'result', 'cached', 'base', 'component', 'calljs',
+                 'istemplate', 'peventhandlers', 'pclass', 'cache', 'key', 'profiler')
+
+    def __init__(self, element, page):
+        self.element = element
+        self.page = page
+        # 组件实例编号，组件元素树中元素的所属组件
+        self.owner = 0
+        # 待渲染的组件元素树和渲染结果
+        self.root = None
+        self.result = None
+        # 渲染结果来自片段缓存
+        self.cached = False
+        self.base = 0
+        self.component = None
+        self.calljs = False
+        self.istemplate = False
+        self.peventhandlers = []
+        self.pclass = ''
+        self.cache = None
+        self.key = None
+        self.profiler = None
+
+    def next(self):
+        root, self.root = self.root, None
+        return root
+
+    def send(self, element):
+        self.result = element
+
+    def finish(self):
+        page = self.page
+        fn = self.element.name
+        element = self.result
+        cnumber = self.owner
+        if not self.cached:
+            component = self.component
+            # 3.4 将子组件实例的引用附加到script上(ref和refall都编码到refs中了)
+            if cnumber:
+                component['name'] = component_name(fn)
+                component['refs'] = page.child_refs(cnumber)
+
+            # 3.5 若当前组件存在js代码，记录组件与脚本关系，然后将组件js参数加到script脚本上
+            if self.calljs:
+                uuid, args = self.calljs
+                component['setup'] = uuid
+                component['args'] = {k:v for k,v in args}
+                page.hasjs = True
+            if self.key is not None:
+                self.cache.put(self.key, page, self.base, element, cnumber)
+        self.unwind()
+
+        # 4. 将组件实例ID附加到组件html元素树树根元素的组件id列表'data-fryid'上
+        if cnumber:
+            element.cid = cnumber
+            cid = element.props.get(component_id_attr_name, '')
+            element.props[component_id_attr_name] = f'{cnumber} {cid}' if cid else str(cnumber)
+
+        # 5. 将父组件传来的事件处理函数记录到根元素上
+        embeds = element.props.get(client_embed_attr_name, [])
+        embeds += self.peventhandlers
+        if embeds:
+            element.props[client_embed_attr_name] = embeds
+
+        # 6. 将父组件传来的class附加到根元素上
+        pclass = self.pclass
+        selfclass = element.props.get(class_attr_name, '')
+        if selfclass and pclass:
+            selfclass += ' ' + pclass
+        elif pclass:
+            selfclass = pclass
+        if selfclass:
+            element.props[class_attr_name] = selfclass
+
+        # 7. 对于组件模板，使用<template>包装起来
+        if self.istemplate:
+            props = {
+                component_template_id_atttr_name: cnumber,
+                children_attr_name: [element]
+            }
+            element = RenderedElement('template', props)
+        element.page = page
+        return element
+
+    def unwind(self):
+        """
+        结束组件的性能分析计时，渲染完成或出错时调用，只结束一次
+        """
+        if self.profiler is not None:
+            self.profiler.exit(self.element.name)
+            self.profiler = None
+
+
+class RenderedElement(BaseElement):
+    """
+    渲染后的html元素。渲染后的元素树节点数量大，使用__slots__减少每个节点的内存占用。
+
+    RenderedElement不是Element的子类（否则每个节点又会有__dict__），
+    判断渲染结果时要用BaseElement或rendered属性，isinstance(x, Element)对渲染结果为False。
+    库内各处isinstance检查的处理：
+    - render_children/iter_rendered/HtmlFrame.next：已渲染的孩子原样保留，与原来render返回自身一致
+    - HtmlFrame.attributes：属性值为已渲染元素时原样保留
+    - own_value：已渲染元素没有owner，不需要标记
+    - iter_elements/pending_components：已渲染元素中没有待执行的组件，不需要遍历
+    - page_element/render_on/arender_on/render_bytes、cache.py：使用BaseElement
+    """
+    __slots__ = ('name', 'props', 'cid', 'page')
+    rendered = True
+
+    def __init__(self, name, props):
+        self.name = name
+        self.props = props
+        self.cid = 0
+        self.page = None
+
+    def render(self, page, owner=0):
+        return self
+
+    async def arender(self, page, owner=0):
+        return self
 
 
 Element.ClientEmbed = ClientEmbed
 Element.ClientRef = ClientRef
+Element.Stream = Stream
+Element.Suspense = Suspense
@@ -1,4 +1,5 @@
 from parsimonious import NodeVisitor
+from parsimonious.exceptions import VisitationError, UndefinedLabel
 from fryweb.config import fryconfig
 
 class BaseGenerator(NodeVisitor):
@@ -14,4 +15,41 @@ class BaseGenerator(NodeVisitor):
         self.client_embed_count = 0
 
 
+class MultiVisitor():
+    """
+    一次遍历语法树，同时执行多个NodeVisitor，返回各个visitor的结果列表
 
+    每个visitor仍按后序遍历得到自己的孩子结果，与单独调用visitor.visit(tree)的结果相同，
+    只是语法树只遍历一次，visit_xxx方法按规则名缓存，不必每个节点都getattr。
+    """
+    def __init__(self, visitors):
+        self.visitors = visitors
+        # 规则名 -> 各visitor对应的方法
+        self.methods = {}
+
+    def dispatch(self, name):
+        methods = [getattr(v, 'visit_' + name, v.generic_visit) for v in self.visitors]
+        self.methods[name] = methods
+        return methods
+
+    def visit(self, node):
+        results = [self.visit(n) for n in node]
+        methods = self.methods.get(node.expr_name)
+        if methods is None:
+            methods = self.dispatch(node.expr_name)
+        values = []
+        try:
+            if results:
+                for method, children in zip(methods, zip(*results)):
+                    values.append(method(node, list(children)))
+            else:
+                for method in methods:
+                    values.append(method(node, []))
+        except (VisitationError, UndefinedLabel):
+            raise
+        except Exception as exc:
+            # values中是出错之前的visitor的结果
+            if isinstance(exc, self.visitors[len(values)].unwrapped_exceptions):
+                raise
+            raise VisitationError(exc, type(exc), node) from exc
+        return values
@@ -0,0 +1,134 @@
+"""
+持久编译缓存
+
+以(fryweb版本、源文件内容、文件位置、影响编译结果的配置)为键，保存每个fry文件编译生成的
+py、js和attr文件。全量编译、切换分支或者CI中重新编译时，内容没有变化的文件直接从缓存
+恢复编译结果，不再解析和生成代码。
+
+缓存目录由FRYWEB_BUILD_CACHE指定（不要放在build_root中，全量编译会清空build_root），
+每一项是一个目录：
+
+    <cache>/<key[:2]>/<key>/
+        manifest.json   js文件名列表、js依赖目录
+        py              生成的python文件
+        attr            css属性文件
+        <stem>@<Component>.js
+
+缓存总大小超过FRYWEB_BUILD_CACHE_SIZE时，删除最久没有使用的缓存项。
+"""
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import time
+
+
+class BuildCache():
+    manifest_name = 'manifest.json'
+    # 写入中途失败留下的临时目录，超过这个时间后删除
+    tmp_timeout = 3600
+
+    def __init__(self, root, maxsize):
+        self.root = Path(root)
+        self.maxsize = maxsize
+        self.tmp = self.root / 'tmp'
+
+    def key(self, hash, relative_dir, stem, config):
+        """
+        hash中已经包含fryweb版本和源文件内容，生成的代码还与文件位置和编译配置有关
+        """
+        sha1 = hashlib.sha1()
+        for part in (hash, relative_dir.as_posix(), stem,
+                     str(config.hoist_static), ':'.join(config.plugins), config.parser):
+            sha1.update(part.encode())
+            sha1.update(b'\0')
+        return sha1.hexdigest()
+
+    def path(self, key):
+        return self.root / key[:2] / key
+
+    def get(self, key):
+        """
+        返回(缓存项目录, manifest)，不存在时返回None
+        """
+        entry = self.path(key)
+        manifest = entry / self.manifest_name
+        try:
+            with manifest.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+            # 记录使用时间，淘汰时先删除最久没有使用的缓存项
+            os.utime(manifest)
+        except (OSError, ValueError):
+            return None
+        return entry, data
+
+    def restore(self, cached, pytfile, js_dir, attrfile):
+        """
+        将缓存的编译结果复制到pytfile、js_dir和attrfile，返回js依赖目录列表，
+        缓存项不完整（比如正被其他编译进程淘汰）时返回None
+        """
+        entry, data = cached
+        try:
+            shutil.copyfile(entry / 'py', pytfile)
+            shutil.copyfile(entry / 'attr', attrfile)
+            for name in data['js']:
+                shutil.copyfile(entry / name, js_dir / name)
+        except (OSError, KeyError):
+            return None
+        return data['dependencies']
+
+    def put(self, key, pytfile, jsfiles, attrfile, dependencies):
+        """
+        保存编译结果。先写入临时目录再改名，多个编译进程同时写入同一项时只保留一个
+        """
+        tmp = self.tmp / f'{key}.{os.getpid()}'
+        try:
+            tmp.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(pytfile, tmp / 'py')
+            shutil.copyfile(attrfile, tmp / 'attr')
+            for file in jsfiles:
+                shutil.copyfile(file, tmp / file.name)
+            with (tmp / self.manifest_name).open('w', encoding='utf-8') as f:
+                json.dump({'js': [file.name for file in jsfiles],
+                           'dependencies': dependencies}, f)
+            entry = self.path(key)
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            os.rename(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def entries(self):
+        """
+        所有缓存项：(最近使用时间, 字节数, 目录)
+        """
+        for manifest in self.root.glob(f'[0-9a-f][0-9a-f]/*/{self.manifest_name}'):
+            entry = manifest.parent
+            try:
+                used = manifest.stat().st_mtime
+                size = sum(f.stat().st_size for f in entry.iterdir())
+            except OSError:
+                continue
+            yield used, size, entry
+
+    def evict(self):
+        """
+        删除最久没有使用的缓存项，直到总大小不超过maxsize，返回删除的缓存项数量
+        """
+        if self.tmp.exists():
+            now = time.time()
+            for tmp in self.tmp.iterdir():
+                try:
+                    if now - tmp.stat().st_mtime > self.tmp_timeout:
+                        shutil.rmtree(tmp, ignore_errors=True)
+                except OSError:
+                    pass
+        entries = sorted(self.entries(), key=lambda e: e[0], reverse=True)
+        total = 0
+        removed = 0
+        for _used, size, entry in entries:
+            total += size
+            if total > self.maxsize:
+                shutil.rmtree(entry, ignore_errors=True)
+                removed += 1
+        return removed
@@ -3,7 +3,7 @@ from pygments.lexers.python import PythonLexer
 from pygments.lexers.javascript import JavascriptLexer
 from pygments.token import Token, Name, Operator, Punctuation, String, Text, Whitespace, Comment
 from parsimonious import NodeVisitor, BadGrammar
-from fryweb.fry.grammar import grammar
+from fryweb.fry.parser import parse
 
 
 def merge(children):
@@ -297,7 +297,7 @@ class FryLexer(Lexer):
     visitor = FryVisitor()
 
     def get_tokens_unprocessed(self, text):
-        tree = grammar.parse(text)
+        tree = parse(text)
         i = 0
         for t, v in self.visitor.visit(tree):
             if t in Token:
@@ -2,16 +2,22 @@ from parsimonious import BadGrammar
 from pathlib import Path
 import os
 import re
+import ast
+import json
 import html
 import hashlib
 import time
 import shutil
 import sys
-from fryweb.fry.grammar import grammar
-from fryweb.fry.base import BaseGenerator
+import pickle
+import traceback
+from fryweb.fry.parser import parse
+from fryweb.fry.base import BaseGenerator, MultiVisitor
+from fryweb.fry.buildcache import BuildCache
+from fryweb.fry.manifest import BuildManifest
 from fryweb.spec import is_valid_html_attribute
-from fryweb.css.style import CSS
-from fryweb.element import children_attr_name, call_client_script_attr_name, ref_attr_name, refall_attr_name
+from fryweb.css.style import CSS, utility_class
+from fryweb.element import Element, children_attr_name, class_attr_name, call_client_script_attr_name, ref_attr_name, refall_attr_name
 from fryweb.fileiter import FileIter
 from fryweb.config import fryconfig
 from fryweb.js.generator import JsGenerator
@@ -28,6 +34,10 @@ def quote_bracket_f_string(s):
     return f'f{quote}{s}{quote}'
 
 
+def quote_html(s):
+    return json.dumps(s, ensure_ascii=False)
+
+
 #client_embed_attr_name = 'data-fryembed'
 
 no_attr = 'no_attr'                   # ('no_attr', ...)
@@ -276,8 +286,16 @@ class PyGenerator(BaseGenerator):
         super().__init__()
         self.logger = logger
         self.replace_pairs = []
+        self.hoist_static = fryconfig.snapshot().hoist_static
 
     def generate(self, tree, hash, relative_dir, pyfile):
+        self.prepare(hash, relative_dir, pyfile)
+        self.write(self.visit(tree))
+
+    def prepare(self, hash, relative_dir, pyfile):
+        """
+        开始编译一个文件，之后由visit或MultiVisitor遍历语法树
+        """
         prefix = relative_dir.as_posix().rstrip('/')
         prefix = prefix.replace('/', '_') + '_' if prefix and prefix != '.' else ''
         self.name_prefix = prefix + pyfile.stem + '_'
@@ -286,11 +304,19 @@ class PyGenerator(BaseGenerator):
         self.refs = set()
         self.refalls = set()
         self.reset_client_embed()
+        self.hash = hash
+        self.pyfile = pyfile
+
+    def write(self, source):
+        """
+        写入遍历语法树生成的python代码
+        """
+        pyfile = self.pyfile
         pytfile = pyfile.parent / f"{pyfile.stem}.pyt"
         with pytfile.open('w', encoding='utf-8') as pyf:
-            pyf.write(f'# fry {hash}\n')
+            pyf.write(f'# fry {self.hash}\n')
             pyf.write(f'# Generated by fryweb, DO NOT EDIT THIS FILE!\n')
-            pyf.write(self.visit(tree))
+            pyf.write(source)
         self.replace_pairs.append((pytfile, pyfile))
 
     def replace(self):
@@ -301,6 +327,121 @@ class PyGenerator(BaseGenerator):
     def compile_count(self):
         return len(self.replace_pairs)
 
+    def is_static(self, child):
+        return isinstance(child, tuple) and child[0] == 'static'
+
+    def static_html(self, name, attrs):
+        """
+        元素是完全静态的html元素（属性都是常量，没有python嵌入值、js嵌入值和组件）时，
+        在编译期将其渲染为html文本返回，否则返回None
+        """
+        if name[0] != '"':
+            return None
+        props = {}
+        for attr in attrs:
+            atype = attr[0]
+            if atype == novalue_attr:
+                props[attr[1]] = True
+            elif atype == literal_attr and attr[2][0] in '"\'':
+                props[attr[1]] = ast.literal_eval(attr[2])
+            elif atype == children_attr:
+                children = []
+                for ch in attr[1]:
+                    if not self.is_static(ch):
+                        return None
+                    children.append(ch[2])
+                props[children_attr_name] = children
+            else:
+                return None
+        # 与运行时使用同样的渲染和序列化过程，保证结果一致
+        return str(Element(name[1:-1], props).render(None))
+
+    def children_code(self, name, children):
+        # 只有html元素的孩子可以替换为静态html字符串，组件元素的孩子要原样传给组件函数。
+        # 相邻的静态孩子合并为一个字符串常量，渲染时原样输出
+        hoist = self.hoist_static and name[0] == '"'
+        codes = []
+        htmls = []
+        for ch in children:
+            if hoist and self.is_static(ch):
+                htmls.append(ch[2])
+                continue
+            if htmls:
+                codes.append(quote_html(''.join(htmls)))
+                htmls = []
+            codes.append(ch[1] if self.is_static(ch) else ch)
+        if htmls:
+            codes.append(quote_html(''.join(htmls)))
+        return codes
+
+    def classify_attrs(self, name, attrs):
+        """
+        html元素没有展开属性，且非html属性都是常量值时，在编译期把utility属性
+        转换为class，返回预处理后的属性列表，运行时不再逐个判断属性类型；
+        否则返回None，由运行时处理
+        """
+        if name[0] != '"':
+            return None
+        tag = name[1:-1]
+        names = set()
+        classes = []
+        classattr = None
+        result = []
+        for attr in attrs:
+            atype = attr[0]
+            if atype in (children_attr, jstext_attr, jshtml_attr, call_client_attr, no_attr):
+                result.append(attr)
+                continue
+            if atype == spread_attr:
+                return None
+            key = attr[1]
+            if key in names:
+                return None
+            names.add(key)
+            if key[0] in '@:':
+                # 事件处理器和ref，值为ClientEmbed/ClientRef
+                result.append(attr)
+            elif key == class_attr_name:
+                classattr = attr
+                result.append(attr)
+            elif is_valid_html_attribute(tag, key):
+                result.append(attr)
+            elif atype == novalue_attr:
+                classes.append(key)
+            elif atype == literal_attr and attr[2][0] in '"\'':
+                values = ast.literal_eval(attr[2]).split()
+                if not values:
+                    values = ['']
+                classes.extend(utility_class(key, value) for value in values)
+            else:
+                return None
+        if classes:
+            classes = ' '.join(classes)
+            if classattr is None:
+                result.append([literal_attr, class_attr_name, quote_html(classes)])
+            elif classattr[0] == literal_attr and classattr[2][0] in '"\'':
+                currclass = ast.literal_eval(classattr[2])
+                if currclass:
+                    currclass += ' ' + classes
+                else:
+                    currclass = classes
+                classattr[2] = quote_html(currclass)
+            else:
+                return None
+        return result
+
+    def element_code(self, name, attrs):
+        static = self.static_html(name, attrs) if self.hoist_static else None
+        for attr in attrs:
+            if attr[0] == children_attr:
+                attr[1] = self.children_code(name, attr[1])
+        classified = self.classify_attrs(name, attrs)
+        if classified is not None:
+            attrs = concat_kv(classified)
+            return f'Element({name}, {{{", ".join(attrs)}}}, classified=True)', static
+        attrs = concat_kv(attrs)
+        return f'Element({name}, {{{", ".join(attrs)}}})', static
+
 
     def generic_visit(self, node, children):
         return children or node
@@ -385,8 +526,8 @@ class PyGenerator(BaseGenerator):
         self.refs = set()
         self.refalls = set()
         self.reset_client_embed()
-        attrs = concat_kv(attrs)
-        return f'def {cname}{fryscript}return Element({name}, {{{", ".join(attrs)}}})'
+        code, _static = self.element_code(name, attrs)
+        return f'def {cname}{fryscript}return {code}'
 
     def visit_fry_component_header(self, node, children):
         _def, _, cname, _ = children
@@ -407,8 +548,8 @@ class PyGenerator(BaseGenerator):
 
     def visit_fry_element(self, node, children):
         name, attrs = children[0]
-        attrs = concat_kv(attrs)
-        return ('element', f'Element({name}, {{{", ".join(attrs)}}})')
+        code, static = self.element_code(name, attrs)
+        return ('element', code, static)
 
     def visit_fry_fragment(self, node, children):
         _, fry_children, _ = children
@@ -501,7 +642,7 @@ class PyGenerator(BaseGenerator):
         space, attr = children
         if not space and attr:
             # 元素属性前最好有空格
-            print(f"Warning: attribute {attr} should be prefixed with white space.")
+            self.logger.warning(f"Attribute {attr} should be prefixed with white space.")
         return attr
 
     def visit_fry_attribute(self, node, children):
@@ -627,6 +768,8 @@ class PyGenerator(BaseGenerator):
         frychild = children[0]
         if isinstance(frychild, str):
             return frychild
+        elif self.is_static(frychild):
+            return frychild
         elif isinstance(frychild, tuple):
             #if frychild[0] == 'fry_js_embed':
             #    _, embed, client_embed = frychild
@@ -667,7 +810,11 @@ class PyGenerator(BaseGenerator):
                 attrs = concat_kv(attrs)
                 return f'Element("span", {{{", ".join(attrs)}}})'
             elif frychild[0] == 'element':
-                return frychild[1]
+                _, code, static = frychild
+                if static is None:
+                    return code
+                # 静态元素在父元素中可能被替换为html字符串
+                return ('static', code, static)
         else:
             raise BadGrammar(f'Invalid fry_child "{frychild}"')
 
@@ -716,7 +863,10 @@ class PyGenerator(BaseGenerator):
         value = re.sub(r'(\s+)', lambda m: ' ', node.text).strip()
         if not value or value == ' ':
             return ''
-        return f'"{html.escape(value)}"'
+        code = f'"{html.escape(value)}"'
+        if self.hoist_static:
+            return ('static', code, ast.literal_eval(code))
+        return code
 
     def visit_no_embed_char(self, node, children):
         return node.text
@@ -786,7 +936,7 @@ def fry_to_py(source, path):
     fry文件内容转成py文件内容
     """
     begin = time.perf_counter()
-    tree = grammar.parse(source)
+    tree = parse(source)
     end = time.perf_counter()
     print(f"py parse: {end-begin}")
     begin = end
@@ -811,83 +961,215 @@ def time_delta(begin, end):
     else:
         return f"{delta*1000:.1f}ms"
 
+class BufferLogger:
+    """
+    编译进程中使用的logger，记录日志，由主进程按文件顺序输出
+    """
+    def __init__(self):
+        self.records = []
+
+    def debug(self, msg):
+        self.records.append(('debug', msg))
+
+    def info(self, msg):
+        self.records.append(('info', msg))
+
+    def warning(self, msg):
+        self.records.append(('warning', msg))
+
+    def error(self, msg):
+        self.records.append(('error', msg))
+
+class FryCompiler:
+    """
+    编译单个fry文件：生成py、js和attr文件
+    """
+    def __init__(self, logger):
+        self.logger = logger
+        self.pygenerator = PyGenerator(logger)
+        self.jsgenerator = JsGenerator(logger)
+        self.cssgenerator = CssGenerator(logger)
+        config = fryconfig.snapshot()
+        if config.build_cache:
+            self.cache = BuildCache(config.build_cache, config.build_cache_size)
+        else:
+            self.cache = None
+
+    def compile(self, file, clean):
+        """
+        编译file，返回(源文件hash, py文件路径)
+        """
+        # 编译过程中配置不变，每个文件直接读取快照属性
+        config = fryconfig.snapshot()
+        curr_file = Path(file).resolve(strict=True)
+        self.logger.info(f"Compile {curr_file} ...")
+        pyfile = curr_file.parent / f'{file.stem}.py'
+        curr_root = None
+        for p in curr_file.parents:
+            init = p / '__init__.py'
+            if not init.exists():
+                curr_root = p
+                break
+        relative_dir = curr_file.parent.relative_to(curr_root)
+        attrfile = config.build_root / relative_dir / f'{file.stem}.attr'
+        with curr_file.open('rb') as f:
+            source_bytes = f.read()
+        sha1 = hashlib.sha1()
+        sha1.update(f'fryweb v{config.version}\n'.encode())
+        sha1.update(source_bytes)
+        curr_hash = sha1.hexdigest().lower()
+        if not clean and pyfile.exists():
+            try:
+                with pyfile.open('r', encoding='utf-8') as pyf:
+                    first_line = next(pyf).strip()
+                    result = first_line.split()
+                    if (len(result) == 3 and
+                        result[0] == '#' and
+                        result[1] == 'fry' and
+                        result[2] == curr_hash):
+                        self.logger.info("  No change, skip.")
+                        return curr_hash, pyfile
+            except:
+                pass
+        pytfile = pyfile.parent / f'{pyfile.stem}.pyt'
+        if self.cache:
+            cache_key = self.cache.key(curr_hash, relative_dir, file.stem, config)
+            cached = self.cache.get(cache_key)
+            if cached:
+                begin = time.perf_counter()
+                self.jsgenerator.prepare(curr_hash, curr_root, curr_file)
+                dependencies = self.cache.restore(cached, pytfile, self.jsgenerator.js_dir, attrfile)
+                if dependencies is not None:
+                    self.pygenerator.replace_pairs.append((pytfile, pyfile))
+                    for relative in dependencies:
+                        self.jsgenerator.add_dependency(relative)
+                    end = time.perf_counter()
+                    self.logger.info(f"  Restore from build cache in {time_delta(begin, end)}")
+                    return curr_hash, pyfile
+        # 1. parse
+        begin = time.perf_counter()
+        source = source_bytes.decode()
+        tree = parse(source)
+        end = time.perf_counter()
+        self.logger.info(f"  Parse fry in {time_delta(begin, end)}")
+        begin = end
+
+        # 2. visit tree once for python, javascript and css
+        self.pygenerator.prepare(curr_hash, relative_dir, pyfile)
+        self.jsgenerator.prepare(curr_hash, curr_root, curr_file)
+        cssvisitor = self.cssgenerator.prepare()
+        visitor = MultiVisitor([self.pygenerator, self.jsgenerator, cssvisitor])
+        pysource, _js, _css = visitor.visit(tree)
+        end = time.perf_counter()
+        self.logger.info(f"  Visit tree in {time_delta(begin, end)}")
+        begin = end
+
+        # 3. generate python file
+        self.pygenerator.write(pysource)
+        end = time.perf_counter()
+        self.logger.info(f"  Generate py in {time_delta(begin, end)}")
+        begin = end
+
+        # 4. generate javascript files
+        self.jsgenerator.write()
+        end = time.perf_counter()
+        self.logger.info(f"  Generate js in {time_delta(begin, end)}")
+        begin = end
+
+        # 5. generate attr file of css utilities
+        self.cssgenerator.write(curr_hash, attrfile)
+        end = time.perf_counter()
+        self.logger.info(f"  Collect css in {time_delta(begin, end)}")
+
+        if self.cache:
+            jsdir = self.jsgenerator.js_dir
+            jsfiles = sorted(jsdir.glob(f'{curr_file.stem}@[A-Z]*.js'))
+            self.cache.put(cache_key, pytfile, jsfiles, attrfile,
+                           sorted(self.jsgenerator.file_dependencies))
+        return curr_hash, pyfile
+
+# 编译进程中的FryCompiler
+worker_compiler = None
+
+def init_worker(app_spec, syspath):
+    global worker_compiler
+    fryconfig.set_app_spec(app_spec)
+    for p in reversed(syspath):
+        if p not in sys.path:
+            sys.path.insert(0, p)
+    worker_compiler = FryCompiler(BufferLogger())
+
+def compile_in_worker(file, clean):
+    """
+    在编译进程中编译file，返回(日志, 异常, py替换对, js依赖目录, (源文件hash, py文件路径))
+    """
+    compiler = worker_compiler
+    compiler.logger.records = []
+    compiler.pygenerator.replace_pairs = []
+    compiler.jsgenerator.dependencies = set()
+    error = None
+    result = None
+    try:
+        result = compiler.compile(file, clean)
+    except Exception as e:
+        # 子进程的调用栈无法传回主进程，记录到日志中
+        compiler.logger.error(traceback.format_exc())
+        try:
+            error = pickle.loads(pickle.dumps(e))
+        except Exception:
+            error = RuntimeError(f"Compile {file} failed: {type(e).__name__}: {e}")
+    return (compiler.logger.records, error,
+            compiler.pygenerator.replace_pairs, compiler.jsgenerator.dependencies, result)
+
+def compile_chunk_in_worker(files, clean):
+    """
+    在编译进程中依次编译一组文件，返回各文件compile_in_worker的结果
+    """
+    return [compile_in_worker(file, clean) for file in files]
+
 class FryGenerator:
-    def __init__(self, logger, fryfiles=None, clean=True):
+    def __init__(self, logger, fryfiles=None, clean=True, jobs=1):
         self.logger = logger
         if not fryfiles:
             fryfiles = fry_files()
         self.fileiter = FileIter(fryfiles)
         self.clean = clean
+        # 并行编译的进程数，0表示cpu数
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
     
     def generate(self):
         self.logger.info("Fryweb build starting ...")
+        config = fryconfig.snapshot()
         if (self.clean):
-            self.logger.info(f"Clean build root {fryconfig.build_root} ...")
-            shutil.rmtree(fryconfig.build_root, ignore_errors=True)
-            if fryconfig.public_root.exists():
-                shutil.copytree(fryconfig.public_root, fryconfig.build_root)
+            self.logger.info(f"Clean build root {config.build_root} ...")
+            shutil.rmtree(config.build_root, ignore_errors=True)
+            if config.public_root.exists():
+                shutil.copytree(config.public_root, config.build_root)
             else:
-                fryconfig.build_root.mkdir(parents=True, exist_ok=True)
-        pygenerator = PyGenerator(self.logger)
-        jsgenerator = JsGenerator(self.logger)
-        cssgenerator = CssGenerator(self.logger)
+                config.build_root.mkdir(parents=True, exist_ok=True)
+        manifest = BuildManifest(config.build_root / '.frybuild.json', config.version)
+        if not self.clean:
+            manifest.load()
+        # 文件信息与清单一致的文件直接跳过，其他文件读取内容比较hash或者编译
+        files = []
+        stats = {}
         for file in self.fileiter.all_files():
-            curr_file = Path(file).resolve(strict=True)
-            self.logger.info(f"Compile {curr_file} ...")
-            pyfile = curr_file.parent / f'{file.stem}.py'
-            curr_root = None
-            for p in curr_file.parents:
-                init = p / '__init__.py'
-                if not init.exists():
-                    curr_root = p
-                    break
-            relative_dir = curr_file.parent.relative_to(curr_root)
-            attrfile = fryconfig.build_root / relative_dir / f'{file.stem}.attr'
-            with curr_file.open('rb') as f:
-                source_bytes = f.read()
-            sha1 = hashlib.sha1()
-            sha1.update(f'fryweb v{fryconfig.version}\n'.encode())
-            sha1.update(source_bytes)
-            curr_hash = sha1.hexdigest().lower()
-            if not self.clean and pyfile.exists():
-                try:
-                    with pyfile.open('r', encoding='utf-8') as pyf:
-                        first_line = next(pyf).strip()
-                        result = first_line.split()
-                        if (len(result) == 3 and
-                            result[0] == '#' and
-                            result[1] == 'fry' and
-                            result[2] == curr_hash):
-                            self.logger.info("  No change, skip.")
-                            continue
-                except:
-                    pass
-            # 1. parse
-            begin = time.perf_counter()
-            source = source_bytes.decode()
-            tree = grammar.parse(source)
-            end = time.perf_counter()
-            self.logger.info(f"  Parse fry in {time_delta(begin, end)}")
-            begin = end
-
-            # 2. generate python file
-            pygenerator.generate(tree, curr_hash, relative_dir, pyfile)
-            end = time.perf_counter()
-            self.logger.info(f"  Generate py in {time_delta(begin, end)}")
-            begin = end
-
-            # 3. generate javascript files
-            jsgenerator.generate(tree, curr_hash, curr_root, curr_file)
-            end = time.perf_counter()
-            self.logger.info(f"  Generate js in {time_delta(begin, end)}")
-            begin = end
-
-            # 4. collect css utilities and generate attr file
-            cssgenerator.collect(tree, curr_hash, attrfile)
-            end = time.perf_counter()
-            self.logger.info(f"  Collect css in {time_delta(begin, end)}")
-            begin = end
+            st = manifest.stat(file)
+            if not self.clean and manifest.unchanged(file, st):
+                self.logger.info(f"Compile {file} ...")
+                self.logger.info("  No change, skip.")
+                continue
+            files.append(file)
+            stats[file] = st
+        compiler = FryCompiler(self.logger)
+        if self.jobs > 1 and len(files) > 1:
+            results = self.compile_parallel(compiler, files)
+        else:
+            results = [compiler.compile(file, self.clean) for file in files]
 
+        pygenerator = compiler.pygenerator
+        jsgenerator = compiler.jsgenerator
+        cssgenerator = compiler.cssgenerator
         if pygenerator.compile_count() > 0:
             begin = time.perf_counter()
             jsgenerator.bundle()
@@ -904,4 +1186,49 @@ class FryGenerator:
             end = time.perf_counter()
             self.logger.info(f"Rename all py in {time_delta(begin, end)}")
 
-        self.logger.info(f"Fryweb build finished successfully.")
\ No newline at end of file
+        if files or self.clean:
+            for file, (curr_hash, pyfile) in zip(files, results):
+                if stats[file] is not None:
+                    manifest.record(file, stats[file], curr_hash, pyfile)
+            manifest.save()
+
+        if compiler.cache:
+            begin = time.perf_counter()
+            removed = compiler.cache.evict()
+            end = time.perf_counter()
+            self.logger.info(f"Evict {removed} build cache entries in {time_delta(begin, end)}")
+
+        self.logger.info(f"Fryweb build finished successfully.")
+
+    def compile_parallel(self, compiler, files):
+        """
+        多进程编译files，按文件顺序输出日志、合并py替换对和js依赖，返回各文件的编译结果，
+        出错时抛出顺序上第一个出错的文件的异常
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        jobs = min(self.jobs, len(files))
+        self.logger.info(f"Compile {len(files)} files with {jobs} processes ...")
+        chunksize = max(1, len(files) // (jobs * 4))
+        chunks = [files[i:i+chunksize] for i in range(0, len(files), chunksize)]
+        with ProcessPoolExecutor(max_workers=jobs,
+                                 initializer=init_worker,
+                                 initargs=(fryconfig.app_spec, sys.path)) as executor:
+            futures = [executor.submit(compile_chunk_in_worker, chunk, self.clean) for chunk in chunks]
+            compiled = []
+            try:
+                for future in futures:
+                    for records, error, replace_pairs, dependencies, result in future.result():
+                        for level, msg in records:
+                            getattr(self.logger, level)(msg)
+                        if error is not None:
+                            raise error
+                        compiler.pygenerator.replace_pairs.extend(replace_pairs)
+                        compiler.jsgenerator.dependencies.update(dependencies)
+                        compiled.append(result)
+            except BaseException:
+                # 取消还没有开始的编译，正在编译的文件在退出with时等待完成
+                # （Executor.shutdown的cancel_futures参数需要python 3.9）
+                for future in futures:
+                    future.cancel()
+                raise
+        return compiled
@@ -0,0 +1,77 @@
+"""
+编译清单
+
+记录每个fry文件上次编译时的文件信息(大小、mtime_ns、inode)和内容hash，以及生成的py文件的
+大小和mtime_ns。增量编译时源文件和py文件的信息都没有变化就直接跳过，不必读取源文件计算hash，
+也不必打开py文件比较第一行；文件信息变化（比如touch、切换分支）时才计算hash。
+
+清单保存在build_root中，全量编译时重新生成。
+"""
+import json
+import os
+
+
+class BuildManifest():
+    def __init__(self, path, version):
+        self.path = path
+        self.version = version
+        # 源文件路径 -> [size, mtime_ns, inode, hash, py文件路径, py size, py mtime_ns]
+        self.files = {}
+
+    def load(self):
+        try:
+            with self.path.open('r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        # fryweb版本变化后所有文件都需要重新编译
+        if data.get('version') == self.version:
+            self.files = data.get('files', {})
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with tmp.open('w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'files': self.files}, f)
+        os.replace(tmp, self.path)
+
+    def stat(self, file):
+        try:
+            return os.stat(file)
+        except OSError:
+            return None
+
+    def unchanged(self, file, st):
+        """
+        file的文件信息与上次编译时相同，并且生成的py文件没有被修改或删除
+        """
+        entry = self.files.get(str(file))
+        if entry is None or st is None:
+            return False
+        size, mtime_ns, inode, _hash, pyfile, pysize, pymtime_ns = entry
+        if st.st_size != size or st.st_mtime_ns != mtime_ns or st.st_ino != inode:
+            return False
+        try:
+            pyst = os.stat(pyfile)
+        except OSError:
+            return False
+        return pyst.st_size == pysize and pyst.st_mtime_ns == pymtime_ns
+
+    def hash(self, file):
+        """
+        上次编译时file的内容hash
+        """
+        entry = self.files.get(str(file))
+        return entry[3] if entry else None
+
+    def record(self, file, st, hash, pyfile):
+        """
+        记录编译完成的文件，st是读取源文件之前的文件信息，编译期间源文件被修改时下次仍会重新编译
+        """
+        try:
+            pyst = os.stat(pyfile)
+        except OSError:
+            self.files.pop(str(file), None)
+            return
+        self.files[str(file)] = [st.st_size, st.st_mtime_ns, st.st_ino, hash,
+                                 str(pyfile), pyst.st_size, pyst.st_mtime_ns]
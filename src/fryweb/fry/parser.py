@@ -0,0 +1,930 @@
+"""
+手写的fry递归下降解析器
+
+与fry.ppeg中的语法规则一一对应，生成与parsimonious的grammar.parse()完全相同的语法树
+（节点使用grammar中的表达式对象，起止位置和孩子结构都相同），现有的NodeVisitor无需修改。
+与parsimonious相比：
+* 不使用packrat缓存，每个位置根据当前字符直接选择可能匹配的规则；
+* 元素的开始标签只解析一次，自闭合元素和成对元素共用解析结果；
+* 正则表达式直接使用grammar中编译好的正则，匹配结果是普通的Node而不是RegexNode
+  （没有match属性，也没有__dict__），现有的NodeVisitor都不使用match；
+* 语法树中没有循环引用，解析期间暂停垃圾回收，避免大文件的语法树被反复扫描。
+
+解析失败时使用grammar.parse()重新解析，抛出与parsimonious相同的ParseError。
+配置FRYWEB_PARSER=parsimonious（或fry build --parser parsimonious）时不使用本解析器。
+"""
+import gc
+
+from parsimonious.nodes import Node
+
+from fryweb.fry.grammar import grammar
+from fryweb.config import fryconfig
+
+
+class FryParser(object):
+    def __init__(self, grammar):
+        self.grammar = grammar
+        g = grammar
+        self.text = ''
+        self.size = 0
+
+        # python部分
+        self.e_fry_script = g['fry_script']
+        self.e_fry_script_item = g['fry_script_item']
+        self.e_inner_fry_script = g['inner_fry_script']
+        self.e_inner_fry_script_item = g['inner_fry_script_item']
+        self.e_py_comment = g['py_comment']
+        self.e_triple_single_quote = g['triple_single_quote']
+        self.e_triple_double_quote = g['triple_double_quote']
+        self.e_single_quote = g['single_quote']
+        self.e_double_quote = g['double_quote']
+        self.e_py_simple_quote = g['py_simple_quote']
+        self.e_js_simple_quote = g['js_simple_quote']
+        self.e_less_than_char = g['less_than_char']
+        self.e_no_component_d_char = g['no_component_d_char']
+        self.e_py_normal_code = g['py_normal_code']
+        self.e_inner_py_normal_code = g['inner_py_normal_code']
+        self.e_inner_fry_brace = g['inner_fry_brace']
+        self.e_fry_embed = g['fry_embed']
+        self.e_space = g['space']
+        self.e_maybe_space = g['maybe_space']
+
+        # 组件
+        self.e_fry_component = g['fry_component']
+        self.e_fry_component_header = g['fry_component_header']
+        self.e_fry_component_name = g['fry_component_name']
+        self.e_fry_web_template = g['fry_web_template']
+        self.e_maybe_web_script = g['maybe_web_script']
+        self.e_web_script = g['web_script']
+
+        # 元素
+        self.e_fry_root_element = g['fry_root_element']
+        self.e_fry_element = g['fry_element']
+        self.e_fry_fragment = g['fry_fragment']
+        self.e_fry_self_closing_element = g['fry_self_closing_element']
+        self.e_fry_void_element = g['fry_void_element']
+        self.e_fry_paired_element = g['fry_paired_element']
+        self.e_fry_start_tag = g['fry_start_tag']
+        self.e_fry_end_tag = g['fry_end_tag']
+        self.e_fry_element_name = g['fry_element_name']
+        self.e_fry_void_element_name = g['fry_void_element_name']
+        self.e_fry_attributes = g['fry_attributes']
+        self.e_fry_spaced_attribute = g['fry_spaced_attribute']
+        self.e_fry_attribute = g['fry_attribute']
+        self.e_same_name_attribute = g['same_name_attribute']
+        self.e_py_identifier = g['py_identifier']
+        self.e_fry_embed_spread_attribute = g['fry_embed_spread_attribute']
+        self.e_fry_kv_attribute = g['fry_kv_attribute']
+        self.e_fry_novalue_attribute = g['fry_novalue_attribute']
+        self.e_fry_attribute_name = g['fry_attribute_name']
+        self.e_fry_attribute_value = g['fry_attribute_value']
+        self.e_fry_children = g['fry_children']
+        self.e_fry_child = g['fry_child']
+        self.e_joint_html_embed = g['joint_html_embed']
+        self.e_joint_embed = g['joint_embed']
+        self.e_bracket_f_string = g['bracket_f_string']
+        self.e_single_f_string = g['single_f_string']
+        self.e_double_f_string = g['double_f_string']
+        self.e_fry_text = g['fry_text']
+        self.e_no_embed_char = g['no_embed_char']
+        self.e_html_comment = g['html_comment']
+
+        # js部分
+        self.e_js_script = g['js_script']
+        self.e_js_script_item = g['js_script_item']
+        self.e_js_embed = g['js_embed']
+        self.e_js_parenthesis = g['js_parenthesis']
+        self.e_js_brace = g['js_brace']
+        self.e_js_single_line_comment = g['js_single_line_comment']
+        self.e_js_multi_line_comment = g['js_multi_line_comment']
+        self.e_js_regexp = g['js_regexp']
+        self.e_js_template_simple = g['js_template_simple']
+        self.e_js_template_normal = g['js_template_normal']
+        self.e_js_template_head = g['js_template_head']
+        self.e_js_template_middle_scripts = g['js_template_middle_scripts']
+        self.e_js_template_middle_script = g['js_template_middle_script']
+        self.e_js_template_middle = g['js_template_middle']
+        self.e_js_template_tail = g['js_template_tail']
+        self.e_js_static_import = g['js_static_import']
+        self.e_js_simple_static_import = g['js_simple_static_import']
+        self.e_js_normal_static_import = g['js_normal_static_import']
+        self.e_js_import_identifiers = g['js_import_identifiers']
+        self.e_js_other_import_identifiers = g['js_other_import_identifiers']
+        self.e_js_other_import_identifier = g['js_other_import_identifier']
+        self.e_js_import_identifier = g['js_import_identifier']
+        self.e_js_identifier = g['js_identifier']
+        self.e_js_namespace_import_identifier = g['js_namespace_import_identifier']
+        self.e_js_named_import_identifiers = g['js_named_import_identifiers']
+        self.e_js_other_named_import_identifiers = g['js_other_named_import_identifiers']
+        self.e_js_other_named_import_identifier = g['js_other_named_import_identifier']
+        self.e_js_named_import_identifier = g['js_named_import_identifier']
+        self.e_js_identifier_with_alias = g['js_identifier_with_alias']
+        self.e_js_normal_code = g['js_normal_code']
+        self.e_no_comment_slash_char = g['no_comment_slash_char']
+        self.e_no_script_less_than_char = g['no_script_less_than_char']
+        self.e_no_import_i_char = g['no_import_i_char']
+
+        # 规则中的匿名表达式（字面量、正则和前瞻）
+        self.m_inner_fry_brace = self.e_inner_fry_brace.members
+        self.m_fry_embed = self.e_fry_embed.members
+        self.m_fry_component_header = self.e_fry_component_header.members
+        self.m_fry_web_template = self.e_fry_web_template.members
+        self.m_fry_fragment = self.e_fry_fragment.members
+        self.m_fry_self_closing_element = self.e_fry_self_closing_element.members
+        self.m_fry_void_element = self.e_fry_void_element.members
+        self.m_fry_start_tag = self.e_fry_start_tag.members
+        self.m_fry_end_tag = self.e_fry_end_tag.members
+        self.m_fry_element_name = self.e_fry_element_name.members
+        self.void_names = [(m, m.literal) for m in self.e_fry_void_element_name.members]
+        self.m_same_name_attribute = self.e_same_name_attribute.members
+        self.m_fry_embed_spread_attribute = self.e_fry_embed_spread_attribute.members
+        self.m_fry_kv_attribute = self.e_fry_kv_attribute.members
+        self.m_fry_novalue_attribute = self.e_fry_novalue_attribute.members
+        self.m_joint_html_embed = self.e_joint_html_embed.members
+        self.m_bracket_f_string = self.e_bracket_f_string.members
+        self.m_single_f_string = self.e_single_f_string.members
+        self.m_double_f_string = self.e_double_f_string.members
+        self.m_html_comment = self.e_html_comment.members
+        self.m_web_script = self.e_web_script.members
+        self.m_js_embed = self.e_js_embed.members
+        self.m_js_parenthesis = self.e_js_parenthesis.members
+        self.m_js_brace = self.e_js_brace.members
+        self.m_js_multi_line_comment = self.e_js_multi_line_comment.members
+        self.m_js_simple_static_import = self.e_js_simple_static_import.members
+        self.m_js_normal_static_import = self.e_js_normal_static_import.members
+        self.m_js_other_import_identifier = self.e_js_other_import_identifier.members
+        self.m_js_namespace_import_identifier = self.e_js_namespace_import_identifier.members
+        self.m_js_named_import_identifiers = self.e_js_named_import_identifiers.members
+        self.m_js_other_named_import_identifier = self.e_js_other_named_import_identifier.members
+        self.m_js_identifier_with_alias = self.e_js_identifier_with_alias.members
+
+        # f-string的三种形式：(字符串表达式成员, body, item, simple)
+        self.f_strings = {
+            "'": (self.m_single_f_string, g['single_f_string_body'],
+                  g['single_f_string_item'], g['single_simple_f_string']),
+            '"': (self.m_double_f_string, g['double_f_string_body'],
+                  g['double_f_string_item'], g['double_simple_f_string']),
+            '[': (self.m_bracket_f_string, g['bracket_f_string_body'],
+                  g['bracket_f_string_item'], g['bracket_simple_f_string']),
+        }
+
+        self.ws = self.e_maybe_space.re.match
+
+    def parse(self, text):
+        """
+        解析fry源码，返回与grammar.parse(text)相同的语法树
+        """
+        self.text = text
+        self.size = len(text)
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            node = self.fry_script(0)
+        finally:
+            self.text = ''
+            if enabled:
+                gc.enable()
+        if node.end == len(text):
+            return node
+        # 由parsimonious给出一致的错误信息
+        return self.grammar.parse(text)
+
+    # 通用匹配
+
+    def regex(self, expr, pos):
+        m = expr.re.match(self.text, pos)
+        if m is None:
+            return None
+        return Node(expr, self.text, pos, m.end())
+
+    def literal(self, expr, pos):
+        if self.text.startswith(expr.literal, pos):
+            return Node(expr, self.text, pos, pos + len(expr.literal))
+        return None
+
+    def maybe_space(self, pos):
+        return Node(self.e_maybe_space, self.text, pos, self.ws(self.text, pos).end())
+
+    def one_of(self, expr, node):
+        return Node(expr, self.text, node.start, node.end, [node])
+
+    def sequence(self, expr, pos, parts):
+        """
+        依次匹配parts中的(表达式, 匹配函数)，匹配函数为None时按表达式类型匹配
+        """
+        children = []
+        p = pos
+        for e, fn in parts:
+            if fn is None:
+                node = self.literal(e, p) if hasattr(e, 'literal') else self.regex(e, p)
+            else:
+                node = fn(p)
+            if node is None:
+                return None
+            children.append(node)
+            p = node.end
+        return Node(expr, self.text, pos, p, children)
+
+    def repeat(self, expr, pos, fn):
+        text = self.text
+        size = self.size
+        children = []
+        p = pos
+        while p < size:
+            node = fn(p)
+            if node is None:
+                break
+            children.append(node)
+            p = node.end
+        return Node(expr, text, pos, p, children)
+
+    def simple_quote(self, pos, expr):
+        text = self.text
+        c = text[pos]
+        if c == "'":
+            node = self.regex(self.e_single_quote, pos)
+        elif c == '"':
+            node = self.regex(self.e_double_quote, pos)
+        else:
+            return None
+        if node is None:
+            return None
+        return Node(expr, text, pos, node.end, [node])
+
+    # python部分
+
+    def fry_script(self, pos):
+        text = self.text
+        size = self.size
+        item = self.e_fry_script_item
+        children = []
+        p = pos
+        while p < size:
+            node = self.fry_script_alt(p)
+            if node is None:
+                break
+            children.append(Node(item, text, p, node.end, [node]))
+            p = node.end
+        return Node(self.e_fry_script, text, pos, p, children)
+
+    def fry_script_alt(self, pos):
+        text = self.text
+        c = text[pos]
+        if c == '#':
+            return self.regex(self.e_py_comment, pos)
+        elif c == "'":
+            node = self.regex(self.e_triple_single_quote, pos)
+            return node if node is not None else self.simple_quote(pos, self.e_py_simple_quote)
+        elif c == '"':
+            node = self.regex(self.e_triple_double_quote, pos)
+            return node if node is not None else self.simple_quote(pos, self.e_py_simple_quote)
+        elif c == 'd':
+            node = self.fry_component(pos)
+            if node is not None:
+                return node
+            return Node(self.e_no_component_d_char, text, pos, pos + 1)
+        elif c == '<':
+            node = self.fry_element(pos, self.e_fry_element)
+            return node if node is not None else self.regex(self.e_less_than_char, pos)
+        else:
+            return self.regex(self.e_py_normal_code, pos)
+
+    def inner_fry_script(self, pos):
+        text = self.text
+        size = self.size
+        item = self.e_inner_fry_script_item
+        children = []
+        p = pos
+        while p < size:
+            node = self.inner_fry_script_alt(p)
+            if node is None:
+                break
+            children.append(Node(item, text, p, node.end, [node]))
+            p = node.end
+        return Node(self.e_inner_fry_script, text, pos, p, children)
+
+    def inner_fry_script_alt(self, pos):
+        c = self.text[pos]
+        if c == '#':
+            return self.regex(self.e_py_comment, pos)
+        elif c == '{':
+            return self.brace(pos, self.e_inner_fry_brace, self.m_inner_fry_brace)
+        elif c == '}':
+            return None
+        elif c == "'":
+            node = self.regex(self.e_triple_single_quote, pos)
+            return node if node is not None else self.simple_quote(pos, self.e_py_simple_quote)
+        elif c == '"':
+            node = self.regex(self.e_triple_double_quote, pos)
+            return node if node is not None else self.simple_quote(pos, self.e_py_simple_quote)
+        elif c == '<':
+            node = self.fry_element(pos, self.e_fry_element)
+            return node if node is not None else self.regex(self.e_less_than_char, pos)
+        else:
+            return self.regex(self.e_inner_py_normal_code, pos)
+
+    def brace(self, pos, expr, members):
+        """
+        inner_fry_brace和fry_embed: '{' inner_fry_script '}'
+        """
+        text = self.text
+        if not text.startswith('{', pos):
+            return None
+        body = self.inner_fry_script(pos + 1)
+        p = body.end
+        if not text.startswith('}', p):
+            return None
+        return Node(expr, text, pos, p + 1, [
+            Node(members[0], text, pos, pos + 1),
+            body,
+            Node(members[2], text, p, p + 1),
+        ])
+
+    def fry_embed(self, pos):
+        return self.brace(pos, self.e_fry_embed, self.m_fry_embed)
+
+    # 组件
+
+    def fry_component(self, pos):
+        header = self.fry_component_header(pos)
+        if header is None:
+            return None
+        script = self.inner_fry_script(header.end)
+        template = self.fry_web_template(script.end)
+        if template is None:
+            return None
+        web_script = self.maybe_web_script(template.end)
+        return Node(self.e_fry_component, self.text, pos, web_script.end,
+                    [header, script, template, web_script])
+
+    def fry_component_header(self, pos):
+        text = self.text
+        m_def, _space, _name, lookahead = self.m_fry_component_header
+        m = m_def.re.match(text, pos)
+        if m is None:
+            return None
+        p1 = m.end()
+        m = self.e_space.re.match(text, p1)
+        if m is None:
+            return None
+        p2 = m.end()
+        m = self.e_fry_component_name.re.match(text, p2)
+        if m is None:
+            return None
+        p3 = m.end()
+        if not text.startswith('(', self.ws(text, p3).end()):
+            return None
+        return Node(self.e_fry_component_header, text, pos, p3, [
+            Node(m_def, text, pos, p1),
+            Node(self.e_space, text, p1, p2),
+            Node(self.e_fry_component_name, text, p2, p3),
+            Node(lookahead, text, p3, p3),
+        ])
+
+    def fry_web_template(self, pos):
+        text = self.text
+        start, _ms1, _root, _ms2, end = self.m_fry_web_template
+        if not text.startswith('<template>', pos):
+            return None
+        p = pos + 10
+        ms1 = self.maybe_space(p)
+        root = self.fry_element(ms1.end, self.e_fry_root_element)
+        if root is None:
+            return None
+        ms2 = self.maybe_space(root.end)
+        p = ms2.end
+        if not text.startswith('</template>', p):
+            return None
+        return Node(self.e_fry_web_template, text, pos, p + 11, [
+            Node(start, text, pos, pos + 10),
+            ms1, root, ms2,
+            Node(end, text, p, p + 11),
+        ])
+
+    def maybe_web_script(self, pos):
+        node = self.web_script(pos) if pos < self.size else None
+        if node is None:
+            return Node(self.e_maybe_web_script, self.text, pos, pos)
+        return Node(self.e_maybe_web_script, self.text, pos, node.end, [node])
+
+    def web_script(self, pos):
+        text = self.text
+        _ms1, start, _attrs, _ms2, gt, _js, end = self.m_web_script
+        ms1 = self.maybe_space(pos)
+        p = ms1.end
+        if not text.startswith('<script', p):
+            return None
+        start = Node(start, text, p, p + 7)
+        attrs = self.fry_attributes(p + 7)
+        ms2 = self.maybe_space(attrs.end)
+        p = ms2.end
+        if not text.startswith('>', p):
+            return None
+        gt = Node(gt, text, p, p + 1)
+        js = self.js_script(p + 1)
+        p = js.end
+        if not text.startswith('</script>', p):
+            return None
+        return Node(self.e_web_script, text, pos, p + 9, [
+            ms1, start, attrs, ms2, gt, js, Node(end, text, p, p + 9),
+        ])
+
+    # 元素
+
+    def fry_element(self, pos, expr):
+        """
+        fry_element和fry_root_element:
+        fry_fragment / fry_self_closing_element / fry_void_element / fry_paired_element
+        """
+        text = self.text
+        if not text.startswith('<', pos):
+            return None
+        if text.startswith('<>', pos):
+            node = self.fry_fragment(pos)
+            if node is not None:
+                return Node(expr, text, pos, node.end, [node])
+        # 自闭合元素和成对元素的开始标签只解析一次
+        name = self.fry_element_name(pos + 1)
+        if name is not None:
+            attrs = self.fry_attributes(name.end)
+            ms = self.maybe_space(attrs.end)
+            p = ms.end
+            if text.startswith('/>', p):
+                lt, _name, _attrs, _ms, close = self.m_fry_self_closing_element
+                node = Node(self.e_fry_self_closing_element, text, pos, p + 2, [
+                    Node(lt, text, pos, pos + 1), name, attrs, ms,
+                    Node(close, text, p, p + 2),
+                ])
+                return Node(expr, text, pos, node.end, [node])
+        node = self.fry_void_element(pos)
+        if node is not None:
+            return Node(expr, text, pos, node.end, [node])
+        if name is not None and text.startswith('>', p):
+            lt, _name, _attrs, _ms, gt = self.m_fry_start_tag
+            start = Node(self.e_fry_start_tag, text, pos, p + 1, [
+                Node(lt, text, pos, pos + 1), name, attrs, ms,
+                Node(gt, text, p, p + 1),
+            ])
+            children = self.fry_children(p + 1)
+            end = self.fry_end_tag(children.end)
+            if end is not None:
+                node = Node(self.e_fry_paired_element, text, pos, end.end, [start, children, end])
+                return Node(expr, text, pos, node.end, [node])
+        return None
+
+    def fry_fragment(self, pos):
+        text = self.text
+        start, _children, end = self.m_fry_fragment
+        children = self.fry_children(pos + 2)
+        p = children.end
+        if not text.startswith('</>', p):
+            return None
+        return Node(self.e_fry_fragment, text, pos, p + 3, [
+            Node(start, text, pos, pos + 2), children, Node(end, text, p, p + 3),
+        ])
+
+    def fry_void_element(self, pos):
+        text = self.text
+        lt, _name, _attrs, _ms, gt = self.m_fry_void_element
+        name = self.fry_void_element_name(pos + 1)
+        if name is None:
+            return None
+        attrs = self.fry_attributes(name.end)
+        ms = self.maybe_space(attrs.end)
+        p = ms.end
+        if not text.startswith('>', p):
+            return None
+        return Node(self.e_fry_void_element, text, pos, p + 1, [
+            Node(lt, text, pos, pos + 1), name, attrs, ms, Node(gt, text, p, p + 1),
+        ])
+
+    def fry_void_element_name(self, pos):
+        text = self.text
+        for expr, literal in self.void_names:
+            if text.startswith(literal, pos):
+                end = pos + len(literal)
+                return Node(self.e_fry_void_element_name, text, pos, end,
+                            [Node(expr, text, pos, end)])
+        return None
+
+    def fry_end_tag(self, pos):
+        text = self.text
+        start, _name, _ms, gt = self.m_fry_end_tag
+        if not text.startswith('</', pos):
+            return None
+        name = self.fry_element_name(pos + 2)
+        if name is None:
+            return None
+        ms = self.maybe_space(name.end)
+        p = ms.end
+        if not text.startswith('>', p):
+            return None
+        return Node(self.e_fry_end_tag, text, pos, p + 1, [
+            Node(start, text, pos, pos + 2), name, ms, Node(gt, text, p, p + 1),
+        ])
+
+    def fry_element_name(self, pos):
+        text = self.text
+        if text.startswith('script', pos) or text.startswith('template', pos):
+            return None
+        noscript, notemplate, name = self.m_fry_element_name
+        m = name.re.match(text, pos)
+        if m is None:
+            return None
+        end = m.end()
+        return Node(self.e_fry_element_name, text, pos, end, [
+            Node(noscript, text, pos, pos),
+            Node(notemplate, text, pos, pos),
+            Node(name, text, pos, end),
+        ])
+
+    def fry_attributes(self, pos):
+        return self.repeat(self.e_fry_attributes, pos, self.fry_spaced_attribute)
+
+    def fry_spaced_attribute(self, pos):
+        ms = self.maybe_space(pos)
+        attr = self.fry_attribute(ms.end)
+        if attr is None:
+            return None
+        return Node(self.e_fry_spaced_attribute, self.text, pos, attr.end, [ms, attr])
+
+    def fry_attribute(self, pos):
+        text = self.text
+        if pos >= self.size:
+            return None
+        if text[pos] == '{':
+            node = self.same_name_attribute(pos)
+            if node is None:
+                node = self.fry_embed_spread_attribute(pos)
+            if node is None:
+                return None
+            return Node(self.e_fry_attribute, text, pos, node.end, [node])
+        # fry_kv_attribute / fry_novalue_attribute，属性名只匹配一次
+        m = self.e_fry_attribute_name.re.match(text, pos)
+        if m is None:
+            return None
+        nend = m.end()
+        name = Node(self.e_fry_attribute_name, text, pos, nend)
+        ms1 = self.maybe_space(nend)
+        p = ms1.end
+        if text.startswith('=', p):
+            _name, _ms1, eq, _ms2, _value = self.m_fry_kv_attribute
+            ms2 = self.maybe_space(p + 1)
+            value = self.fry_attribute_value(ms2.end)
+            if value is None:
+                # fry_novalue_attribute的否定前瞻也不会成功
+                return None
+            node = Node(self.e_fry_kv_attribute, text, pos, value.end, [
+                name, ms1, Node(eq, text, p, p + 1), ms2, value,
+            ])
+        else:
+            _name, noeq = self.m_fry_novalue_attribute
+            node = Node(self.e_fry_novalue_attribute, text, pos, nend, [
+                name, Node(noeq, text, nend, nend),
+            ])
+        return Node(self.e_fry_attribute, text, pos, node.end, [node])
+
+    def same_name_attribute(self, pos):
+        lb, _ms1, _ident, _ms2, rb = self.m_same_name_attribute
+        return self.sequence(self.e_same_name_attribute, pos, (
+            (lb, None),
+            (self.e_maybe_space, None),
+            (self.e_py_identifier, None),
+            (self.e_maybe_space, None),
+            (rb, None),
+        ))
+
+    def fry_embed_spread_attribute(self, pos):
+        lb, _ms1, stars, _ms2, _script, rb = self.m_fry_embed_spread_attribute
+        return self.sequence(self.e_fry_embed_spread_attribute, pos, (
+            (lb, None),
+            (self.e_maybe_space, None),
+            (stars, None),
+            (self.e_maybe_space, None),
+            (self.e_inner_fry_script, self.inner_fry_script),
+            (rb, None),
+        ))
+
+    def fry_attribute_value(self, pos):
+        text = self.text
+        if pos >= self.size:
+            return None
+        c = text[pos]
+        if c == "'":
+            node = self.f_string(pos, self.e_single_f_string, "'")
+        elif c == '"':
+            node = self.f_string(pos, self.e_double_f_string, '"')
+        elif c == '[':
+            node = self.joint_embed(pos)
+        elif c == '{':
+            node = self.fry_embed(pos)
+        elif c == '(':
+            node = self.js_embed(pos)
+        else:
+            return None
+        if node is None:
+            return None
+        return Node(self.e_fry_attribute_value, text, pos, node.end, [node])
+
+    def f_string(self, pos, expr, quote):
+        """
+        single_f_string/double_f_string/bracket_f_string
+        """
+        text = self.text
+        size = self.size
+        members, body_expr, item_expr, simple = self.f_strings[quote]
+        start, _body, end = members
+        if not text.startswith(start.literal, pos):
+            return None
+        items = []
+        p = pos + 1
+        while p < size:
+            m = simple.re.match(text, p)
+            if m is not None:
+                node = Node(simple, text, p, m.end())
+            elif text.startswith('{{', p):
+                node = Node(item_expr.members[1], text, p, p + 2)
+            elif text.startswith('}}', p):
+                node = Node(item_expr.members[2], text, p, p + 2)
+            else:
+                node = self.fry_embed(p)
+                if node is None:
+                    break
+            items.append(Node(item_expr, text, p, node.end, [node]))
+            p = node.end
+        body = Node(body_expr, text, pos + 1, p, items)
+        if not text.startswith(end.literal, p):
+            return None
+        return Node(expr, text, pos, p + 1, [
+            Node(start, text, pos, pos + 1), body, Node(end, text, p, p + 1),
+        ])
+
+    def bracket_f_string(self, pos):
+        return self.f_string(pos, self.e_bracket_f_string, '[')
+
+    def joint_embed(self, pos):
+        fstring = self.bracket_f_string(pos)
+        if fstring is None:
+            return None
+        ms = self.maybe_space(fstring.end)
+        js = self.js_embed(ms.end)
+        if js is None:
+            return None
+        return Node(self.e_joint_embed, self.text, pos, js.end, [fstring, ms, js])
+
+    def joint_html_embed(self, pos):
+        text = self.text
+        if not text.startswith('!', pos):
+            return None
+        fstring = self.bracket_f_string(pos + 1)
+        if fstring is None:
+            return None
+        ms = self.maybe_space(fstring.end)
+        js = self.js_embed(ms.end)
+        if js is None:
+            return None
+        return Node(self.e_joint_html_embed, text, pos, js.end, [
+            Node(self.m_joint_html_embed[0], text, pos, pos + 1), fstring, ms, js,
+        ])
+
+    def fry_children(self, pos):
+        text = self.text
+        size = self.size
+        item = self.e_fry_child
+        children = []
+        p = pos
+        while p < size:
+            node = self.fry_child_alt(p)
+            if node is None:
+                break
+            children.append(Node(item, text, p, node.end, [node]))
+            p = node.end
+        return Node(self.e_fry_children, text, pos, p, children)
+
+    def fry_child_alt(self, pos):
+        text = self.text
+        c = text[pos]
+        if c == '!':
+            node = self.joint_html_embed(pos)
+        elif c == '[':
+            node = self.joint_embed(pos)
+        elif c == '{':
+            node = self.fry_embed(pos)
+        elif c == '<':
+            node = None
+            if text.startswith('<!--', pos):
+                node = self.html_comment(pos)
+            if node is None:
+                node = self.fry_element(pos, self.e_fry_element)
+            return node
+        elif c == '>':
+            return None
+        elif c in '}]':
+            node = None
+        else:
+            return self.regex(self.e_fry_text, pos)
+        if node is None:
+            node = Node(self.e_no_embed_char, text, pos, pos + 1)
+        return node
+
+    def html_comment(self, pos):
+        start, body, end = self.m_html_comment
+        return self.sequence(self.e_html_comment, pos, ((start, None), (body, None), (end, None)))
+
+    # js部分
+
+    def js_script(self, pos):
+        text = self.text
+        size = self.size
+        item = self.e_js_script_item
+        children = []
+        p = pos
+        while p < size:
+            node = self.js_script_alt(p)
+            if node is None:
+                break
+            children.append(Node(item, text, p, node.end, [node]))
+            p = node.end
+        return Node(self.e_js_script, text, pos, p, children)
+
+    def js_script_alt(self, pos):
+        text = self.text
+        c = text[pos]
+        if c == '/':
+            if text.startswith('//', pos):
+                return self.regex(self.e_js_single_line_comment, pos)
+            if text.startswith('/*', pos):
+                node = self.js_multi_line_comment(pos)
+                if node is not None:
+                    return node
+            node = self.regex(self.e_js_regexp, pos)
+            return node if node is not None else self.regex(self.e_no_comment_slash_char, pos)
+        elif c == "'" or c == '"':
+            return self.simple_quote(pos, self.e_js_simple_quote)
+        elif c == '`':
+            node = self.regex(self.e_js_template_simple, pos)
+            return node if node is not None else self.js_template_normal(pos)
+        elif c == '(':
+            return self.js_pair(pos, self.e_js_parenthesis, self.m_js_parenthesis, '(', ')')
+        elif c == '{':
+            return self.js_pair(pos, self.e_js_brace, self.m_js_brace, '{', '}')
+        elif c == 'i':
+            node = self.js_static_import(pos)
+            return node if node is not None else Node(self.e_no_import_i_char, text, pos, pos + 1)
+        elif c == '<':
+            return self.regex(self.e_no_script_less_than_char, pos)
+        elif c == ')' or c == '}':
+            return None
+        else:
+            return self.regex(self.e_js_normal_code, pos)
+
+    def js_pair(self, pos, expr, members, left, right):
+        """
+        js_embed/js_parenthesis/js_brace: left js_script right
+        """
+        text = self.text
+        if not text.startswith(left, pos):
+            return None
+        script = self.js_script(pos + 1)
+        p = script.end
+        if not text.startswith(right, p):
+            return None
+        return Node(expr, text, pos, p + 1, [
+            Node(members[0], text, pos, pos + 1), script, Node(members[2], text, p, p + 1),
+        ])
+
+    def js_embed(self, pos):
+        return self.js_pair(pos, self.e_js_embed, self.m_js_embed, '(', ')')
+
+    def js_multi_line_comment(self, pos):
+        start, body, end = self.m_js_multi_line_comment
+        return self.sequence(self.e_js_multi_line_comment, pos, ((start, None), (body, None), (end, None)))
+
+    def js_template_normal(self, pos):
+        text = self.text
+        head = self.regex(self.e_js_template_head, pos)
+        if head is None:
+            return None
+        script = self.js_script(head.end)
+        middles = self.repeat(self.e_js_template_middle_scripts, script.end, self.js_template_middle_script)
+        tail = self.regex(self.e_js_template_tail, middles.end)
+        if tail is None:
+            return None
+        return Node(self.e_js_template_normal, text, pos, tail.end, [head, script, middles, tail])
+
+    def js_template_middle_script(self, pos):
+        middle = self.regex(self.e_js_template_middle, pos)
+        if middle is None:
+            return None
+        script = self.js_script(middle.end)
+        return Node(self.e_js_template_middle_script, self.text, pos, script.end, [middle, script])
+
+    def js_quote(self, pos):
+        return self.simple_quote(pos, self.e_js_simple_quote) if pos < self.size else None
+
+    def js_static_import(self, pos):
+        m_import, _ms, _quote, m_spaces, m_ends = self.m_js_simple_static_import
+        node = self.sequence(self.e_js_simple_static_import, pos, (
+            (m_import, None),
+            (self.e_maybe_space, None),
+            (self.e_js_simple_quote, self.js_quote),
+            (m_spaces, None),
+            (m_ends, None),
+        ))
+        if node is None:
+            m_import, _ms1, _ids, _ms2, m_from, _ms3, _quote, m_spaces, m_ends = self.m_js_normal_static_import
+            node = self.sequence(self.e_js_normal_static_import, pos, (
+                (m_import, None),
+                (self.e_maybe_space, None),
+                (self.e_js_import_identifiers, self.js_import_identifiers),
+                (self.e_maybe_space, None),
+                (m_from, None),
+                (self.e_maybe_space, None),
+                (self.e_js_simple_quote, self.js_quote),
+                (m_spaces, None),
+                (m_ends, None),
+            ))
+        if node is None:
+            return None
+        return Node(self.e_js_static_import, self.text, pos, node.end, [node])
+
+    def js_import_identifiers(self, pos):
+        first = self.js_import_identifier(pos)
+        if first is None:
+            return None
+        others = self.repeat(self.e_js_other_import_identifiers, first.end, self.js_other_import_identifier)
+        return Node(self.e_js_import_identifiers, self.text, pos, others.end, [first, others])
+
+    def js_other_import_identifier(self, pos):
+        _ms1, comma, _ms2, _ident = self.m_js_other_import_identifier
+        return self.sequence(self.e_js_other_import_identifier, pos, (
+            (self.e_maybe_space, None),
+            (comma, None),
+            (self.e_maybe_space, None),
+            (self.e_js_import_identifier, self.js_import_identifier),
+        ))
+
+    def js_import_identifier(self, pos):
+        node = self.regex(self.e_js_identifier, pos)
+        if node is None:
+            star, _ms, m_as, _space, _ident = self.m_js_namespace_import_identifier
+            node = self.sequence(self.e_js_namespace_import_identifier, pos, (
+                (star, None),
+                (self.e_maybe_space, None),
+                (m_as, None),
+                (self.e_space, None),
+                (self.e_js_identifier, None),
+            ))
+        if node is None:
+            lb, _ms1, _ident, _others, _ms2, rb = self.m_js_named_import_identifiers
+            node = self.sequence(self.e_js_named_import_identifiers, pos, (
+                (lb, None),
+                (self.e_maybe_space, None),
+                (self.e_js_named_import_identifier, self.js_named_import_identifier),
+                (self.e_js_other_named_import_identifiers, self.js_other_named_import_identifiers),
+                (self.e_maybe_space, None),
+                (rb, None),
+            ))
+        if node is None:
+            return None
+        return Node(self.e_js_import_identifier, self.text, pos, node.end, [node])
+
+    def js_other_named_import_identifiers(self, pos):
+        return self.repeat(self.e_js_other_named_import_identifiers, pos, self.js_other_named_import_identifier)
+
+    def js_other_named_import_identifier(self, pos):
+        _ms1, comma, _ms2, _ident = self.m_js_other_named_import_identifier
+        return self.sequence(self.e_js_other_named_import_identifier, pos, (
+            (self.e_maybe_space, None),
+            (comma, None),
+            (self.e_maybe_space, None),
+            (self.e_js_named_import_identifier, self.js_named_import_identifier),
+        ))
+
+    def js_named_import_identifier(self, pos):
+        _ident1, _space1, m_as, _space2, _ident2 = self.m_js_identifier_with_alias
+        node = self.sequence(self.e_js_identifier_with_alias, pos, (
+            (self.e_js_identifier, None),
+            (self.e_space, None),
+            (m_as, None),
+            (self.e_space, None),
+            (self.e_js_identifier, None),
+        ))
+        if node is None:
+            node = self.regex(self.e_js_identifier, pos)
+        if node is None:
+            return None
+        return Node(self.e_js_named_import_identifier, self.text, pos, node.end, [node])
+
+
+parser = FryParser(grammar)
+
+
+def parse(text):
+    """
+    解析fry源码，结果与grammar.parse(text)相同。
+    配置FRYWEB_PARSER=parsimonious时直接使用grammar.parse
+    """
+    if fryconfig.snapshot().parser == 'parsimonious':
+        return grammar.parse(text)
+    return parser.parse(text)
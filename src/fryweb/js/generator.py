@@ -39,7 +39,7 @@ export const setup = async function () {{
 """
 
 def get_setup_name_and_path(file):
-    root_dir = fryconfig.build_root
+    root_dir = fryconfig.snapshot().build_root
     f = file.relative_to(root_dir)
     suffix_len = len(f.suffix)
     path = f.as_posix()[:-suffix_len]
@@ -52,7 +52,7 @@ def get_setup_name_and_path(file):
     return sname, spath
 
 def compose_index(src):
-    dest = fryconfig.build_root / 'index.js'
+    dest = fryconfig.snapshot().build_root / 'index.js'
     output = []
     names = []
     for file in src:
@@ -60,8 +60,9 @@ def compose_index(src):
         output.append(f'import {{ setup as {name} }} from "{path}";')
         names.append(name)
     output.append(f'let setups = {{ {", ".join(names)} }};')
-    output.append('import { hydrate as hydrate_with_setups } from "fryweb";')
+    output.append('import { hydrate as hydrate_with_setups, remote as remote_with_setups } from "fryweb";')
     output.append('export const hydrate = async (rootElement) => await hydrate_with_setups(rootElement, setups);')
+    output.append('export const remote = (url, csrftoken) => remote_with_setups(url, setups, csrftoken);')
     output = '\n'.join(output)
     with dest.open('w', encoding='utf-8') as f:
         f.write(output)
@@ -85,10 +86,20 @@ class JsGenerator(BaseGenerator):
         self.dependencies = set()
 
     def generate(self, tree, hash, curr_root, curr_file):
+        self.prepare(hash, curr_root, curr_file)
+        self.visit(tree)
+        return self.write()
+
+    def prepare(self, hash, curr_root, curr_file):
+        """
+        开始编译一个文件，之后由visit或MultiVisitor遍历语法树
+        """
+        self.hash = hash
+        self.curr_file = curr_file
         self.curr_root = curr_root
         self.curr_dir = curr_file.parent
         self.relative_dir = self.curr_dir.relative_to(curr_root)
-        self.js_dir = fryconfig.build_root / self.relative_dir
+        self.js_dir = fryconfig.snapshot().build_root / self.relative_dir
         self.js_dir.mkdir(parents=True, exist_ok=True)
         for file in self.js_dir.glob(f'{curr_file.stem}@[A-Z]*.js'):
             file.unlink(missing_ok=True)
@@ -99,8 +110,14 @@ class JsGenerator(BaseGenerator):
         self.refs = set()
         self.refalls = set()
         self.static_imports = []
-        self.visit(tree)
-
+        self.file_dependencies = set()
+
+    def write(self):
+        """
+        写入遍历语法树得到的各个web组件的js文件，返回web组件数量
+        """
+        hash = self.hash
+        curr_file = self.curr_file
         for c in self.web_components:
             name = c['name']
             args = c['args']
@@ -118,21 +135,21 @@ class JsGenerator(BaseGenerator):
             deps = set()
             for dir, root in self.dependencies:
                 for f in dir.rglob('*.[jt]s'):
-                    if f.is_relative_to(fryconfig.build_root):
+                    if f.is_relative_to(fryconfig.snapshot().build_root):
                         continue
                     if is_componentjs(f):
                         continue
                     p = f.parent.relative_to(root)
                     deps.add((f, p))
             for file, path in deps:
-                p = fryconfig.build_root / path
+                p = fryconfig.snapshot().build_root / path
                 p.mkdir(parents=True, exist_ok=True)
                 shutil.copy(file, p)
-        src = list(get_componentjs(fryconfig.build_root))
+        src = list(get_componentjs(fryconfig.snapshot().build_root))
         if not src:
             return
         entry_point = compose_index(src) 
-        outfile = fryconfig.js_file
+        outfile = fryconfig.snapshot().js_file
         this = Path(__file__).absolute().parent
         bun = this / 'bun' 
         env = os.environ.copy()
@@ -169,8 +186,18 @@ class JsGenerator(BaseGenerator):
         if jsmodule[0] in "'\"":
             jsmodule = jsmodule[1:-1]
         if jsmodule.startswith('./'):
-            self.dependencies.add((self.curr_dir, self.curr_root))
+            self.add_dependency('.')
         elif jsmodule.startswith('../'):
+            self.add_dependency('..')
+
+    def add_dependency(self, relative):
+        """
+        当前文件引用了所在目录('.')或上级目录('..')中的js文件，打包时需要复制这些文件
+        """
+        self.file_dependencies.add(relative)
+        if relative == '.':
+            self.dependencies.add((self.curr_dir, self.curr_root))
+        else:
             self.dependencies.add((self.curr_dir.parent.absolute(), self.curr_root))
 
     def generic_visit(self, node, children):
@@ -1,16 +1,30 @@
-from fryweb.element import Element, component_id_attr_name, component_name_attr_name, children_attr_name, type_attr_name
+from fryweb.element import BaseElement, Element, RenderedElement, Stream, Pending, Resolving, deferred_attr_name, component_id_attr_name, component_name_attr_name, payload_attr_name, children_attr_name, type_attr_name
 from fryweb.utils import static_url
 from fryweb.config import fryconfig
-from importlib import import_module
+from fryweb.registry import registry
+from fryweb.profile import current_profiler, phase, iter_phase
+from functools import lru_cache
+import asyncio
 import json
 
 class Page(object):
-    def __init__(self):
+    def __init__(self, defer=False):
         # 记录当前已经处理的组件script元素列表，列表长度是当前正在处理的组件的ID
         self.components = {}
         # 组件实例ID到子组件引用/引用列表的映射关系, cid -> (refname -> childcid | list of childcid)
         self.cid2childrefs = {}
         self.hasjs = False
+        # 是否允许延迟渲染，以及页面上的延迟渲染边界列表，编号为列表下标+1
+        self.defer = defer
+        self.deferred = []
+        # 是否异步渲染(arender)，异步渲染的页面中流式孩子里可以有async def组件
+        self.aio = False
+        # 性能分析，只在profile()中创建的页面上记录
+        self.profiler = current_profiler.get()
+
+    def add_deferred(self, suspense):
+        self.deferred.append(suspense)
+        return len(self.deferred)
 
     def add_component(self, component):
         cid = len(self.components) + 1
@@ -37,47 +51,156 @@ class Page(object):
             else:
                 if len(ids) != 1:
                     raise RuntimeError(f"More than ONE ref value for '{name}'.")
-                refs[name] = ids.pop()
+                refs[name] = next(iter(ids))
         return refs
 
 
-def render(element, **kwargs):
-    page = Page()
-    if isinstance(element, Element):
-        element = element.render(page)
+def page_element(element, kwargs):
+    """
+    将render的参数转化为待渲染的元素
+    """
+    if isinstance(element, BaseElement):
+        return element
     elif callable(element) and getattr(element, '__name__', 'anonym')[0].isupper():
-        element = Element(element, kwargs).render(page)
+        return Element(element, kwargs)
     elif isinstance(element, str):
         if '.' in element:
-            module, _, comp = element.rpartition('.')
-            module = import_module(module)
-            component = getattr(module, comp)
-            if callable(component) and comp[0].isupper():
-                element = Element(component, kwargs).render(page)
+            component = registry.resolve(element)
+            if component is not None:
+                return Element(component, kwargs)
         elif element and element[0].islower():
-            element = Element(element, kwargs).render(page)
+            return Element(element, kwargs)
     return element
 
 
-def html(content='div',
-         args={},
-         title='',
-         lang='en',
-         rootclass='',
-         charset='utf-8',
-         viewport="width=device-width, initial-scale=1.0",
-         metas={},
-         properties={},
-         equivs={},
-         autoreload=True,
-        ):
+def render_on(page, element, kwargs):
+    """
+    在指定的page中渲染元素
+    """
+    element = page_element(element, kwargs)
+    if isinstance(element, BaseElement):
+        element = element.render(page)
+    return element
+
+
+def render(element, **kwargs):
+    return render_on(Page(), element, kwargs)
+
+
+def render_many(items, page=None):
+    """
+    在同一个page中依次渲染多个(element, kwargs)，返回渲染结果列表。
+    所有结果中的组件实例ID互不重复，可以在同一个页面中一起水合
+    """
+    if page is None:
+        page = Page()
+    return [render_on(page, element, kwargs) for element, kwargs in items]
+
+
+def render_bytes(element, **kwargs):
+    """
+    渲染元素并直接序列化为utf-8编码的bytearray
+    """
+    element = render(element, **kwargs)
+    if isinstance(element, BaseElement):
+        return element.to_bytes()
+    return bytearray(str(element).encode())
+
+
+async def arender_on(page, element, kwargs):
+    """
+    render_on的异步版本
+    """
+    element = page_element(element, kwargs)
+    if isinstance(element, BaseElement):
+        element = await element.arender(page)
+    return element
+
+
+async def arender(element, **kwargs):
+    """
+    render的异步版本，元素树中可以有async def组件，兄弟组件并发执行
+    """
+    return await arender_on(Page(), element, kwargs)
+
+
+def html_head(title='',
+              lang='en',
+              rootclass='',
+              charset='utf-8',
+              viewport="width=device-width, initial-scale=1.0",
+              metas={},
+              properties={},
+              equivs={},
+             ):
+    """
+    生成html文档从开头到</head>的部分，这部分不依赖页面内容的渲染结果
+    """
     sep = '\n    '
-    main_content = render(content, **args)
-    page = main_content.page
-    if main_content.name == 'body':
-        body = main_content
+    metas = sep.join(f'<meta name="{name}" content="{value}">'
+                       for name, value in metas.items())
+    properties = sep.join(f'<meta property="{property}" content="{value}">'
+                            for property, value in properties.items())
+    equivs = sep.join(f'<meta http-equiv="{equiv}" content="{value}">'
+                            for equiv, value in equivs.items())
+    # no need to use importmap
+    #importmap = f'''
+    #<script type="importmap">
+    #  {{
+    #    "imports": {{
+    #      "fryweb": "{static_url('js/fryweb.js')}"
+    #    }}
+    #  }}
+    #</script>
+    #'''
+
+    if rootclass:
+        rootclass = f' class="{rootclass}"'
     else:
-        body = Element('body', dict(children=[main_content]), True)
+        rootclass = ''
+
+    return f'''\
+<!DOCTYPE html>
+<html lang={lang}{rootclass}>
+  <head>
+    <meta charset="{charset}">
+    <title>{title}</title>
+    <meta name="viewport" content="{viewport}">
+    {metas}
+    {properties}
+    {equivs}
+    <link rel="stylesheet" href="{static_url(fryconfig.snapshot().css_url)}">
+  </head>
+  '''
+
+html_tail = '''
+</html>
+'''
+
+
+def html_body(content='div', args={}, autoreload=True):
+    """
+    渲染页面内容，返回附加了组件信息脚本、水合脚本和自动刷新脚本的body元素
+    """
+    autoreload = autoreload_script() if fryconfig.snapshot().debug and autoreload else None
+    return page_body(render(content, **args), hydrate_script(), autoreload)
+
+
+async def ahtml_body(content='div', args={}, autoreload=True):
+    """
+    html_body的异步版本
+    """
+    autoreload = autoreload_script() if fryconfig.snapshot().debug and autoreload else None
+    return page_body(await arender(content, **args), hydrate_script(), autoreload)
+
+
+def page_scripts(page, hydrate):
+    """
+    生成页面的组件信息脚本和水合脚本
+    """
+    if fryconfig.snapshot().compact_payload:
+        yield from compact_scripts(page, hydrate)
+        return
     components = []
     for c in page.components.values():
         scriptprops = {
@@ -88,25 +211,55 @@ def html(content='div',
         content = {}
         if 'setup' in c:
             content['setup'] = c['setup']
-            content['refs'] = c['refs']
+            # 子组件可能在序列化时才渲染，引用关系在这里重新获取
+            content['refs'] = page.child_refs(c['cid'])
             content['args'] = c['args']
         scriptprops[children_attr_name] = [json.dumps(content)]
-        comp = Element('script', scriptprops, True)
+        comp = RenderedElement('script', scriptprops)
         components.append(comp)
     if components:
-        components = Element('div', dict(style=dict(display='none'), children=components), True)
-        body.props[children_attr_name].append(components)
+        yield RenderedElement('div', dict(style=dict(display='none'), children=components))
     if page.hasjs:
-        # 此时必定存在js_url
-        script = f"""
-      const {{ hydrate }} = await import("{static_url(fryconfig.js_url)}");
+        yield hydrate
+
+
+def compact_scripts(page, hydrate):
+    """
+    紧凑模式：所有有js的组件的水合数据以cid为key合并为一个json，只需解析一次
+    """
+    payload = {}
+    for c in page.components.values():
+        if 'setup' in c:
+            payload[c['cid']] = {
+                'name': c['name'],
+                'setup': c['setup'],
+                'refs': page.child_refs(c['cid']),
+                'args': c['args'],
+            }
+    if payload:
+        # 避免json中的'</script>'提前结束脚本
+        content = json.dumps(payload, separators=(',', ':')).replace('</', '<\\/')
+        yield RenderedElement('script', {
+            type_attr_name: 'application/json',
+            payload_attr_name: True,
+            children_attr_name: [content],
+        })
+    if page.hasjs:
+        yield hydrate
+
+
+def hydrate_script():
+    # 页面有js时才输出，此时必定存在js_url。
+    # async的内联模块脚本加载完成即执行，不等待页面解析完成，水合不等待延迟内容
+    script = f"""
+      const {{ hydrate }} = await import("{static_url(fryconfig.snapshot().js_url)}");
       await hydrate(document.documentElement);
 """
-        hydrate_script = Element('script', dict(type='module', children=[script]), True)
-        body.props[children_attr_name].append(hydrate_script)
+    return RenderedElement('script', {type_attr_name: 'module', 'async': True, children_attr_name: [script]})
 
-    if fryconfig.debug and autoreload:
-        script = f"""
+
+def autoreload_script():
+    script = f"""
       let serverId = null;
       let eventSource = null;
       let timeoutId = null;
@@ -114,7 +267,7 @@ def html(content='div',
           if (timeoutId !== null) clearTimeout(timeoutId);
           timeoutId = setTimeout(checkAutoReload, 1000);
           if (eventSource !== null) eventSource.close();
-          eventSource = new EventSource("{fryconfig.check_reload_url}");
+          eventSource = new EventSource("{fryconfig.snapshot().check_reload_url}");
           eventSource.addEventListener('open', () => {{
               console.log(new Date(), "Auto reload connected.");
               if (timeoutId !== null) clearTimeout(timeoutId);
@@ -136,43 +289,383 @@ def html(content='div',
       }}
       checkAutoReload();
 """
-        autoreload = Element('script', dict(type='module', children=[script]), True)
-        body.props[children_attr_name].append(autoreload)
+    return RenderedElement('script', dict(type='module', children=[script]))
 
-    metas = sep.join(f'<meta name="{name}" content="{value}">'
-                       for name, value in metas.items())
-    properties = sep.join(f'<meta property="{property}" content="{value}">'
-                            for property, value in properties.items())
-    equivs = sep.join(f'<meta http-equiv="{equiv}" content="{value}">'
-                            for equiv, value in equivs.items())
-    # no need to use importmap
-    #importmap = f'''
-    #<script type="importmap">
-    #  {{
-    #    "imports": {{
-    #      "fryweb": "{static_url('js/fryweb.js')}"
-    #    }}
-    #  }}
-    #</script>
-    #'''
 
-    if rootclass:
-        rootclass = f' class="{rootclass}"'
+# 用延迟内容替换占位元素，替换后通知已经完成水合的页面水合新内容
+# 替换占位元素，替换后的内容和其中组件的水合数据放入$frySwaps队列，
+# 由fryweb.js在页面水合完成后依次水合
+swap_script = """\
+function $frySwap(id, data) {
+  const t = document.querySelector(`template[data-frydeferred="${id}"]`);
+  const p = document.querySelector(`[data-frysuspense="${id}"]`);
+  if (!t || !p) return;
+  const roots = [...t.content.children];
+  for (const root of roots) root.fryswapped = true;
+  p.replaceWith(t.content);
+  t.remove();
+  (window.$frySwaps = window.$frySwaps || []).push({roots, data});
+  document.dispatchEvent(new CustomEvent('fryswap'));
+}"""
+
+
+def deferred_payload(page, base):
+    """
+    延迟内容中组件的水合数据：实例ID大于base的组件，以cid为key
+    """
+    payload = {}
+    for cid in range(base + 1, len(page.components) + 1):
+        c = page.components[cid]
+        data = {'name': c['name']}
+        if 'setup' in c:
+            data['setup'] = c['setup']
+            data['refs'] = page.child_refs(cid)
+            data['args'] = c['args']
+        payload[cid] = data
+    # 避免json中的'</script>'提前结束脚本
+    return json.dumps(payload, separators=(',', ':')).replace('</', '<\\/')
+
+
+def deferred_content(page, hydrate=None):
+    """
+    渲染页面上的延迟内容，每段内容以<template>输出，紧跟替换占位元素的内联脚本。
+    延迟内容中的组件和页面其他组件在同一个page中渲染，组件实例ID不重复，
+    其水合数据不在页面的组件信息脚本中，随替换脚本一起输出。
+    页面其余部分没有js时，hydrate在第一段有js的延迟内容之后输出
+    """
+    swap = True
+    while True:
+        pending = [s for s in page.deferred if not s.done]
+        if not pending:
+            return
+        # 异步序列化时在标记处等待，先完成的延迟内容先输出
+        marker = Pending(pending)
+        yield marker
+        suspense = marker.ready or pending[0]
+        if swap:
+            yield RenderedElement('script', {children_attr_name: [swap_script]})
+            swap = False
+        base = len(page.components)
+        yield RenderedElement('template', {
+            deferred_attr_name: suspense.sid,
+            children_attr_name: suspense.render(page),
+        })
+        # template中的流式孩子已经序列化完成，这里得到全部组件
+        payload = deferred_payload(page, base)
+        yield RenderedElement('script', {children_attr_name: [f'$frySwap({suspense.sid}, {payload})']})
+        if hydrate is not None and page.hasjs:
+            yield hydrate
+            hydrate = None
+
+
+def page_tail(page, hydrate):
+    """
+    body末尾的脚本和延迟内容：先输出组件信息脚本和水合脚本，页面水合不等待延迟内容
+    """
+    yield from page_scripts(page, hydrate)
+    if page.defer:
+        yield from deferred_content(page, None if page.hasjs else hydrate)
+
+
+def page_body(main_content, hydrate, autoreload=None):
+    """
+    将渲染后的页面内容包装为body元素，附加组件信息脚本、水合脚本hydrate和自动刷新脚本autoreload
+    """
+    page = main_content.page
+    if main_content.name == 'body':
+        body = main_content
     else:
-        rootclass = ''
+        body = RenderedElement('body', dict(children=[main_content]))
+        body.page = page
+    # 组件信息脚本和水合脚本在body的其余部分序列化之后才生成，
+    # 流式孩子(Stream)中的组件在序列化时才渲染，此时也已经加入page
+    body.props[children_attr_name].append(Stream(page_tail(page, hydrate)).bind(page, 0))
+    if autoreload is not None:
+        body.props[children_attr_name].append(autoreload)
+    return body
 
-    return f'''\
-<!DOCTYPE html>
-<html lang={lang}{rootclass}>
-  <head>
-    <meta charset="{charset}">
-    <title>{title}</title>
-    <meta name="viewport" content="{viewport}">
-    {metas}
-    {properties}
-    {equivs}
-    <link rel="stylesheet" href="{static_url(fryconfig.css_url)}">
-  </head>
-  {body}
-</html>
-'''
+
+def chunked(parts, chunk_size):
+    """
+    将细碎的html片段合并为不小于chunk_size个字符的块后输出
+    """
+    buf = []
+    size = 0
+    for part in parts:
+        if part.__class__ is Pending:
+            # 延迟内容渲染前先输出已有内容
+            if buf:
+                yield ''.join(buf)
+                buf = []
+                size = 0
+            continue
+        buf.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield ''.join(buf)
+
+
+async def achunked(parts, chunk_size, page):
+    """
+    chunked的异步版本，在延迟内容标记处输出已有内容，然后等待延迟内容中的组件执行完成
+    """
+    buf = []
+    size = 0
+    for part in parts:
+        if part.__class__ is Pending:
+            if buf:
+                yield ''.join(buf)
+                buf = []
+                size = 0
+            with phase(page, 'resolve'):
+                await part.wait()
+            continue
+        if part.__class__ is Resolving:
+            # 流式孩子中的组件执行完成后再渲染该孩子
+            with phase(page, 'resolve'):
+                await part.wait()
+            continue
+        buf.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield ''.join(buf)
+
+
+async def ajoin(parts, page):
+    """
+    ''.join的异步版本，在Resolving标记处等待流式孩子中的组件执行完成
+    """
+    buf = []
+    for part in parts:
+        if part.__class__ is Resolving:
+            with phase(page, 'resolve'):
+                await part.wait()
+        else:
+            buf.append(part)
+    return ''.join(buf)
+
+
+class PageShell(object):
+    """
+    页面外壳：html文档头部、尾部、水合脚本和自动刷新脚本与页面内容无关，
+    在创建时生成一次，每次请求只插入标题和渲染后的body
+    """
+    title_mark = '\0title\0'
+
+    def __init__(self,
+                 lang='en',
+                 rootclass='',
+                 charset='utf-8',
+                 viewport="width=device-width, initial-scale=1.0",
+                 metas={},
+                 properties={},
+                 equivs={},
+                 autoreload=True,
+                ):
+        self.charset = charset
+        head = html_head(self.title_mark, lang, rootclass, charset, viewport, metas, properties, equivs)
+        self.head_start, self.head_end = head.split(self.title_mark)
+        self.tail = html_tail
+        self.encoded_tail = html_tail.encode(charset)
+        self.hydrate = hydrate_script()
+        self.autoreload = autoreload_script() if fryconfig.snapshot().debug and autoreload else None
+
+    def head(self, title=''):
+        return f'{self.head_start}{title}{self.head_end}'
+
+    def body(self, content='div', args={}, defer=False):
+        """
+        渲染页面body，defer为True时允许延迟渲染
+        """
+        page = Page(defer)
+        with phase(page, 'render'):
+            element = render_on(page, content, args)
+        return page_body(element, self.hydrate, self.autoreload)
+
+    async def abody(self, content='div', args={}, defer=False):
+        # 等待组件函数(resolve)和渲染(render)的时间在Element.arender中分别记录
+        page = Page(defer)
+        element = await arender_on(page, content, args)
+        return page_body(element, self.hydrate, self.autoreload)
+
+    def profile_comment(self, page):
+        """
+        调试模式下打开性能分析时，附加在页面末尾的分析结果
+        """
+        if page.profiler is None or not fryconfig.snapshot().debug:
+            return ''
+        return page.profiler.html_comment()
+
+    def html(self, content='div', args={}, title=''):
+        body = self.body(content, args)
+        with phase(body.page, 'serialize'):
+            text = str(body)
+        return f'{self.head_start}{title}{self.head_end}{text}{self.tail}{self.profile_comment(body.page)}'
+
+    async def ahtml(self, content='div', args={}, title=''):
+        body = await self.abody(content, args)
+        page = body.page
+        text = await ajoin(iter_phase(page, 'serialize', body.iter_html()), page)
+        return f'{self.head_start}{title}{self.head_end}{text}{self.tail}{self.profile_comment(body.page)}'
+
+    def html_bytes(self, content='div', args={}, title=''):
+        body = self.body(content, args)
+        buf = bytearray(self.head(title).encode(self.charset))
+        with phase(body.page, 'serialize'):
+            body.write_bytes(buf, self.charset)
+        buf += self.encoded_tail
+        comment = self.profile_comment(body.page)
+        if comment:
+            buf += comment.encode(self.charset)
+        return buf
+
+    def html_stream(self, content='div', args={}, title='', chunk_size=4096):
+        yield self.head(title)
+        body = self.body(content, args, defer=True)
+        # 只记录生成html片段的时间，不包括等待客户端接收的时间
+        yield from chunked(iter_phase(body.page, 'serialize', body.iter_html()), chunk_size)
+        yield self.tail + self.profile_comment(body.page)
+
+    async def ahtml_stream(self, content='div', args={}, title='', chunk_size=4096):
+        yield self.head(title)
+        body = await self.abody(content, args, defer=True)
+        # 页面其余部分输出的同时执行延迟内容中的组件
+        for suspense in body.page.deferred:
+            suspense.task = asyncio.ensure_future(suspense.resolve())
+        page = body.page
+        async for chunk in achunked(iter_phase(page, 'serialize', body.iter_html()), chunk_size, page):
+            yield chunk
+        yield self.tail + self.profile_comment(body.page)
+
+
+@lru_cache(maxsize=64)
+def cached_shell(lang, rootclass, charset, viewport, metas, properties, equivs, autoreload, config):
+    return PageShell(lang, rootclass, charset, viewport, dict(metas), dict(properties), dict(equivs), autoreload)
+
+
+def page_shell(lang='en',
+               rootclass='',
+               charset='utf-8',
+               viewport="width=device-width, initial-scale=1.0",
+               metas={},
+               properties={},
+               equivs={},
+               autoreload=True,
+              ):
+    """
+    返回参数和当前配置对应的页面外壳，相同参数和配置的页面外壳只生成一次
+    """
+    # 配置快照只在reload时改变，作为key时相同快照的页面外壳只生成一次
+    config = fryconfig.snapshot()
+    try:
+        return cached_shell(lang, rootclass, charset, viewport,
+                            tuple(metas.items()), tuple(properties.items()), tuple(equivs.items()),
+                            autoreload, config)
+    except TypeError:
+        # 参数中有不可hash的值
+        return PageShell(lang, rootclass, charset, viewport, metas, properties, equivs, autoreload)
+
+
+def html(content='div',
+         args={},
+         title='',
+         lang='en',
+         rootclass='',
+         charset='utf-8',
+         viewport="width=device-width, initial-scale=1.0",
+         metas={},
+         properties={},
+         equivs={},
+         autoreload=True,
+        ):
+    shell = page_shell(lang, rootclass, charset, viewport, metas, properties, equivs, autoreload)
+    return shell.html(content, args, title)
+
+
+async def ahtml(content='div',
+                args={},
+                title='',
+                lang='en',
+                rootclass='',
+                charset='utf-8',
+                viewport="width=device-width, initial-scale=1.0",
+                metas={},
+                properties={},
+                equivs={},
+                autoreload=True,
+               ):
+    """
+    html()的异步版本，页面中可以有async def组件，兄弟组件的I/O并发进行
+    """
+    shell = page_shell(lang, rootclass, charset, viewport, metas, properties, equivs, autoreload)
+    return await shell.ahtml(content, args, title)
+
+
+def html_bytes(content='div',
+               args={},
+               title='',
+               lang='en',
+               rootclass='',
+               charset='utf-8',
+               viewport="width=device-width, initial-scale=1.0",
+               metas={},
+               properties={},
+               equivs={},
+               autoreload=True,
+              ):
+    """
+    html()的字节版本，页面直接序列化为以charset编码的bytearray，
+    不生成整页的html字符串，web框架无需再次编码
+    """
+    shell = page_shell(lang, rootclass, charset, viewport, metas, properties, equivs, autoreload)
+    return shell.html_bytes(content, args, title)
+
+
+def html_stream(content='div',
+                args={},
+                title='',
+                lang='en',
+                rootclass='',
+                charset='utf-8',
+                viewport="width=device-width, initial-scale=1.0",
+                metas={},
+                properties={},
+                equivs={},
+                autoreload=True,
+                chunk_size=4096,
+               ):
+    """
+    html()的流式版本，返回html文本块的生成器。
+    文档头在页面渲染之前就输出，body在序列化过程中按块输出，首字节时间不再依赖页面大小。
+    """
+    shell = page_shell(lang, rootclass, charset, viewport, metas, properties, equivs, autoreload)
+    yield from shell.html_stream(content, args, title, chunk_size)
+
+
+async def ahtml_stream(content='div',
+                       args={},
+                       title='',
+                       lang='en',
+                       rootclass='',
+                       charset='utf-8',
+                       viewport="width=device-width, initial-scale=1.0",
+                       metas={},
+                       properties={},
+                       equivs={},
+                       autoreload=True,
+                       chunk_size=4096,
+                      ):
+    """
+    html_stream()的异步版本，返回html文本块的异步生成器
+    """
+    shell = page_shell(lang, rootclass, charset, viewport, metas, properties, equivs, autoreload)
+    async for chunk in shell.ahtml_stream(content, args, title, chunk_size):
+        yield chunk
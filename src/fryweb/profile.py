@@ -0,0 +1,162 @@
+"""
+页面渲染性能分析
+
+    from fryweb.profile import profile
+
+    with profile() as profiler:
+        content = html(App, title='fryweb')
+    response['Server-Timing'] = profiler.server_timing()
+
+profile()期间创建的Page都记录到profiler中：每个组件函数的调用次数、包含子组件的
+时间(inclusive)、不含子组件的时间(exclusive)和生成的html元素数量，以及页面渲染和
+序列化各阶段的时间（render、serialize以及异步渲染中等待组件函数的resolve）。调试模式下html()等函数在页面末尾附加包含分析结果的html注释。
+没有profile()时渲染过程只多一次属性判断。
+"""
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+import time
+
+from fryweb.utils import component_name
+
+
+# 当前上下文中的profiler，线程和asyncio task之间互不影响
+current_profiler = ContextVar('fryweb_profiler', default=None)
+
+
+class ComponentStats(object):
+    __slots__ = ('name', 'calls', 'inclusive', 'exclusive', 'elements')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        self.elements = 0
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'inclusive': self.inclusive,
+            'exclusive': self.exclusive,
+            'elements': self.elements,
+        }
+
+
+class Profiler(object):
+    def __init__(self):
+        # 组件函数 -> ComponentStats
+        self.components = {}
+        # 阶段名 -> 时间，如render、serialize
+        self.phases = {}
+        # 正在渲染的组件：[开始时间, 子组件时间, html元素数量]
+        self.stack = []
+        self.elements = 0
+
+    def enter(self):
+        self.stack.append([time.perf_counter(), 0.0, 0])
+
+    def exit(self, fn):
+        begin, children, elements = self.stack.pop()
+        elapsed = time.perf_counter() - begin
+        stats = self.components.get(fn)
+        if stats is None:
+            stats = self.components[fn] = ComponentStats(component_name(fn))
+        stats.calls += 1
+        stats.inclusive += elapsed
+        stats.exclusive += elapsed - children
+        stats.elements += elements
+        if self.stack:
+            self.stack[-1][1] += elapsed
+
+    def element(self):
+        self.elements += 1
+        if self.stack:
+            self.stack[-1][2] += 1
+
+    @contextmanager
+    def phase(self, name):
+        begin = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - begin
+
+    def iter_phase(self, name, iterator):
+        """
+        逐项记录遍历iterator的时间，不包括调用者处理每一项（如发送给客户端）的时间
+        """
+        iterator = iter(iterator)
+        while True:
+            begin = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - begin
+            yield item
+
+    def report(self):
+        """
+        按包含子组件的时间从大到小排列的组件统计列表
+        """
+        stats = sorted(self.components.values(), key=lambda s: s.inclusive, reverse=True)
+        return [s.as_dict() for s in stats]
+
+    def server_timing(self, limit=10):
+        """
+        生成Server-Timing响应头的值，包括各阶段时间和最慢的limit个组件，单位毫秒
+        """
+        metrics = [f'{name};dur={seconds*1000:.2f}' for name, seconds in self.phases.items()]
+        for s in self.report()[:limit]:
+            metrics.append(f'c-{s["name"]};dur={s["inclusive"]*1000:.2f};desc="{s["name"]} x{s["calls"]}"')
+        return ', '.join(metrics)
+
+    def html_comment(self):
+        """
+        以html注释的形式输出分析结果，用于调试模式下附加到页面末尾
+        """
+        phases = ', '.join(f'{name} {seconds*1000:.2f}ms' for name, seconds in self.phases.items())
+        lines = ['<!-- fryweb profile',
+                 f'{phases}, {self.elements} elements',
+                 f'{"component":<30} {"calls":>6} {"inclusive":>11} {"exclusive":>11} {"elements":>9}']
+        for s in self.report():
+            lines.append(f'{s["name"]:<30} {s["calls"]:>6} {s["inclusive"]*1000:>9.2f}ms '
+                         f'{s["exclusive"]*1000:>9.2f}ms {s["elements"]:>9}')
+        lines.append('-->')
+        return '\n'.join(lines) + '\n'
+
+
+@contextmanager
+def profile(profiler=None):
+    """
+    在with语句中打开性能分析，返回Profiler对象
+    """
+    if profiler is None:
+        profiler = Profiler()
+    token = current_profiler.set(profiler)
+    try:
+        yield profiler
+    finally:
+        current_profiler.reset(token)
+
+
+def phase(page, name):
+    """
+    记录page的某个阶段的时间，没有打开性能分析时不做任何事
+    """
+    profiler = page.profiler
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name)
+
+
+def iter_phase(page, name, iterator):
+    """
+    记录遍历iterator的时间，用于流式序列化，没有打开性能分析时原样返回iterator
+    """
+    profiler = page.profiler
+    if profiler is None:
+        return iterator
+    return profiler.iter_phase(name, iterator)
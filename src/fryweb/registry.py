@@ -0,0 +1,144 @@
+"""
+组件注册表
+
+render()和远程组件接口使用字符串组件名（如`app.components.Card`）时，
+通过注册表查找组件函数，不必每次都import_module和getattr。
+
+组件在以下时机加入注册表：
+* 使用`registry.register`装饰组件函数，或者调用`registry.register_module`注册整个模块；
+* 服务端render()第一次查找某个模块中的组件时，该模块中定义的全部组件一次性加入注册表。
+
+远程组件接口（fryweb.views）的组件名来自请求，只渲染显式注册的组件（register、
+register_module、warmup）以及allow列出的模块中定义的组件，不会import任意模块。
+调用`registry.allow`后，还只允许列出的组件名或模块名：
+
+    from fryweb.registry import registry
+
+    registry.allow('app.widgets', 'app.components.Card')
+    registry.warmup(['app.widgets'])
+"""
+from importlib import import_module
+import threading
+
+
+def is_component(name, value):
+    return callable(value) and name[:1].isupper()
+
+
+class ComponentRegistry(object):
+    def __init__(self):
+        # 组件名 -> 组件函数
+        self.components = {}
+        # 已经注册过的模块名
+        self.modules = set()
+        # 显式注册、可以远程渲染的组件名和模块名
+        self.remotes = set()
+        self.remote_modules = set()
+        # 允许远程渲染的组件名或模块名，None表示全部允许
+        self.allowlist = None
+        self.lock = threading.Lock()
+
+    def register(self, fn=None, name=None):
+        """
+        注册组件函数，可以作为装饰器使用，name默认为'模块名.函数名'
+        """
+        def decorator(fn):
+            cname = name or f'{fn.__module__}.{fn.__name__}'
+            self.components[cname] = fn
+            self.remotes.add(cname)
+            return fn
+        if fn is None:
+            return decorator
+        return decorator(fn)
+
+    def register_module(self, module, remote=True):
+        """
+        注册模块中定义的全部组件函数，module可以是模块对象或模块名。
+        remote为False时只用于服务端render()查找，不允许远程渲染
+        """
+        if isinstance(module, str):
+            module = import_module(module)
+        mname = module.__name__
+        for name, value in vars(module).items():
+            # 只注册本模块中定义的组件，不包括import进来的Element等
+            if is_component(name, value) and getattr(value, '__module__', None) == mname:
+                cname = f'{mname}.{name}'
+                self.components.setdefault(cname, value)
+                if remote:
+                    self.remotes.add(cname)
+        self.modules.add(mname)
+        if remote:
+            self.remote_modules.add(mname)
+
+    def resolve(self, name):
+        """
+        返回组件名对应的组件函数，不存在时返回None
+        """
+        component = self.components.get(name)
+        if component is not None:
+            return component
+        module, _, cname = name.rpartition('.')
+        if not module or not cname[:1].isupper():
+            return None
+        with self.lock:
+            if module not in self.modules:
+                self.register_module(module, remote=False)
+            component = self.components.get(name)
+            if component is None:
+                # 从其他模块import进来的组件
+                component = getattr(import_module(module), cname, None)
+                if not callable(component):
+                    return None
+                self.components[name] = component
+        return component
+
+    def allow(self, *names):
+        """
+        允许远程渲染的组件名或模块名，可以多次调用
+        """
+        if self.allowlist is None:
+            self.allowlist = set()
+        self.allowlist.update(names)
+
+    def allowed(self, name):
+        if self.allowlist is None:
+            return True
+        return name in self.allowlist or name.rpartition('.')[0] in self.allowlist
+
+    def remote(self, name):
+        """
+        返回允许远程渲染的组件函数，不允许或没有注册时返回None。
+        name来自请求，只查找注册表，不像resolve那样import模块后getattr
+        """
+        if not isinstance(name, str) or not self.allowed(name):
+            return None
+        if name not in self.remotes and self.allowlist is not None:
+            # allow列出的模块（或组件所在模块）中定义的组件，第一次使用时注册
+            module = name.rpartition('.')[0]
+            if module and module not in self.remote_modules:
+                with self.lock:
+                    try:
+                        self.register_module(module)
+                    except ImportError:
+                        return None
+        if name not in self.remotes:
+            return None
+        return self.components.get(name)
+
+    def names(self):
+        """
+        已注册的组件名列表
+        """
+        return sorted(self.components)
+
+    def warmup(self, modules=()):
+        """
+        预先注册模块中的组件，返回所有可以远程渲染的组件名
+        """
+        for module in modules:
+            self.register_module(module)
+        return [name for name in sorted(self.remotes) if self.allowed(name)]
+
+
+# 默认的组件注册表
+registry = ComponentRegistry()
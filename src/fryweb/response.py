@@ -0,0 +1,68 @@
+"""
+各web框架的html流式响应适配
+"""
+from fryweb.page import html_stream, ahtml_stream
+
+
+def starlette_stream(content='div', args={}, status_code=200, headers=None, **kwargs):
+    """
+    返回starlette(及fastapi)的StreamingResponse，页面以ahtml_stream的方式分块输出，
+    渲染不阻塞事件循环，页面中可以有async def组件
+    """
+    from starlette.responses import StreamingResponse
+    charset = kwargs.get('charset', 'utf-8')
+    return StreamingResponse(ahtml_stream(content, args, **kwargs),
+                             status_code=status_code,
+                             headers=headers,
+                             media_type=f'text/html; charset={charset}')
+
+
+def django_stream(content='div', args={}, status=200, headers=None, **kwargs):
+    """
+    返回django的StreamingHttpResponse，页面以html_stream的方式分块输出
+    """
+    # django不是fryweb的必需依赖，用到时再import
+    from django.http import StreamingHttpResponse
+    charset = kwargs.get('charset', 'utf-8')
+    return StreamingHttpResponse(html_stream(content, args, **kwargs),
+                                 status=status,
+                                 headers=headers,
+                                 content_type=f'text/html; charset={charset}')
+
+
+def body_chunks(body, chunk_size=65536):
+    """
+    将html_bytes生成的字节缓冲区按块切分，每次只复制一块
+    """
+    view = memoryview(body)
+    for i in range(0, len(view), chunk_size):
+        yield bytes(view[i:i+chunk_size])
+
+
+async def asgi_send(send, body, status=200, headers=None, charset='utf-8', chunk_size=65536):
+    """
+    通过ASGI的send发送html_bytes生成的页面，不再重新编码
+    """
+    raw_headers = [(b'content-type', f'text/html; charset={charset}'.encode('latin-1')),
+                   (b'content-length', str(len(body)).encode('latin-1'))]
+    if headers:
+        raw_headers += [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.items()]
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    chunks = body_chunks(body, chunk_size)
+    chunk = next(chunks, b'')
+    for next_chunk in chunks:
+        await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        chunk = next_chunk
+    await send({'type': 'http.response.body', 'body': chunk})
+
+
+def wsgi_response(start_response, body, status='200 OK', headers=None, charset='utf-8', chunk_size=65536):
+    """
+    返回WSGI应用的响应体迭代器，html_bytes生成的页面按块输出，不再重新编码
+    """
+    response_headers = [('Content-Type', f'text/html; charset={charset}'),
+                        ('Content-Length', str(len(body)))]
+    if headers:
+        response_headers += list(headers.items())
+    start_response(status, response_headers)
+    return body_chunks(body, chunk_size)
@@ -332,7 +332,56 @@ class Component {
 
 const globalG = {};
 
-async function hydrate(domContainer, setups, rootArgs) {
+/*
+** 紧凑模式下，页面上所有组件的水合数据在<script data-frypayload>中，
+** 每个payload脚本只解析一次，解析结果以cid为key合并
+*/
+const payloadScripts = new WeakSet();
+const payloads = {};
+
+function loadPayloads() {
+    for (const script of document.querySelectorAll('script[data-frypayload]')) {
+        if (payloadScripts.has(script)) continue;
+        payloadScripts.add(script);
+        Object.assign(payloads, JSON.parse(script.textContent));
+    }
+    return payloads;
+}
+
+/*
+** 延迟内容（Suspense）：页面中的$frySwap替换占位元素后，将替换进来的内容和
+** 其中组件的水合数据放入window.$frySwaps队列并发出fryswap事件。
+** 队列中的内容在页面水合完成后按顺序水合，水合前已经替换进来的内容也不会丢失
+*/
+let swapListening = false;
+let swapChain = Promise.resolve();
+
+function listenSwaps(setups, ready) {
+    const drain = () => {
+        swapChain = swapChain.then(async () => {
+            await ready;
+            const swaps = window.$frySwaps || [];
+            while (swaps.length > 0) {
+                const {roots, data} = swaps.shift();
+                for (const root of roots) {
+                    await hydrate(root, setups, undefined, data || {});
+                }
+            }
+        });
+    };
+    document.addEventListener('fryswap', drain);
+    drain();
+}
+
+async function hydrate(domContainer, setups, rootArgs, remoteData) {
+
+    // 0. 页面水合时开始监听延迟内容，水合完成后再水合延迟内容
+    let swapReady = null;
+    if (!swapListening && domContainer === document.documentElement) {
+        swapListening = true;
+        const ready = new Promise(resolve => swapReady = resolve);
+        listenSwaps(setups, ready);
+    }
 
     // 1. 初始化全局数据，遍历整个dom树，查找出服务端渲染出来的所有组件静态信息
 
@@ -351,6 +400,8 @@ async function hydrate(domContainer, setups, rootArgs) {
     for (const script of document.querySelectorAll('script[data-fryid]')) {
         scripts[script.dataset.fryid] = script;
     }
+    const payload = loadPayloads();
+    const compact = Object.keys(payload).length > 0;
 
     // 2. 遍历domContainer DOM树，找到树上所有组件，然后根据组件静态信息创建组件
 
@@ -361,19 +412,36 @@ async function hydrate(domContainer, setups, rootArgs) {
         } else if (element.tagName === 'TEMPLATE') {
             // 组件渲染期间，不会使用到组件内部模板中的组件信息
             return;
+        } else if (element.fryswapped && element !== domContainer) {
+            // 替换进来的延迟内容使用自己的水合数据，由listenSwaps单独水合
+            return;
         } else {
-            // 对于有data-fryid属性的其他元素，根据对应id的script元素内容初始化component对象
-            if (element.dataset && 'fryid' in element.dataset) {
+            // 对于有data-fryid属性的其他元素，根据对应id的script元素内容初始化component对象，
+            // 之前已经水合过的元素（增量水合时的已有内容）不再处理
+            if (element.dataset && 'fryid' in element.dataset && !('frycomponents' in element)) {
                 for (const cid of element.dataset.fryid.split(' ')) {
                     if (cid in components) {
                         throw `duplicate component id ${cid}`;
                     }
-                    if (!(cid in scripts)) {
+                    let name, setup, args, refs;
+                    if (remoteData && cid in remoteData) {
+                        // 远程渲染的组件，组件信息随响应返回，不在页面上
+                        ({name, setup, args, refs} = remoteData[cid]);
+                        args = {...args};
+                    } else if (cid in scripts) {
+                        const script = scripts[cid];
+                        ({setup, args, refs} = JSON.parse(script.textContent));
+                        ({fryname: name} = script.dataset);
+                    } else if (cid in payload) {
+                        // payload数据在多次水合间共享（如组件模板），args会被修改，使用拷贝
+                        ({name, setup, args, refs} = payload[cid]);
+                        args = {...args};
+                    } else if (compact) {
+                        // 紧凑模式下没有js的组件不输出水合数据
+                        name = '';
+                    } else {
                         throw `unknown component id ${cid}`;
                     }
-                    const script = scripts[cid];
-                    const {setup, args, refs} = JSON.parse(script.textContent);
-                    const {fryname: name} = script.dataset;
                     if (complist.length === 0 && args) {
                         // 将水合时动态传入的参数rootArgs给到本次水合的根组件
                         Object.assign(args, rootArgs);
@@ -403,6 +471,10 @@ async function hydrate(domContainer, setups, rootArgs) {
         for (const ref of refs.split(' ')) {
             const [name, cid] = ref.split('-');
             const component = components[cid];
+            if (!component) {
+                // 不在本次水合范围内的组件（如尚未水合的延迟内容）
+                continue;
+            }
             if (name.endsWith(':a')) {
                 const rname = name.slice(0, -2);
                 if (rname in component.fryargs) {
@@ -527,10 +599,15 @@ async function hydrate(domContainer, setups, rootArgs) {
     // 清空回调列表
     g.readyFns.length = 0;
     g.isReady = true;
+
+    // 7. 页面水合完成，开始水合延迟内容（Suspense）
+    if (swapReady) {
+        swapReady();
+    }
 }
 
 
-async function getRemote(url, cname, args) {
+async function getRemote(url, cname, args, setups) {
     const sargs = JSON.stringify(args);
     let fullurl = url;
     if (url.startsWith('/')) {
@@ -543,13 +620,13 @@ async function getRemote(url, cname, args) {
     if (data.code === 0) {
         let root = document.createElement('div');
         root.innerHTML = data.dom;
-        await hydrate(root, data.components);
+        await hydrate(root, setups, undefined, data.components);
         return root.firstElementChild;
     }
 }
 
 
-async function postRemote(url, cname, args, csrftoken) {
+async function postRemote(url, cname, args, csrftoken, setups) {
     let fullurl = url;
     if (url.startsWith('/')) {
         fullurl = window.location.origin + url;
@@ -568,15 +645,84 @@ async function postRemote(url, cname, args, csrftoken) {
     if (data.code === 0) {
         let root = document.createElement('div');
         root.innerHTML = data.dom;
-        await hydrate(root, data.components);
+        await hydrate(root, setups, undefined, data.components);
         return root.firstElementChild;
     }
 }
 
 
+/*
+** 远程组件批量加载器：同一个tick中发起的组件请求合并为一次批量请求，
+** 所有返回的组件在一次水合中完成。
+**
+** url:       批量组件接口（fryweb.views.components）的地址
+** setups:    组件setup函数集合
+** csrftoken: 可选，django的csrf token
+*/
+class RemoteLoader {
+    constructor(url, setups, csrftoken) {
+        this.url = url.startsWith('/') ? window.location.origin + url : url;
+        this.setups = setups;
+        this.csrftoken = csrftoken;
+        this.queue = [];
+    }
+
+    load(name, args) {
+        return new Promise((resolve, reject) => {
+            this.queue.push({name, args: args || {}, resolve, reject});
+            if (this.queue.length === 1) {
+                // 等到当前tick结束，收集同一tick中的所有请求
+                queueMicrotask(() => this.flush());
+            }
+        });
+    }
+
+    async flush() {
+        const queue = this.queue;
+        this.queue = [];
+        try {
+            const headers = {'Content-Type': 'application/json'};
+            if (this.csrftoken) {
+                headers['X-CSRFToken'] = this.csrftoken;
+            }
+            const body = JSON.stringify({components: queue.map(({name, args}) => ({name, args}))});
+            const response = await fetch(this.url, {method: 'POST', headers, body});
+            if (!response.ok) {
+                throw `remote components failed: ${response.status}`;
+            }
+            const data = await response.json();
+            if (data.code !== 0) {
+                throw `remote components failed: code ${data.code}`;
+            }
+            // 所有组件放在同一个容器中一次完成水合，组件实例ID由服务端保证不重复
+            const root = document.createElement('div');
+            const elements = data.doms.map(dom => {
+                const template = document.createElement('template');
+                template.innerHTML = dom;
+                const element = template.content.firstElementChild;
+                root.append(template.content);
+                return element;
+            });
+            await hydrate(root, this.setups, undefined, data.components);
+            queue.forEach(({resolve}, i) => resolve(elements[i]));
+        } catch (err) {
+            for (const {reject} of queue) {
+                reject(err);
+            }
+        }
+    }
+}
+
+function remote(url, setups, csrftoken) {
+    const loader = new RemoteLoader(url, setups, csrftoken);
+    return loader.load.bind(loader);
+}
+
+
 export {
     signal,
     effect,
     computed,
     hydrate,
+    remote,
 }
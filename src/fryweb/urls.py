@@ -1,12 +1,13 @@
 from django.conf import settings
 from django.urls import path
 
-from .views import component, check_hotreload
+from .views import component, components, check_hotreload
 
 app_name = 'fryweb'
 
 urlpatterns = [
-#    path('component', components, name="component"),
+    path('component', component, name="component"),
+    path('components', components, name="components"),
 ]
 
 if settings.DEBUG:
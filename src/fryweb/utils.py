@@ -15,15 +15,15 @@ def fry_files():
 def create_css_generator():
     # input_files = [(dir, '**/*.html') for dir in template_directories()]
     from fryweb.css.generator import CSSGenerator
-    return CSSGenerator(fry_files(), fryconfig.css_file)
+    return CSSGenerator(fry_files(), fryconfig.snapshot().css_file)
 
 def create_js_generator():
     from fryweb.js.generator import JSGenerator
-    return JSGenerator(fry_files(), fryconfig.js_file)
+    return JSGenerator(fry_files(), fryconfig.snapshot().js_file)
 
 
 def static_url(path):
-    return fryconfig.static_url.rstrip('/') + '/' + path.lstrip('/')
+    return fryconfig.snapshot().static_url.rstrip('/') + '/' + path.lstrip('/')
 
 def component_name(fn):
     if inspect.isfunction(fn) or inspect.isclass(fn):
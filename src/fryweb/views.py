@@ -1,16 +1,20 @@
 from http import HTTPStatus
-from django.http import Http404, HttpResponse, StreamingHttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, HttpResponseNotModified, StreamingHttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from django.conf import settings
 
 from fryweb.reload import event_stream, mime_type
 
-from fryweb import render
+from fryweb import Element, render, render_many
+from fryweb.page import Page
+from fryweb.registry import registry
 
 import logging
 import uuid
 import json
 
-logger = logging.getLogger('frycss.views')
+logger = logging.getLogger('fryweb.views')
 
 
 def check_hotreload(request):
@@ -25,6 +29,69 @@ def check_hotreload(request):
     response['content-encoding'] = ''
     return response
 
+# 一次批量请求中最多渲染的组件数量
+MAX_BATCH_SIZE = 100
+
+
+def serialize(elements, page):
+    """
+    序列化渲染结果，返回html列表和页面上的组件信息
+    """
+    doms = [str(element) for element in elements]
+    # 流式孩子中的子组件在序列化时才渲染，重新获取引用关系
+    for c in page.components.values():
+        c['refs'] = page.child_refs(c['cid'])
+    return doms, page.components
+
+
+def component_response(element):
+    element = render(element)
+    (dom,), components = serialize([element], element.page)
+    return JsonResponse({
+        'code': 0,
+        'dom': dom,
+        'components': components,
+    })
+
+
+def cached_component_response(request, element, args, policy):
+    """
+    可缓存组件的响应：带强ETag和Cache-Control，处理If-None-Match条件请求，
+    响应内容在服务端缓存ttl秒
+    """
+    cache, max_age, ttl, public = policy
+    key = cache.key(element.name, args)
+    cached = cache.get(key) if key is not None else None
+    if cached is None:
+        body = component_response(element).content
+        etag = cache.put(key, body, ttl)
+    else:
+        etag, body = cached
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    if etag in etags or '*' in etags:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    if public:
+        patch_cache_control(response, public=True, max_age=max_age)
+    else:
+        patch_cache_control(response, private=True, max_age=max_age)
+    return response
+
+
+def remote_component(name):
+    """
+    返回允许远程渲染的组件函数。只渲染注册表中注册的组件，
+    调试模式下记录未注册的组件名，方便从原来按名字import组件的版本迁移
+    """
+    fn = registry.remote(name)
+    if fn is None and settings.DEBUG:
+        logger.warning("Component '%s' is not registered for remote rendering, register it with "
+                       "registry.register, registry.register_module or registry.allow", name)
+    return fn
+
+
 def component(request):
     if request.method == 'GET':
         data = request.GET
@@ -33,12 +100,59 @@ def component(request):
     else:
         raise Http404()
     name = data.get('name')
-    args = data.get('args')
-    args = json.loads(args)
-    element = render(name, **args)
-    page = element.page
+    try:
+        args = json.loads(data.get('args') or '{}')
+        # 组件参数作为关键字参数传给组件函数，必须是json对象
+        if not isinstance(args, dict):
+            raise TypeError(f"args of '{name}' should be an object")
+    except (TypeError, ValueError) as e:
+        return HttpResponseBadRequest(f"Invalid component args: {e}", content_type='text/plain')
+    fn = remote_component(name)
+    if fn is None:
+        raise Http404()
+    element = Element(fn, args)
+    # 只有GET请求使用组件声明的缓存策略
+    policy = getattr(fn, 'fry_response_cache', None)
+    if policy is not None and request.method == 'GET':
+        return cached_component_response(request, element, args, policy)
+    return component_response(element)
+
+
+def components(request):
+    """
+    批量渲染组件，请求体为json：{"components": [{"name": ..., "args": {...}}, ...]}，
+    所有组件在同一个Page中渲染，组件实例ID互不重复，前端可以一次完成水合
+    """
+    if request.method != 'POST':
+        raise Http404()
+    try:
+        if request.content_type == 'application/json':
+            data = json.loads(request.body)
+        else:
+            data = json.loads(request.POST['components'])
+        if isinstance(data, dict):
+            data = data['components']
+        items = [(item['name'], item.get('args') or {}) for item in data]
+        for name, args in items:
+            # 组件参数作为关键字参数传给组件函数，必须是json对象
+            if not isinstance(args, dict):
+                raise TypeError(f"args of '{name}' should be an object")
+    except (KeyError, TypeError, ValueError) as e:
+        return HttpResponseBadRequest(f"Invalid component batch: {e}", content_type='text/plain')
+    if len(items) > MAX_BATCH_SIZE:
+        return HttpResponseBadRequest(f"Too many components in one batch: {len(items)} > {MAX_BATCH_SIZE}",
+                                      content_type='text/plain')
+    entries = []
+    for name, args in items:
+        fn = remote_component(name)
+        if fn is None:
+            return HttpResponseBadRequest(f"Unknown component: {name}", content_type='text/plain')
+        entries.append((fn, args))
+    page = Page()
+    elements = render_many(entries, page)
+    doms, components = serialize(elements, page)
     return JsonResponse({
         'code': 0,
-        'dom': str(element),
-        'components': page.components,
+        'doms': doms,
+        'components': components,
     })
@@ -0,0 +1,77 @@
+import importlib.util
+import logging
+
+import pytest
+
+from fryweb.config import fryconfig
+
+
+def pytest_configure(config):
+    # django不是fryweb的必需依赖，安装了才配置，用于测试fryweb.views
+    try:
+        from django.conf import settings
+    except ImportError:
+        return
+    if not settings.configured:
+        import django
+        settings.configure(
+            DEBUG=True,
+            SECRET_KEY='fryweb-test',
+            ALLOWED_HOSTS=['testserver'],
+            ROOT_URLCONF='urls',
+            INSTALLED_APPS=[],
+        )
+        django.setup()
+
+
+@pytest.fixture
+def build_env(tmp_path, monkeypatch):
+    """
+    编译目录放在临时目录中，返回配置快照
+    """
+    monkeypatch.setenv('FRYWEB_BUILD_ROOT', str(tmp_path / 'build'))
+    monkeypatch.setenv('FRYWEB_STATIC_ROOT', str(tmp_path / 'static'))
+    monkeypatch.setenv('FRYWEB_PUBLIC_ROOT', str(tmp_path / 'public'))
+    yield fryconfig.reload()
+    monkeypatch.undo()
+    fryconfig.reload()
+
+
+@pytest.fixture
+def compile_fry(build_env, tmp_path):
+    """
+    编译fry源码并import生成的python模块，每次编译使用单独的目录
+    """
+    from fryweb.fry.generator import FryCompiler
+    count = 0
+
+    def compile_fry(source, name='app'):
+        nonlocal count
+        count += 1
+        src = tmp_path / 'src' / str(count)
+        src.mkdir(parents=True)
+        file = src / f'{name}.fry'
+        file.write_text(source, encoding='utf-8')
+        compiler = FryCompiler(logging.getLogger('fryweb.test'))
+        compiler.compile(file, True)
+        compiler.pygenerator.replace()
+        pyfile = file.with_suffix('.py')
+        spec = importlib.util.spec_from_file_location(f'fry_test_{count}_{name}', pyfile)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.source = pyfile.read_text(encoding='utf-8')
+        return module
+    return compile_fry
+
+
+@pytest.fixture
+def setenv(monkeypatch):
+    """
+    设置环境变量并重新生成配置快照，测试结束后恢复
+    """
+    def setenv(name, value):
+        monkeypatch.setenv(name, value)
+        return fryconfig.reload()
+    yield setenv
+    monkeypatch.undo()
+    fryconfig.reload()
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+import pytest
+
+from fryweb import Element, html, ahtml, render, arender
+
+
+async def Slow(text, delay=0.05):
+    await asyncio.sleep(delay)
+    return Element('p', {'children': [text]})
+
+
+def Counter(initial):
+    return Element('div', {'call-client-script': ['app_Counter', [('initial', initial)]], 'children': [
+        Element('span', {'*': Element.ClientEmbed(0), 'children': [str(initial)]}),
+    ]})
+
+
+async def AsyncRoot(initial):
+    # 组件树根元素是另一个有js的组件
+    await asyncio.sleep(0)
+    return Element(Counter, {'initial': initial})
+
+
+def Page():
+    return Element('main', {'children': [
+        Element(Counter, {'initial': 1}),
+        Element('section', {'children': [Element(Counter, {'initial': i}) for i in range(2, 4)]}),
+    ]})
+
+
+def test_ahtml_same_as_html():
+    assert asyncio.run(ahtml(Page, title='t')) == html(Page, title='t')
+
+
+def test_siblings_concurrent():
+    def App():
+        return Element('div', {'children': [Element(Slow, {'text': str(i), 'delay': 0.1}) for i in range(5)]})
+    begin = time.perf_counter()
+    element = asyncio.run(arender(App))
+    elapsed = time.perf_counter() - begin
+    assert str(element) == '<div>' + ''.join(f'<p>{i}</p>' for i in range(5)) + '</div>'
+    assert elapsed < 0.3
+
+
+def test_async_component_root_is_component():
+    element = asyncio.run(arender(AsyncRoot, initial=5))
+    assert str(element) == '<div data-fryid="1"><span data-fryembed="1/0-text">5</span></div>'
+    assert element.page.components[1]['args'] == {'initial': 5}
+
+
+def test_async_component_in_sync_render():
+    with pytest.raises(RuntimeError, match='should be rendered by arender'):
+        render(Slow, text='x')
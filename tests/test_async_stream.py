@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from fryweb import Element, Stream, ahtml, ahtml_stream, arender, html
+
+
+async def Row(index):
+    await asyncio.sleep(0)
+    return Element('li', {'children': [str(index)]})
+
+
+def Item(index):
+    return Element('li', {'call-client-script': ['app_Item', [('index', index)]], 'children': [str(index)]})
+
+
+def AsyncList():
+    return Element('ul', {'children': [Stream(Element(Row, {'index': i}) for i in range(3))]})
+
+
+def SyncList():
+    return Element('ul', {'children': [Stream(Element(Item, {'index': i}) for i in range(3))]})
+
+
+def body(text):
+    return text[text.index('<body>'):text.index('<script')]
+
+
+async def collect(stream):
+    return ''.join([chunk async for chunk in stream])
+
+
+def test_ahtml_async_in_stream():
+    text = asyncio.run(ahtml(AsyncList))
+    assert body(text) == '<body><ul><li>0</li><li>1</li><li>2</li></ul>'
+
+
+def test_ahtml_stream_async_in_stream():
+    text = asyncio.run(collect(ahtml_stream(AsyncList, chunk_size=1)))
+    assert body(text) == '<body><ul><li>0</li><li>1</li><li>2</li></ul>'
+
+
+def test_sync_components_in_stream_same_as_html():
+    assert asyncio.run(ahtml(SyncList)) == html(SyncList)
+    assert asyncio.run(collect(ahtml_stream(SyncList))) == html(SyncList)
+
+
+def test_sync_serialization_error():
+    element = asyncio.run(arender(AsyncList))
+    with pytest.raises(RuntimeError, match="Async component 'Row' in a Stream should be serialized by ahtml"):
+        str(element)
@@ -0,0 +1,140 @@
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pytest
+
+import fryweb.fry.generator
+from fryweb.fry.buildcache import BuildCache
+from fryweb.fry.generator import FryCompiler
+
+tests = Path(__file__).parent
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    把tests/app复制为包src/pkg/app，app.fry引用了./js/foo.js
+    """
+    pkg = tmp_path / 'src' / 'pkg'
+    shutil.copytree(tests / 'app', pkg / 'app', ignore=shutil.ignore_patterns('*.py', '__pycache__'))
+    (pkg / '__init__.py').touch()
+    (pkg / 'app' / '__init__.py').touch()
+    return sorted((pkg / 'app').glob('*.fry'))
+
+
+def build(root, files, setenv):
+    """
+    在新的build_root中全量编译files，返回(编译结果, 输出文件内容, 日志)
+    """
+    setenv('FRYWEB_BUILD_ROOT', str(root))
+    logger = logging.getLogger('fryweb.test.buildcache')
+    logger.setLevel(logging.INFO)
+    records = Records()
+    logger.addHandler(records)
+    try:
+        compiler = FryCompiler(logger)
+        results = [compiler.compile(file, True) for file in files]
+    finally:
+        logger.removeHandler(records)
+    outputs = {str(p.relative_to(root)): p.read_bytes() for p in sorted(root.rglob('*')) if p.is_file()}
+    for pytfile, _pyfile in compiler.pygenerator.replace_pairs:
+        outputs[pytfile.name] = pytfile.read_bytes()
+    state = (results, outputs, compiler.pygenerator.replace_pairs,
+             sorted(compiler.jsgenerator.dependencies), sorted(compiler.jsgenerator.file_dependencies))
+    return compiler, state, records.messages
+
+
+def test_restore_same_as_compile(tmp_path, setenv, app, monkeypatch):
+    setenv('FRYWEB_BUILD_CACHE', str(tmp_path / 'cache'))
+    _, cold, messages = build(tmp_path / 'build1', app, setenv)
+    assert not any('Restore from build cache' in m for m in messages)
+    assert cold[3]
+    assert any(name.endswith('.js') for name in cold[1])
+
+    # 命中缓存时不解析源文件
+    def parse(source):
+        raise AssertionError('parsed')
+    monkeypatch.setattr(fryweb.fry.generator, 'parse', parse)
+    _, warm, messages = build(tmp_path / 'build2', app, setenv)
+    assert sum('Restore from build cache' in m for m in messages) == len(app)
+    assert warm[:4] == cold[:4]
+
+
+def test_key_depends_on_config(tmp_path, setenv):
+    cache = BuildCache(tmp_path / 'cache', 0)
+    config = setenv('FRYWEB_BUILD_CACHE', str(tmp_path / 'cache'))
+    key = cache.key('0', Path('pkg/app'), 'app', config)
+    assert cache.key('0', Path('pkg/app'), 'app', config) == key
+    assert cache.key('1', Path('pkg/app'), 'app', config) != key
+    assert cache.key('0', Path('pkg/other'), 'app', config) != key
+    assert cache.key('0', Path('pkg/app'), 'app1', config) != key
+    hoisted = cache.key('0', Path('pkg/app'), 'app', setenv('FRYWEB_HOIST_STATIC', '1'))
+    setenv('FRYWEB_HOIST_STATIC', '0')
+    parsed = cache.key('0', Path('pkg/app'), 'app', setenv('FRYWEB_PARSER', 'parsimonious'))
+    assert len({key, hoisted, parsed}) == 3
+
+
+def test_config_change_misses(tmp_path, setenv, app):
+    setenv('FRYWEB_BUILD_CACHE', str(tmp_path / 'cache'))
+    build(tmp_path / 'build1', app, setenv)
+    setenv('FRYWEB_HOIST_STATIC', '1')
+    _, _, messages = build(tmp_path / 'build2', app, setenv)
+    assert not any('Restore from build cache' in m for m in messages)
+    _, _, messages = build(tmp_path / 'build3', app, setenv)
+    assert sum('Restore from build cache' in m for m in messages) == len(app)
+
+
+def test_incomplete_entry_recompiles(tmp_path, setenv, app):
+    setenv('FRYWEB_BUILD_CACHE', str(tmp_path / 'cache'))
+    _, cold, _ = build(tmp_path / 'build1', app, setenv)
+    # 模拟正被淘汰的缓存项：manifest还在，py文件已删除
+    for py in (tmp_path / 'cache').glob('[0-9a-f][0-9a-f]/*/py'):
+        py.unlink()
+    _, warm, messages = build(tmp_path / 'build2', app, setenv)
+    assert not any('Restore from build cache' in m for m in messages)
+    assert warm[:4] == cold[:4]
+
+
+def test_evict_least_recently_used(tmp_path):
+    cache = BuildCache(tmp_path / 'cache', 0)
+    source = tmp_path / 'out'
+    source.mkdir()
+    (source / 'a.pyt').write_text('x' * 100)
+    (source / 'a.attr').write_text('y' * 100)
+    keys = [f'{i:02x}' * 20 for i in range(4)]
+    now = time.time()
+    for i, key in enumerate(keys):
+        cache.put(key, source / 'a.pyt', [], source / 'a.attr', [])
+        manifest = cache.path(key) / cache.manifest_name
+        os.utime(manifest, (now - 100 + i, now - 100 + i))
+    size = sum(e[1] for e in cache.entries()) // len(keys)
+    # get会更新使用时间，keys[0]变成最近使用的
+    assert cache.get(keys[0]) is not None
+    # 写入中途失败留下的临时目录，超时后删除
+    stale = cache.tmp / 'stale'
+    stale.mkdir()
+    os.utime(stale, (now - cache.tmp_timeout - 1, now - cache.tmp_timeout - 1))
+    fresh = cache.tmp / 'fresh'
+    fresh.mkdir()
+
+    cache.maxsize = size * 2
+    assert cache.evict() == 2
+    assert [cache.get(key) is not None for key in keys] == [True, False, False, True]
+    assert not stale.exists() and fresh.exists()
+    cache.maxsize = size * 2
+    assert cache.evict() == 0
+    cache.maxsize = 0
+    assert cache.evict() == 2
+    assert list(cache.entries()) == []
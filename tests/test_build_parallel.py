@@ -0,0 +1,106 @@
+import logging
+import shutil
+from pathlib import Path
+
+import pytest
+
+from fryweb.fry.generator import FryCompiler, FryGenerator
+
+tests = Path(__file__).parent
+sources = [f for f in sorted(tests.glob('**/*.fry')) if f.parent.name != 'wrong']
+bad = tests / 'ref' / 'wrong' / 'dupref.fry'
+
+
+class Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def make_tree(root, files):
+    """
+    把fry文件复制为root/src/pkg下的包，每个文件一个子包，返回复制后的文件列表
+    """
+    pkg = root / 'src' / 'pkg'
+    pkg.mkdir(parents=True)
+    (pkg / '__init__.py').touch()
+    copies = []
+    for i, file in enumerate(files):
+        sub = pkg / f'm{i:02d}'
+        sub.mkdir()
+        (sub / '__init__.py').touch()
+        shutil.copy(file, sub / file.name)
+        copies.append(sub / file.name)
+    return copies
+
+
+def build(root, files, jobs, setenv):
+    setenv('FRYWEB_BUILD_ROOT', str(root / 'build'))
+    setenv('FRYWEB_STATIC_ROOT', str(root / 'static'))
+    files = make_tree(root, files)
+    logger = logging.getLogger(f'fryweb.test.{root.name}')
+    logger.setLevel(logging.INFO)
+    records = Records()
+    logger.addHandler(records)
+    compiler = FryCompiler(logger)
+    generator = FryGenerator(logger, files, clean=True, jobs=jobs)
+    try:
+        if jobs > 1:
+            results = generator.compile_parallel(compiler, files)
+        else:
+            results = [compiler.compile(file, True) for file in files]
+        error = None
+    except Exception as e:
+        results = None
+        error = f'{type(e).__name__}: {e}'.replace(str(root), '<root>')
+    finally:
+        logger.removeHandler(records)
+    # 日志中的时间每次不同，只比较编译了哪些文件
+    compiled = [m.replace(str(root), '<root>') for m in records.messages if m.startswith('Compile ')]
+    return root, compiler, results, error, compiled
+
+
+def outputs(root, compiler, results):
+    relative = lambda p: str(Path(p).relative_to(root))
+    files = {}
+    for path in sorted(root.rglob('*')):
+        if path.is_file() and path.suffix != '.fry':
+            files[relative(path)] = path.read_bytes()
+    return {
+        'results': [(h, relative(py)) for h, py in results],
+        'replace': [(relative(a), relative(b)) for a, b in compiler.pygenerator.replace_pairs],
+        'dependencies': sorted((relative(a), relative(b)) for a, b in compiler.jsgenerator.dependencies),
+        'files': files,
+    }
+
+
+def test_parallel_same_as_serial(tmp_path, setenv):
+    serial = build(tmp_path / 'serial', sources, 1, setenv)
+    parallel = build(tmp_path / 'parallel', sources, 4, setenv)
+    assert serial[3] is None and parallel[3] is None
+    expected = outputs(serial[0], serial[1], serial[2])
+    assert any(name.endswith('.pyt') for name in expected['files'])
+    assert any(name.endswith('.js') for name in expected['files'])
+    assert any(name.endswith('.attr') for name in expected['files'])
+    assert outputs(parallel[0], parallel[1], parallel[2]) == expected
+    # 日志按文件顺序输出
+    assert parallel[4][1:] == serial[4]
+
+
+def test_parallel_error_deterministic(tmp_path, setenv):
+    # 两个出错的文件，总是报告顺序上第一个
+    files = sources[:5] + [bad] + sources[5:12] + [bad] + sources[12:]
+    reports = [build(tmp_path / f'run{i}', files, jobs, setenv)[3:] for i, jobs in enumerate((1, 4, 4, 2))]
+    serial_error, serial_compiled = reports[0]
+    assert serial_error.startswith('VisitationError: BadGrammar: Ref name')
+    assert serial_compiled[-1] == 'Compile <root>/src/pkg/m05/dupref.fry ...'
+    parallel_error = reports[1][0]
+    # 并行编译的错误信息带上出错文件
+    assert parallel_error == f'RuntimeError: Compile <root>/src/pkg/m05/dupref.fry failed: {serial_error}'
+    for error, compiled in reports[1:]:
+        assert error == parallel_error
+        # 出错文件之后的文件不输出日志
+        assert compiled[1:] == serial_compiled
@@ -0,0 +1,73 @@
+import asyncio
+from wsgiref.util import setup_testing_defaults
+from wsgiref.validate import validator
+
+from fryweb import Element, html, html_bytes, render, render_bytes
+from fryweb.response import asgi_send, wsgi_response
+
+
+def Card(title):
+    return Element('div', {'call-client-script': ['app_Card', [('title', title)]], 'class': 'card', 'children': [
+        Element('h2', {'*': Element.ClientEmbed(0), 'children': [title]}),
+        Element('img', {'src': '/a.png', 'alt': 'ä'}),
+        Element('p', {'children': ['中文', ' & ', 3]}),
+    ]})
+
+
+def App():
+    return Element('main', {'children': [Element(Card, {'title': f'卡片 {i}'}) for i in range(20)]})
+
+
+def test_to_bytes_same_as_str():
+    element = render(App)
+    assert element.to_bytes() == str(element).encode()
+    assert render_bytes(App) == str(render(App)).encode()
+    assert isinstance(render_bytes(App), bytearray)
+
+
+def test_html_bytes_same_as_html():
+    assert html_bytes(App, title='títle') == html(App, title='títle').encode()
+
+
+def test_html_bytes_charset():
+    def Chinese():
+        return Element('p', {'title': '标题', 'children': ['中文内容']})
+    text = html(Chinese, title='中文', charset='gbk')
+    assert html_bytes(Chinese, title='中文', charset='gbk') == text.encode('gbk')
+
+
+def test_asgi_send():
+    body = html_bytes(App)
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_send(send, body, headers={'X-Test': '1'}, chunk_size=100))
+    start = messages[0]
+    assert start['status'] == 200
+    assert (b'content-length', str(len(body)).encode()) in start['headers']
+    assert (b'x-test', b'1') in start['headers']
+    chunks = messages[1:]
+    assert all(m['more_body'] for m in chunks[:-1])
+    assert 'more_body' not in chunks[-1]
+    assert b''.join(m['body'] for m in chunks) == bytes(body)
+
+
+def test_wsgi_response():
+    body = html_bytes(App)
+    statuses = []
+
+    def app(environ, start_response):
+        return wsgi_response(start_response, body, chunk_size=100)
+
+    environ = {}
+    setup_testing_defaults(environ)
+    result = validator(app)(environ, lambda status, headers, exc_info=None: statuses.append((status, headers)))
+    try:
+        content = b''.join(result)
+    finally:
+        result.close()
+    assert statuses[0][0] == '200 OK'
+    assert ('Content-Length', str(len(body))) in statuses[0][1]
+    assert content == bytes(body)
@@ -0,0 +1,36 @@
+from fryweb import Element, render
+
+
+source = '''\
+from fryweb import Element
+
+def Button(label, disabled):
+    <template>
+      <div flex w-full justify-center>
+        <button type="button" class="btn" px-5 text-sm hover:bg-emerald-600 disabled={disabled}>
+          {label}
+        </button>
+        <input type="text" name="q" mt-2 {**{'data-x': '1'}}>
+      </div>
+    </template>
+'''
+
+
+def test_literal_attrs_classified(compile_fry):
+    module = compile_fry(source)
+    # 属性都是字面值的元素在编译期完成分类
+    assert 'Element("div", {"children": ' in module.source
+    assert '"class": "flex w-full justify-center"}, classified=True)' in module.source
+    # 有展开属性的元素留到运行时分类
+    assert 'Element("input", {"type": "text", "name": "q", "mt-2": True, **(' in module.source
+    assert "**({'data-x': '1'})})]" in module.source
+
+
+def test_classified_same_html(compile_fry):
+    module = compile_fry(source)
+    expected = Element('div', {'flex': True, 'w-full': True, 'justify-center': True, 'children': [
+        Element('button', {'type': 'button', 'class': 'btn', 'px-5': True, 'text-sm': True,
+                           'hover:bg-emerald-600': True, 'disabled': False, 'children': ['ok']}),
+        Element('input', {'type': 'text', 'name': 'q', 'mt-2': True, 'data-x': '1'}),
+    ]})
+    assert str(render(module.Button, label='ok', disabled=False)) == str(render(expected))
@@ -0,0 +1,30 @@
+import pytest
+
+from fryweb.config import ConfigSnapshot, fryconfig
+
+
+def test_snapshot_read_only():
+    snapshot = fryconfig.snapshot()
+    with pytest.raises(AttributeError, match='read-only'):
+        snapshot.debug = True
+    with pytest.raises(AttributeError, match='read-only'):
+        del snapshot.js_url
+    assert not hasattr(snapshot, '__dict__')
+
+
+def test_snapshot_same_as_config():
+    snapshot = fryconfig.snapshot()
+    for name in ConfigSnapshot.names:
+        assert getattr(snapshot, name) == getattr(fryconfig, name)
+
+
+def test_snapshot_reload(setenv, monkeypatch):
+    snapshot = setenv('FRYWEB_COMPACT_PAYLOAD', 'yes')
+    assert snapshot.compact_payload is True
+    assert fryconfig.snapshot() is snapshot
+    # 环境变量改变后，reload之前快照不变
+    monkeypatch.setenv('FRYWEB_COMPACT_PAYLOAD', 'off')
+    assert fryconfig.snapshot() is snapshot
+    assert fryconfig.snapshot().compact_payload is True
+    assert fryconfig.reload().compact_payload is False
+    assert fryconfig.snapshot() is not snapshot
@@ -0,0 +1,60 @@
+import sys
+
+import pytest
+
+from fryweb import Element, render
+
+
+def deep(depth):
+    element = Element('span', {'children': ['leaf']})
+    for i in range(depth-1):
+        element = Element('div', {'class': f'level-{i}', 'children': [element]})
+    return element
+
+
+def Comment(depth):
+    # 嵌套评论：每层都是有js的组件
+    children = [Element(Comment, {'depth': depth-1})] if depth else []
+    return Element('div', {'call-client-script': ['app_Comment', [('depth', depth)]], 'children': [
+        Element('p', {'children': [f'comment {depth}']}),
+        children,
+    ]})
+
+
+@pytest.mark.parametrize('depth', [1000, 10000])
+def test_deep_html(depth):
+    assert depth > sys.getrecursionlimit() // 2
+    text = str(render(deep(depth)))
+    assert text.count('<div') == depth - 1
+    assert text.startswith(f'<div class="level-{depth-2}"><div class="level-{depth-3}">')
+    assert text.endswith('<span>leaf</span>' + '</div>' * (depth-1))
+
+
+@pytest.mark.parametrize('depth', [1000, 10000])
+def test_deep_components(depth):
+    element = render(Comment, depth=depth-1)
+    assert element.to_bytes().count(b'<p>') == depth
+    components = element.page.components
+    assert len(components) == depth
+    # 组件实例ID按先父后子的顺序分配
+    assert [components[cid]['args']['depth'] for cid in (1, 2, depth)] == [depth-1, depth-2, 0]
+    assert str(element).startswith(f'<div data-fryid="1"><p>comment {depth-1}</p><div data-fryid="2">')
+
+
+def test_wide():
+    element = render(Element('ul', {'children': [Element('li', {'children': [str(i)]}) for i in range(10000)]}))
+    assert str(element) == '<ul>' + ''.join(f'<li>{i}</li>' for i in range(10000)) + '</ul>'
+
+
+def test_attribute_order_around_children():
+    # children之后的属性在孩子渲染完成后处理，属性顺序与元素定义一致
+    def Child():
+        return Element('b', {'call-client-script': ['app_Child', []], 'children': ['child']})
+
+    def App():
+        return Element('div', {'call-client-script': ['app_App', []], 'id': 'a',
+                               'children': [Element(Child, {}), (Element('i', {'children': [x]}) for x in 'xy')],
+                               'title': 't', 'mt-2': True})
+    element = render(App)
+    assert str(element) == ('<div id="a" title="t" class="mt-2" data-fryid="1">'
+                            '<b data-fryid="2">child</b><i>x</i><i>y</i></div>')
@@ -0,0 +1,82 @@
+import json
+
+from fryweb import Element, FragmentCache, Stream, render
+
+
+def Leaf(i):
+    return Element('span', {'call-client-script': ['app_Leaf', [('i', i)]], '*': Element.ClientEmbed(1),
+                            'text-sm': True, 'children': [str(i)]})
+
+
+def Card(n):
+    return Element('div', {'call-client-script': ['app_Card', []], 'p-2': True, 'children': [
+        Element('h1', {'@click': Element.ClientEmbed(1), ':title': Element.ClientRef('title'), 'children': ['card']}),
+        [Element(Leaf, {'i': i, ':leaves': Element.ClientRef('leaves:a')}) for i in range(n)],
+        Element(Leaf, {'i': 99, 'frytemplate': True, ':tpl': Element.ClientRef('tpl')}),
+    ]})
+
+
+def Main(k):
+    # k个Leaf在Card之前，Card中的组件实例ID随k偏移
+    return Element('main', {'call-client-script': ['app_Main', []], 'children': [
+        [Element(Leaf, {'i': j}) for j in range(k)],
+        Element(Card, {'n': 2, ':card': Element.ClientRef('card'), '@hover': Element.ClientEmbed(2), 'class': 'extra'}),
+        Element(Card, {'n': 3}),
+        Element(Card, {'n': 2}),
+    ]})
+
+
+def output(k):
+    element = render(Main, k=k)
+    page = element.page
+    refs = {cid: {name: sorted(v) for name, v in refs.items()} for cid, refs in page.cid2childrefs.items()}
+    return str(element), json.dumps(page.components, sort_keys=True), json.dumps(refs, sort_keys=True)
+
+
+def test_cached_same_as_uncached(monkeypatch):
+    expected = [output(k) for k in (0, 1, 3)]
+    assert '<div class="p-2 extra" data-fryid="2"' in expected[0][0]
+    assert '<div class="p-2 extra" data-fryid="5"' in expected[2][0]
+    cache = FragmentCache()
+    monkeypatch.setattr(Card, 'fry_cache', cache, raising=False)
+    # 第一次填充缓存，之后在不同的组件实例ID偏移下重用
+    assert [output(k) for k in (0, 1, 3)] == expected
+    assert [output(k) for k in (3, 0, 1)] == [expected[2], expected[0], expected[1]]
+    stats = cache.stats()
+    assert stats['size'] == 3
+    assert stats['hits'] > 0
+
+
+def test_invalidate(monkeypatch):
+    cache = FragmentCache()
+    monkeypatch.setattr(Card, 'fry_cache', cache, raising=False)
+    output(0)
+    size = cache.stats()['size']
+    cache.invalidate(Card, n=3)
+    assert cache.stats()['size'] == size - 1
+    cache.invalidate(Card)
+    assert cache.stats()['size'] == 0
+
+
+def test_maxsize(monkeypatch):
+    cache = FragmentCache(maxsize=2)
+    monkeypatch.setattr(Leaf, 'fry_cache', cache, raising=False)
+    render(Element('div', {'children': [Element(Leaf, {'i': i}) for i in range(5)]}))
+    assert cache.stats()['size'] == 2
+
+
+def test_uncacheable(monkeypatch):
+    def Rows(n):
+        return Element('ul', {'children': [Stream(Element('li', {'children': [str(i)]}) for i in range(n))]})
+    cache = FragmentCache()
+    monkeypatch.setattr(Rows, 'fry_cache', cache, raising=False)
+    # 有流式孩子的渲染结果不缓存
+    assert str(render(Rows, n=2)) == '<ul><li>0</li><li>1</li></ul>'
+    assert str(render(Rows, n=2)) == '<ul><li>0</li><li>1</li></ul>'
+    assert cache.stats()['size'] == 0
+    # 参数中有不可hash的值时不使用缓存
+    def Tags(tags):
+        return Element('p', {'children': [' '.join(tags)]})
+    monkeypatch.setattr(Tags, 'fry_cache', cache, raising=False)
+    assert str(render(Tags, tags=['a', 'b'])) == '<p>a b</p>'
+    assert cache.stats()['size'] == 0
@@ -0,0 +1,38 @@
+from fryweb import render
+
+
+source = '''\
+from fryweb import Element
+
+def Card(title, items):
+    <template>
+      <div w-full text-sm>
+        <header class="card-header" role="banner">
+          <h2 font-bold>Static title</h2>
+          <p>static <b>text</b></p>
+        </header>
+        <h3>{title}</h3>
+        <ul>
+          {<li>{item}</li> for item in items}
+        </ul>
+        <footer><a href="/about">About</a></footer>
+      </div>
+    </template>
+'''
+
+
+def test_hoist_same_html(compile_fry, setenv):
+    plain = compile_fry(source)
+    setenv('FRYWEB_HOIST_STATIC', '1')
+    hoisted = compile_fry(source)
+    args = {'title': 'dynamic', 'items': ['a', 'b']}
+    assert str(render(hoisted.Card, **args)) == str(render(plain.Card, **args))
+    # 完全静态的子树编译为html字符串常量，动态部分仍生成Element
+    assert '<footer><a href=\\"/about\\">About</a></footer>' in hoisted.source
+    assert '<footer>' not in plain.source
+    assert 'Element("h3"' in hoisted.source
+
+
+def test_hoist_off_by_default(compile_fry):
+    module = compile_fry(source)
+    assert 'Element("footer"' in module.source
@@ -0,0 +1,49 @@
+from fryweb import Element, render
+
+
+def Plain(text):
+    return Element('p', {'children': [text]})
+
+
+def Counter(initial):
+    return Element('div', {'call-client-script': ['app_Counter', [('initial', initial)]], 'children': [
+        Element(Plain, {'text': str(initial)}),
+    ]})
+
+
+def test_jsless_component_no_cid():
+    element = render(Element('main', {'children': [Element(Plain, {'text': 'a'}), Element(Plain, {'text': 'b'})]}))
+    assert str(element) == '<main><p>a</p><p>b</p></main>'
+    assert element.page.components == {}
+    assert element.page.cid2childrefs == {}
+    assert not element.page.hasjs
+
+
+def test_js_components_in_document_order():
+    def App():
+        return Element('main', {'children': [
+            Element(Plain, {'text': 'x'}),
+            Element(Counter, {'initial': 1}),
+            Element(Plain, {'text': 'y'}),
+            Element(Counter, {'initial': 2}),
+        ]})
+    element = render(App)
+    assert str(element) == ('<main><p>x</p><div data-fryid="1"><p>1</p></div>'
+                            '<p>y</p><div data-fryid="2"><p>2</p></div></main>')
+    assert [c['args'] for c in element.page.components.values()] == [{'initial': 1}, {'initial': 2}]
+
+
+def test_referenced_jsless_component_has_cid():
+    # 被父组件引用或作为组件模板的组件仍然分配实例ID
+    def Parent():
+        return Element('div', {'call-client-script': ['app_Parent', []], 'children': [
+            Element(Plain, {'text': 'r', ':child': Element.ClientRef('child')}),
+            Element(Plain, {'text': 't', 'frytemplate': True}),
+            Element(Plain, {'text': 'n'}),
+        ]})
+    element = render(Parent)
+    page = element.page
+    assert len(page.components) == 3
+    assert page.child_refs(1) == {'child': 2}
+    assert '<p data-fryid="2">r</p>' in str(element)
+    assert '<p>n</p>' in str(element)
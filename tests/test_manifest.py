@@ -0,0 +1,159 @@
+import json
+import logging
+import os
+
+import pytest
+
+from fryweb.fry.generator import FryCompiler, FryGenerator
+from fryweb.fry.manifest import BuildManifest
+
+source = '''\
+from fryweb import Element
+
+def Card{n}(title):
+    <template>
+      <div mt-{n} class="card">{{title}}</div>
+    </template>
+'''
+
+
+@pytest.fixture
+def project(tmp_path, build_env):
+    """
+    三个没有js的fry文件，全量编译不需要esbuild打包
+    """
+    src = tmp_path / 'src'
+    src.mkdir()
+    files = []
+    for n in range(3):
+        file = src / f'card{n}.fry'
+        file.write_text(source.format(n=n), encoding='utf-8')
+        files.append(file)
+    return files
+
+
+@pytest.fixture
+def compiled(monkeypatch):
+    """
+    记录FryCompiler.compile编译的文件
+    """
+    files = []
+    compile = FryCompiler.compile
+
+    def spy(self, file, clean):
+        files.append(file.name)
+        return compile(self, file, clean)
+    monkeypatch.setattr(FryCompiler, 'compile', spy)
+    return files
+
+
+def build(files, clean):
+    FryGenerator(logging.getLogger('fryweb.test'), files, clean=clean).generate()
+
+
+def touch(file, delta=1):
+    st = os.stat(file)
+    os.utime(file, ns=(st.st_atime_ns, st.st_mtime_ns + delta * 1000000000))
+
+
+def test_noop_build_skips_by_stat(project, compiled, build_env):
+    build(project, True)
+    assert sorted(compiled) == ['card0.fry', 'card1.fry', 'card2.fry']
+    path = build_env.build_root / '.frybuild.json'
+    data = json.loads(path.read_text())
+    assert data['version'] == build_env.version
+    assert sorted(data['files']) == sorted(str(f) for f in project)
+
+    compiled.clear()
+    build(project, False)
+    assert compiled == []
+
+
+def test_changed_stat_checks_hash(project, compiled, build_env):
+    build(project, True)
+    pyfile = project[0].with_suffix('.py')
+    py = pyfile.read_bytes()
+
+    # 只改了mtime，比较hash后跳过，py文件不变，清单刷新后下次按文件信息跳过
+    compiled.clear()
+    touch(project[0])
+    build(project, False)
+    assert compiled == ['card0.fry']
+    assert pyfile.read_bytes() == py
+    compiled.clear()
+    build(project, False)
+    assert compiled == []
+
+    # 内容变化时重新编译
+    project[1].write_text(source.format(n=9), encoding='utf-8')
+    touch(project[1])
+    build(project, False)
+    assert compiled == ['card1.fry']
+    assert 'def Card9' in project[1].with_suffix('.py').read_text()
+
+
+@pytest.mark.parametrize('change', ['edit', 'delete'])
+def test_changed_py_rebuilds(project, compiled, change):
+    build(project, True)
+    pyfile = project[2].with_suffix('.py')
+    py = pyfile.read_bytes()
+    if change == 'edit':
+        # 第一行的hash也被改掉，不能再按py文件第一行跳过
+        pyfile.write_bytes(b'# edited\n' + py)
+    else:
+        pyfile.unlink()
+    compiled.clear()
+    build(project, False)
+    assert compiled == ['card2.fry']
+    assert pyfile.read_bytes() == py
+
+
+def test_version_and_corrupt_manifest(project, compiled, build_env):
+    build(project, True)
+    path = build_env.build_root / '.frybuild.json'
+    data = json.loads(path.read_text())
+
+    # fryweb版本变化后清单失效
+    path.write_text(json.dumps(dict(data, version='0.0.0')))
+    compiled.clear()
+    build(project, False)
+    assert sorted(compiled) == ['card0.fry', 'card1.fry', 'card2.fry']
+
+    path.write_text('{')
+    compiled.clear()
+    build(project, False)
+    assert sorted(compiled) == ['card0.fry', 'card1.fry', 'card2.fry']
+    compiled.clear()
+    build(project, False)
+    assert compiled == []
+
+
+def test_manifest(tmp_path):
+    file = tmp_path / 'a.fry'
+    file.write_text('a')
+    pyfile = tmp_path / 'a.py'
+    pyfile.write_text('py')
+    manifest = BuildManifest(tmp_path / 'build' / '.frybuild.json', '1.0')
+    st = manifest.stat(file)
+    assert manifest.stat(tmp_path / 'missing.fry') is None
+    assert not manifest.unchanged(file, st)
+    manifest.record(file, st, 'h', pyfile)
+    assert manifest.unchanged(file, st)
+    assert not manifest.unchanged(file, None)
+    assert manifest.hash(file) == 'h'
+    manifest.save()
+
+    loaded = BuildManifest(manifest.path, '1.0')
+    loaded.load()
+    assert loaded.files == manifest.files
+    other = BuildManifest(manifest.path, '2.0')
+    other.load()
+    assert other.files == {}
+
+    # 源文件大小变化
+    file.write_text('ab')
+    assert not manifest.unchanged(file, manifest.stat(file))
+    # 编译失败没有生成py文件时删除记录
+    pyfile.unlink()
+    manifest.record(file, st, 'h', pyfile)
+    assert manifest.hash(file) is None
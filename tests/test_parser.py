@@ -0,0 +1,92 @@
+import logging
+import shutil
+from pathlib import Path
+
+import pytest
+from parsimonious.exceptions import ParseError
+from parsimonious.nodes import NodeVisitor
+
+from fryweb.fry import parser as fryparser
+from fryweb.fry.grammar import grammar
+
+files = sorted(Path(__file__).parent.glob('**/*.fry'))
+ids = [str(f.relative_to(Path(__file__).parent)) for f in files]
+
+
+class Recorder(NodeVisitor):
+    """
+    按访问顺序记录visitor收到的节点：表达式、起止位置和孩子数量
+    """
+    def __init__(self):
+        self.events = []
+
+    def generic_visit(self, node, children):
+        self.events.append((node.expr, node.start, node.end, len(children)))
+
+
+def try_parse(fn, source):
+    try:
+        return fn(source), None
+    except ParseError as e:
+        return None, str(e)
+
+
+@pytest.mark.parametrize('file', files, ids=ids)
+def test_conformance(file):
+    source = file.read_text(encoding='utf-8')
+    expected, expected_error = try_parse(grammar.parse, source)
+    actual, actual_error = try_parse(fryparser.parser.parse, source)
+    assert actual_error == expected_error
+    if expected is None:
+        return
+    assert actual == expected
+    recorders = Recorder(), Recorder()
+    recorders[0].visit(expected)
+    recorders[1].visit(actual)
+    assert recorders[1].events == recorders[0].events
+
+
+def test_parser_switch(setenv, monkeypatch):
+    source = files[0].read_text(encoding='utf-8')
+    calls = []
+    original = fryparser.parser.parse
+    monkeypatch.setattr(fryparser.parser, 'parse', lambda text: calls.append(text) or original(text))
+    setenv('FRYWEB_PARSER', 'parsimonious')
+    assert fryparser.parse(source) == grammar.parse(source)
+    assert calls == []
+    setenv('FRYWEB_PARSER', 'fry')
+    fryparser.parse(source)
+    assert calls == [source]
+
+
+def compile_outputs(file, root):
+    from fryweb.fry.generator import FryCompiler
+    src = root / 'src'
+    src.mkdir(parents=True)
+    target = src / file.name
+    shutil.copy(file, target)
+    compiler = FryCompiler(logging.getLogger('fryweb.test'))
+    try:
+        compiler.compile(target, True)
+    except Exception as e:
+        # 手写解析器的正则节点是Node而不是RegexNode，错误信息中的节点类型不同
+        return f'{type(e).__name__}: {e}'.replace(str(root), '<root>').replace('<RegexNode ', '<Node ')
+    compiler.pygenerator.replace()
+    outputs = {}
+    for path in sorted(root.rglob('*')):
+        if path.is_file() and path != target:
+            outputs[str(path.relative_to(root))] = path.read_text(encoding='utf-8')
+    return outputs
+
+
+@pytest.mark.parametrize('file', files, ids=ids)
+def test_same_build_output(file, tmp_path, setenv):
+    # 两个解析器编译生成的py、js和attr文件相同
+    results = []
+    for name in ('parsimonious', 'fry'):
+        root = tmp_path / name
+        setenv('FRYWEB_BUILD_ROOT', str(root / 'build'))
+        setenv('FRYWEB_STATIC_ROOT', str(root / 'static'))
+        setenv('FRYWEB_PARSER', name)
+        results.append(compile_outputs(file, root))
+    assert results[1] == results[0]
@@ -0,0 +1,54 @@
+import json
+import re
+
+from fryweb import Element, html
+
+
+def Counter(initial, label):
+    return Element('div', {'call-client-script': ['app_Counter', [('initial', initial), ('label', label)]], 'children': [
+        Element('span', {'*': Element.ClientEmbed(0), 'children': [str(initial)]}),
+    ]})
+
+
+def Plain():
+    return Element('p', {'children': ['plain']})
+
+
+def App():
+    return Element('main', {'children': [
+        Element(Counter, {'initial': 1, 'label': '</script><b>'}),
+        Element(Plain, {}),
+        Element(Counter, {'initial': 2, 'label': 'x'}),
+    ]})
+
+
+def payload(text):
+    scripts = re.findall(r'<script type="application/json" data-frypayload>(.*?)</script>', text, re.S)
+    assert len(scripts) == 1
+    return json.loads(scripts[0])
+
+
+def test_compact_payload(setenv):
+    setenv('FRYWEB_COMPACT_PAYLOAD', 'true')
+    text = html(App)
+    assert 'text/x-frydata' not in text
+    data = payload(text)
+    assert sorted(data) == ['1', '2']
+    assert data['1'] == {'name': 'Counter', 'setup': 'app_Counter', 'refs': {}, 'args': {'initial': 1, 'label': '</script><b>'}}
+    assert data['2']['args'] == {'initial': 2, 'label': 'x'}
+    # json中的'</'被转义，不会提前结束脚本
+    assert '<\\/script><b>' in text
+
+
+def test_compact_payload_off(setenv):
+    setenv('FRYWEB_COMPACT_PAYLOAD', 'off')
+    text = html(App)
+    assert 'data-frypayload' not in text
+    assert text.count('<script type="text/x-frydata"') == 2
+
+
+def test_compact_payload_no_js(setenv):
+    setenv('FRYWEB_COMPACT_PAYLOAD', '1')
+    text = html(Plain)
+    assert 'data-frypayload' not in text
+    assert 'hydrate' not in text
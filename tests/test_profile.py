@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from fryweb import Element, Stream, ahtml, ahtml_stream, html, html_stream, profile, render
+
+
+def Leaf(i):
+    return Element('span', {'children': [str(i)]})
+
+
+def Card(n):
+    return Element('div', {'children': [Element(Leaf, {'i': i}) for i in range(n)]})
+
+
+def Broken():
+    raise ValueError('broken')
+
+
+def Outer(bad):
+    return Element('section', {'children': [
+        Element(Card, {'n': 2}),
+        Element('div', {'children': [Element(Broken if bad else Leaf, {} if bad else {'i': 0})]}),
+    ]})
+
+
+async def Slow(delay):
+    await asyncio.sleep(delay)
+    return Element('p', {'children': ['slow']})
+
+
+def stats(profiler):
+    return {s['name']: (s['calls'], s['elements']) for s in profiler.report()}
+
+
+def test_component_stats():
+    with profile() as profiler:
+        html(Card, {'n': 3})
+    assert stats(profiler) == {'Card': (1, 1), 'Leaf': (3, 3)}
+    assert set(profiler.phases) == {'render', 'serialize'}
+    assert profiler.stack == []
+
+
+def test_unwind_on_exception():
+    with profile() as profiler:
+        with pytest.raises(ValueError, match='broken'):
+            render(Outer, bad=True)
+        # 出错时栈中的组件计时都已结束，同一个profiler可以继续使用
+        assert profiler.stack == []
+        render(Outer, bad=False)
+        assert profiler.stack == []
+    # 出错的那次渲染没有完成的html元素
+    assert stats(profiler)['Outer'] == (2, 2)
+    assert stats(profiler)['Broken'] == (1, 0)
+
+
+def test_unwind_on_exception_in_children():
+    def Bad():
+        return Element('div', {'children': [Element(Leaf, {'i': 0}), Element(42, {})]})
+    with profile() as profiler:
+        with pytest.raises(Exception, match='invalid element name'):
+            render(Element('main', {'children': [Element(Card, {'n': 1}), Element(Bad, {})]}))
+    assert profiler.stack == []
+    assert stats(profiler)['Bad'] == (1, 0)
+
+
+def test_async_phases():
+    def App():
+        return Element('main', {'children': [Element(Slow, {'delay': 0.1}), Element(Card, {'n': 2})]})
+    with profile() as profiler:
+        text = asyncio.run(ahtml(App))
+    assert '<p>slow</p>' in text
+    assert set(profiler.phases) == {'resolve', 'render', 'serialize'}
+    assert profiler.phases['resolve'] >= 0.1
+    assert profiler.phases['render'] < 0.1
+
+
+def test_stream_serialize_excludes_consumer():
+    def App():
+        return Element('ul', {'children': [Stream(Element('li', {'children': [str(i)]}) for i in range(1000))]})
+    with profile() as profiler:
+        for chunk in html_stream(App, chunk_size=1024):
+            time.sleep(0.02)
+    assert 'serialize' in profiler.phases
+    assert profiler.phases['serialize'] < 0.02
+
+
+def test_async_stream_phases():
+    def App():
+        return Element('ul', {'children': [Stream(Element(Slow, {'delay': 0.05}) for i in range(2))]})
+
+    async def consume():
+        async for chunk in ahtml_stream(App):
+            await asyncio.sleep(0.05)
+    with profile() as profiler:
+        asyncio.run(consume())
+    assert profiler.phases['resolve'] >= 0.1
+    assert profiler.phases['serialize'] < 0.05
@@ -0,0 +1,87 @@
+import json
+import logging
+
+import pytest
+
+from fryweb import Element
+from fryweb.registry import ComponentRegistry
+
+
+def Card(title):
+    return Element('div', {'children': [title]})
+
+
+def Hidden():
+    return Element('p', {'children': ['hidden']})
+
+
+card = f'{__name__}.Card'
+hidden = f'{__name__}.Hidden'
+
+
+def test_register():
+    registry = ComponentRegistry()
+    registry.register(Card)
+    assert registry.remote(card) is Card
+    assert registry.remote(hidden) is None
+    assert registry.warmup() == [card]
+
+
+def test_unregistered_not_imported():
+    registry = ComponentRegistry()
+    assert registry.remote('subprocess.Popen') is None
+    assert registry.remote(hidden) is None
+    assert registry.remote(None) is None
+    # 服务端render()仍然可以按名字查找，但不因此允许远程渲染
+    assert registry.resolve(hidden) is Hidden
+    assert registry.remote(hidden) is None
+
+
+def test_register_module():
+    registry = ComponentRegistry()
+    registry.register_module(__name__)
+    assert registry.remote(hidden) is Hidden
+    # import进来的组件不算本模块的组件
+    assert registry.remote(f'{__name__}.Element') is None
+
+
+def test_allow():
+    registry = ComponentRegistry()
+    registry.register(Hidden)
+    registry.allow(card)
+    assert registry.remote(card) is Card
+    assert registry.remote(hidden) is None
+    assert registry.remote(f'{__name__}.Element') is None
+    assert registry.remote('subprocess.Popen') is None
+
+
+class TestViews:
+    @pytest.fixture
+    def client(self, monkeypatch):
+        pytest.importorskip('django')
+        from django.test import Client
+        from fryweb import views
+        registry = ComponentRegistry()
+        registry.register(Card)
+        monkeypatch.setattr(views, 'registry', registry)
+        return Client()
+
+    def get(self, client, name, args={}):
+        return client.get('/fryweb/component', {'name': name, 'args': json.dumps(args)})
+
+    def test_registered(self, client):
+        response = self.get(client, card, {'title': 't'})
+        assert response.status_code == 200
+        assert response.json()['dom'] == '<div>t</div>'
+
+    @pytest.mark.parametrize('name', [hidden, f'{__name__}.Element', 'subprocess.Popen'])
+    def test_unregistered(self, client, name, caplog):
+        with caplog.at_level(logging.WARNING, logger='fryweb.views'):
+            assert self.get(client, name).status_code == 404
+        assert f"Component '{name}' is not registered" in caplog.text
+
+    def test_no_log_without_debug(self, client, caplog):
+        from django.test import override_settings
+        with override_settings(DEBUG=False), caplog.at_level(logging.WARNING, logger='fryweb.views'):
+            assert self.get(client, hidden).status_code == 404
+        assert 'is not registered' not in caplog.text
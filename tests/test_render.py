@@ -0,0 +1,70 @@
+from fryweb import Element, render
+
+
+def Refed():
+    return Element('div', {'call-client-script': ['app_Refed', []], 'children': ['hello world']})
+
+
+def RefApp():
+    return Element('div', {'call-client-script': ['app_RefApp', [('n', 1)]], 'w-full': True, 'children': [
+        Element('p', {':foo': Element.ClientRef('foo'), 'children': ['Hello']}),
+        (Element('p', {':foobar': Element.ClientRef('foobar:a'), 'children': ['foobar']}) for i in range(2)),
+        Element(Refed, {':refed': Element.ClientRef('refed'), ':refeds': Element.ClientRef('refeds:a')}),
+        (Element(Refed, {':refeds': Element.ClientRef('refeds:a')}) for i in range(2)),
+    ]})
+
+
+def Card(children, title):
+    return Element('div', {'call-client-script': ['app_Card', []], 'class': 'card', 'children': [
+        Element('h2', {'children': [title]}),
+        children,
+    ]})
+
+
+def Outer():
+    return Element('section', {'call-client-script': ['app_Outer', []], 'children': [
+        Element(Card, {'title': 't', 'class': 'mt-2', '@click': Element.ClientEmbed(0), 'children': [
+            Element('span', {'*': Element.ClientEmbed(1), 'children': ['x']}),
+        ]}),
+    ]})
+
+
+def test_refs():
+    element = render(RefApp)
+    assert str(element) == (
+        '<div class="w-full" data-fryid="1">'
+        '<p data-fryref="foo-1">Hello</p>'
+        '<p data-fryref="foobar:a-1">foobar</p>'
+        '<p data-fryref="foobar:a-1">foobar</p>'
+        '<div data-fryid="2">hello world</div>'
+        '<div data-fryid="3">hello world</div>'
+        '<div data-fryid="4">hello world</div>'
+        '</div>')
+    components = element.page.components
+    assert components[1] == {'cid': 1, 'name': 'RefApp', 'setup': 'app_RefApp', 'args': {'n': 1},
+                             'refs': {'refed': 2, 'refeds': [2, 3, 4]}}
+    assert [components[cid]['name'] for cid in (2, 3, 4)] == ['Refed'] * 3
+
+
+def test_parent_embeds_and_class():
+    # 父组件传给子组件的事件处理函数、class和children中的js嵌入值都属于父组件
+    element = render(Outer)
+    assert str(element) == (
+        '<section data-fryid="1">'
+        '<div class="card mt-2" data-fryid="2" data-fryembed="1/0-event-click">'
+        '<h2>t</h2><span data-fryembed="1/1-text">x</span>'
+        '</div></section>')
+
+
+def test_nested_children_flattened():
+    def Plain():
+        return Element('div', {'children': [
+            Element('p', {'text-red-600': True, 'children': ['a', ['b', ('c', 'd')], (x for x in 'ef')]}),
+        ]})
+    element = render(Plain)
+    assert str(element) == '<div><p class="text-red-600">abcdef</p></div>'
+    assert element.page.components == {}
+
+
+def test_render_string_element():
+    assert str(render('p', children=['text'])) == '<p>text</p>'
@@ -0,0 +1,49 @@
+import asyncio
+
+from fryweb import Element, render, arender, html
+from fryweb.element import BaseElement, RenderedElement
+
+
+def Card(title):
+    return Element('div', {'call-client-script': ['app_Card', [('title', title)]], 'children': [
+        Element('h2', {'children': [title]}),
+    ]})
+
+
+def test_rendered_is_not_element():
+    element = render(Card, title='t')
+    assert isinstance(element, BaseElement)
+    assert isinstance(element, RenderedElement)
+    assert not isinstance(element, Element)
+    assert element.rendered
+    assert not hasattr(element, '__dict__')
+
+
+def test_rendered_child_kept():
+    # 已渲染的元素作为孩子或属性值时原样保留
+    rendered = render(Element('b', {'children': ['x']}))
+    element = render(Element('p', {'title': 't', 'children': [rendered, [rendered]]}))
+    assert element.props['children'][0] is rendered
+    assert str(element) == '<p title="t"><b>x</b><b>x</b></p>'
+
+
+def test_rendered_as_component_arg():
+    rendered = render(Element('i', {'children': ['y']}))
+
+    def Box(content):
+        return Element('div', {'children': [content]})
+    assert str(render(Box, content=rendered)) == '<div><i>y</i></div>'
+
+
+def test_render_rendered():
+    element = render(Card, title='t')
+    assert render(element) is element
+    assert asyncio.run(arender(element)) is element
+    assert html(element) == html(Element(Card, {'title': 't'}))
+
+
+def test_old_rendered_element():
+    # 原来的Element(name, props, True)仍然可以序列化
+    element = Element('p', {'class': 'a', 'children': ['x', Element('b', {'children': ['y']}, True)]}, True)
+    assert str(element) == '<p class="a">x<b>y</b></p>'
+    assert element.to_bytes() == b'<p class="a">x<b>y</b></p>'
@@ -0,0 +1,87 @@
+import json
+import time
+
+import pytest
+
+pytest.importorskip('django')
+
+from django.test import Client
+from django.urls import reverse
+
+from fryweb import Element, ResponseCache, views
+from fryweb.registry import ComponentRegistry
+
+cache = ResponseCache()
+calls = []
+
+
+@cache.cached(max_age=30, ttl=60)
+def Weather(city):
+    calls.append(city)
+    return Element('p', {'children': [city]})
+
+
+@cache.cached(max_age=10, ttl=0, public=False)
+def Profile(user):
+    calls.append(user)
+    return Element('p', {'children': [user]})
+
+
+@pytest.fixture
+def client(monkeypatch):
+    registry = ComponentRegistry()
+    registry.register(Weather)
+    registry.register(Profile)
+    monkeypatch.setattr(views, 'registry', registry)
+    cache.invalidate()
+    calls.clear()
+    return Client()
+
+
+def get(client, name, args, **headers):
+    return client.get(reverse('fryweb:component'), {'name': f'{__name__}.{name}', 'args': json.dumps(args)}, **headers)
+
+
+def test_etag_and_not_modified(client):
+    response = get(client, 'Weather', {'city': 'bj'})
+    assert response.status_code == 200
+    etag = response['ETag']
+    assert etag.startswith('"') and etag.endswith('"')
+    assert response['Cache-Control'] == 'public, max-age=30'
+    assert response.json()['dom'] == '<p>bj</p>'
+    # 服务端缓存命中，组件不再执行
+    response = get(client, 'Weather', {'city': 'bj'}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+    assert response.content == b''
+    assert calls == ['bj']
+    assert get(client, 'Weather', {'city': 'bj'}, HTTP_IF_NONE_MATCH='"other"').status_code == 200
+    assert get(client, 'Weather', {'city': 'bj'}, HTTP_IF_NONE_MATCH='*').status_code == 304
+    assert get(client, 'Weather', {'city': 'sh'})['ETag'] != etag
+
+
+def test_ttl(client, monkeypatch):
+    get(client, 'Weather', {'city': 'bj'})
+    get(client, 'Weather', {'city': 'bj'})
+    assert calls == ['bj']
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 61)
+    get(client, 'Weather', {'city': 'bj'})
+    assert calls == ['bj', 'bj']
+
+
+def test_private_no_server_cache(client):
+    etag = get(client, 'Profile', {'user': 'u'})['ETag']
+    response = get(client, 'Profile', {'user': 'u'}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response['Cache-Control'] == 'private, max-age=10'
+    # ttl为0时每次都重新渲染，只做ETag比较
+    assert calls == ['u', 'u']
+    assert cache.stats()['size'] == 0
+
+
+def test_post_not_cached(client):
+    response = client.post(reverse('fryweb:component'), {'name': f'{__name__}.Weather', 'args': json.dumps({'city': 'bj'})})
+    assert response.status_code == 200
+    assert not response.has_header('ETag')
+    assert not response.has_header('Cache-Control')
@@ -0,0 +1,37 @@
+from fryweb import Element, PageShell, html, page_shell
+
+
+def App():
+    return Element('main', {'children': ['hello']})
+
+
+def test_shell_cached():
+    assert page_shell() is page_shell()
+    assert page_shell(lang='zh') is page_shell(lang='zh')
+    assert page_shell(lang='zh') is not page_shell()
+    assert page_shell(metas={'author': 'a'}) is page_shell(metas={'author': 'a'})
+
+
+def test_shell_unhashable():
+    # 参数中有不可hash的值时每次生成新的页面外壳
+    shell = page_shell(metas={'keywords': ['a', 'b']})
+    assert isinstance(shell, PageShell)
+    assert shell is not page_shell(metas={'keywords': ['a', 'b']})
+
+
+def test_shell_reload(setenv):
+    shell = page_shell()
+    setenv('FRYWEB_CSS_URL', 'css/other.css')
+    other = page_shell()
+    assert other is not shell
+    assert 'css/other.css' in other.head()
+
+
+def test_shell_html():
+    text = html(App, title='Title', lang='zh', metas={'author': 'a'})
+    assert text == page_shell(lang='zh', metas={'author': 'a'}).html(App, title='Title')
+    assert text.startswith('<!DOCTYPE html>\n<html lang=zh>')
+    assert '<title>Title</title>' in text
+    assert '<meta name="author" content="a">' in text
+    assert '<body><main>hello</main>' in text
+    assert PageShell.title_mark not in text
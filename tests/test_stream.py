@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from fryweb import Element, html, html_stream
+from fryweb.response import starlette_stream, django_stream
+
+
+def Item(index):
+    return Element('li', {'children': [f'item {index}']})
+
+
+def List(count=100):
+    return Element('ul', {'children': [Element(Item, {'index': i}) for i in range(count)]})
+
+
+async def Slow(text):
+    await asyncio.sleep(0.01)
+    return Element('p', {'children': [text]})
+
+
+def test_stream_same_as_html():
+    expected = html(List, {'count': 100}, title='list')
+    chunks = list(html_stream(List, {'count': 100}, title='list', chunk_size=256))
+    assert len(chunks) > 2
+    assert ''.join(chunks) == expected
+
+
+def test_stream_head_before_render():
+    rendered = []
+
+    def App():
+        rendered.append(True)
+        return Element('div', {'children': ['app']})
+
+    stream = html_stream(App, title='head')
+    head = next(stream)
+    assert '<title>head</title>' in head
+    assert not rendered
+    assert 'app' in ''.join(stream)
+    assert rendered
+
+
+def test_starlette_stream_async_component():
+    pytest.importorskip('httpx')
+    from starlette.applications import Starlette
+    from starlette.routing import Route
+    from starlette.testclient import TestClient
+
+    async def index(request):
+        return starlette_stream(Slow, {'text': 'slow'}, title='async')
+
+    client = TestClient(Starlette(routes=[Route('/', index)]))
+    response = client.get('/')
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'text/html; charset=utf-8'
+    assert '<p>slow</p>' in response.text
+    assert '<title>async</title>' in response.text
+
+
+def test_django_stream():
+    pytest.importorskip('django')
+    response = django_stream(List, {'count': 10}, title='list')
+    assert response.streaming
+    assert response['Content-Type'] == 'text/html; charset=utf-8'
+    body = b''.join(response.streaming_content).decode()
+    assert body == html(List, {'count': 10}, title='list')
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import re
+
+from fryweb import Element, Suspense, ahtml_stream, html, html_stream
+
+
+def Leaf(i):
+    return Element('span', {'call-client-script': ['app_Leaf', [('i', i)]], 'children': [str(i)]})
+
+
+def Plain(text):
+    return Element('p', {'children': [text]})
+
+
+async def Slow(delay, label):
+    await asyncio.sleep(delay)
+    return Element('p', {'call-client-script': ['app_Slow', [('label', label)]], 'children': [
+        label, Element(Leaf, {'i': label}),
+    ]})
+
+
+def App():
+    return Element('main', {'children': [
+        Element(Leaf, {'i': 1}),
+        Suspense(Element(Leaf, {'i': 'deferred'}), fallback=Element('i', {'children': ['loading']})),
+        Element(Leaf, {'i': 2}),
+    ]})
+
+
+def swaps(text):
+    return [(int(sid), json.loads(data)) for sid, data in re.findall(r'\$frySwap\((\d+), (\{.*?\})\)</script>', text)]
+
+
+def test_without_defer_same_as_content():
+    text = html(App, autoreload=False)
+    assert 'frysuspense' not in text
+    assert '<span data-fryid="2">deferred</span>' in text
+
+
+def test_hydrate_before_deferred():
+    text = ''.join(html_stream(App, autoreload=False))
+    main = text[text.index('<main'):text.index('</main>')]
+    assert main == ('<main><span data-fryid="1">1</span><div data-frysuspense="1"><i>loading</i></div>'
+                    '<span data-fryid="2">2</span>')
+    hydrate = text.index('<script type="module" async>')
+    # 页面的组件信息脚本和水合脚本在延迟内容之前输出
+    assert text.index('data-fryid="2" data-fryname="Leaf"') < hydrate < text.index('<template data-frydeferred="1">')
+    # 延迟内容中的组件不在页面的组件信息中，随替换脚本输出
+    assert 'data-fryid="3" data-fryname' not in text
+    assert swaps(text) == [(1, {'3': {'name': 'Leaf', 'setup': 'app_Leaf', 'refs': {}, 'args': {'i': 'deferred'}}})]
+    assert '<template data-frydeferred="1"><span data-fryid="3">deferred</span></template>' in text
+
+
+def test_hydrate_after_first_deferred_js():
+    # 页面其余部分没有js时，水合脚本在第一段有js的延迟内容之后输出
+    def Page():
+        return Element('main', {'children': [
+            Element(Plain, {'text': 'a'}),
+            Suspense(Element(Plain, {'text': 'b'})),
+            Suspense(Element(Leaf, {'i': 'c'})),
+            Suspense(Element(Leaf, {'i': 'd'})),
+        ]})
+    text = ''.join(html_stream(Page, autoreload=False))
+    assert text.count('<script type="module" async>') == 1
+    assert text.index('$frySwap(2, ') < text.index('<script type="module" async>') < text.index('<template data-frydeferred="3">')
+    assert swaps(text) == [
+        (1, {}),
+        (2, {'1': {'name': 'Leaf', 'setup': 'app_Leaf', 'refs': {}, 'args': {'i': 'c'}}}),
+        (3, {'2': {'name': 'Leaf', 'setup': 'app_Leaf', 'refs': {}, 'args': {'i': 'd'}}}),
+    ]
+
+
+def test_no_js_no_hydrate():
+    def Page():
+        return Element('main', {'children': [Suspense(Element(Plain, {'text': 'x'}))]})
+    text = ''.join(html_stream(Page, autoreload=False))
+    assert 'type="module"' not in text
+    assert swaps(text) == [(1, {})]
+
+
+def test_async_deferred_order():
+    # 先完成的延迟内容先输出，每段延迟内容只带有自己的组件
+    def Page():
+        return Element('main', {'children': [
+            Element(Leaf, {'i': 0}),
+            Suspense(Element(Slow, {'delay': 0.2, 'label': 'A'}), fallback='...'),
+            Suspense(Element(Slow, {'delay': 0.05, 'label': 'B'}), fallback='...'),
+        ]})
+
+    async def collect():
+        return ''.join([chunk async for chunk in ahtml_stream(Page, autoreload=False)])
+    text = asyncio.run(collect())
+    assert text.index('<script type="module" async>') < text.index('<template')
+    result = swaps(text)
+    assert [sid for sid, _ in result] == [2, 1]
+    assert [[c['args'] for c in data.values()] for _, data in result] == [
+        [{'label': 'B'}, {'i': 'B'}],
+        [{'label': 'A'}, {'i': 'A'}],
+    ]
+    # 组件实例ID在整个页面中不重复
+    assert sorted(cid for _, data in result for cid in data) == ['2', '3', '4', '5']
+
+
+def test_payload_escaped():
+    def Page():
+        return Element('main', {'children': [Suspense(Element(Leaf, {'i': '</script><b>'}))]})
+    text = ''.join(html_stream(Page, autoreload=False))
+    assert '<\\/script><b>' in text
+    assert swaps(text)[0][1]['1']['args'] == {'i': '</script><b>'}
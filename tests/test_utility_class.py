@@ -0,0 +1,28 @@
+import pytest
+
+from fryweb import Element, render
+from fryweb.css.style import CSS, utility_class, class_cache_stats, clear_class_cache
+
+
+@pytest.mark.parametrize('key, value', [
+    ('text-red-600', ''),
+    ('hover:bg-emerald-600', ''),
+    ('mt', '4'),
+    ('w', '1/2'),
+    ('md:p', '2'),
+])
+def test_same_as_css(key, value):
+    assert utility_class(key, value) == CSS(key, value).to_class()
+
+
+def test_cache_hits():
+    clear_class_cache()
+    for _ in range(3):
+        element = render(Element('p', {'text-sm': True, 'mt': '2 4', 'children': ['x']}))
+    assert str(element) == f'<p class="{utility_class("text-sm", "")} {utility_class("mt", "2")} {utility_class("mt", "4")}">x</p>'
+    stats = class_cache_stats()
+    assert stats['misses'] == 3
+    assert stats['hits'] >= 6
+    assert stats['size'] == 3
+    clear_class_cache()
+    assert class_cache_stats()['size'] == 0
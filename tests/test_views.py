@@ -0,0 +1,118 @@
+import json
+
+import pytest
+
+django = pytest.importorskip('django')
+
+from django.test import Client
+from django.urls import reverse
+
+from fryweb import Element, views
+from fryweb.registry import ComponentRegistry
+
+
+def Card(title='card'):
+    return Element('div', {'call-client-script': ['app_Card', [('title', title)]], 'children': [
+        Element('h2', {'children': [title]}),
+    ]})
+
+
+def Note(text):
+    return Element('p', {'children': [text]})
+
+
+card = f'{__name__}.Card'
+note = f'{__name__}.Note'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    registry = ComponentRegistry()
+    registry.register(Card)
+    registry.register(Note)
+    monkeypatch.setattr(views, 'registry', registry)
+    return Client()
+
+
+def post_batch(client, data):
+    return client.post(reverse('fryweb:components'), json.dumps(data), content_type='application/json')
+
+
+def test_urls():
+    assert reverse('fryweb:component') == '/fryweb/component'
+    assert reverse('fryweb:components') == '/fryweb/components'
+
+
+def test_component_get(client):
+    response = client.get(reverse('fryweb:component'), {'name': card, 'args': json.dumps({'title': 'hi'})})
+    assert response.status_code == 200
+    data = response.json()
+    assert data['dom'] == '<div data-fryid="1"><h2>hi</h2></div>'
+    assert data['components']['1']['args'] == {'title': 'hi'}
+
+
+def test_component_post(client):
+    response = client.post(reverse('fryweb:component'), {'name': note, 'args': json.dumps({'text': 'x'})})
+    assert response.status_code == 200
+    assert response.json() == {'code': 0, 'dom': '<p>x</p>', 'components': {}}
+
+
+def test_component_invalid_args(client):
+    for args in ('[1]', 'null', '{bad'):
+        response = client.get(reverse('fryweb:component'), {'name': card, 'args': args})
+        assert response.status_code == 400
+    # 没有args时组件参数为空
+    assert client.get(reverse('fryweb:component'), {'name': card}).status_code == 200
+
+
+def test_component_unknown(client):
+    response = client.get(reverse('fryweb:component'), {'name': 'os.System', 'args': '{}'})
+    assert response.status_code == 404
+
+
+def test_batch(client):
+    response = post_batch(client, {'components': [
+        {'name': card, 'args': {'title': 'a'}},
+        {'name': note, 'args': {'text': 'n'}},
+        {'name': card},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    # 同一批次中的组件实例ID互不重复
+    assert data['doms'] == ['<div data-fryid="1"><h2>a</h2></div>', '<p>n</p>',
+                            '<div data-fryid="2"><h2>card</h2></div>']
+    assert sorted(data['components']) == ['1', '2']
+
+
+def test_batch_form(client):
+    data = json.dumps([{'name': note, 'args': {'text': 'f'}}])
+    response = client.post(reverse('fryweb:components'), {'components': data})
+    assert response.json()['doms'] == ['<p>f</p>']
+
+
+@pytest.mark.parametrize('args', [[1, 2], 'abc', 3])
+def test_batch_non_dict_args(client, args):
+    response = post_batch(client, {'components': [{'name': card, 'args': args}]})
+    assert response.status_code == 400
+    assert b'should be an object' in response.content
+
+
+def test_batch_invalid(client):
+    assert post_batch(client, {'items': []}).status_code == 400
+    assert post_batch(client, [{'args': {}}]).status_code == 400
+    assert client.post(reverse('fryweb:components'), '{bad', content_type='application/json').status_code == 400
+    assert client.get(reverse('fryweb:components')).status_code == 404
+
+
+def test_batch_unknown(client):
+    response = post_batch(client, [{'name': card}, {'name': 'os.System'}])
+    assert response.status_code == 400
+    assert response.content == b'Unknown component: os.System'
+
+
+def test_batch_too_many(client):
+    items = [{'name': note, 'args': {'text': str(i)}} for i in range(views.MAX_BATCH_SIZE)]
+    assert post_batch(client, items).status_code == 200
+    response = post_batch(client, items + [{'name': note, 'args': {'text': 'x'}}])
+    assert response.status_code == 400
+    assert b'Too many components' in response.content
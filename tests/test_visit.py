@@ -0,0 +1,93 @@
+import logging
+from pathlib import Path
+
+import pytest
+from parsimonious import NodeVisitor
+from parsimonious.exceptions import VisitationError
+
+from fryweb.fry.base import MultiVisitor
+from fryweb.fry.generator import FryCompiler, PyGenerator
+from fryweb.fry.parser import parse
+from fryweb.js.generator import JsGenerator
+from fryweb.css.generator import CssGenerator
+
+tests = Path(__file__).parent
+sources = [f for f in sorted(tests.glob('**/*.fry')) if f.parent.name != 'wrong']
+logger = logging.getLogger('fryweb.test')
+
+
+def prepare(root, setenv, file):
+    setenv('FRYWEB_BUILD_ROOT', str(root / 'build'))
+    src = root / 'src'
+    src.mkdir(parents=True)
+    copy = src / file.name
+    copy.write_bytes(file.read_bytes())
+    return src, copy
+
+
+def written(root):
+    return {str(p.relative_to(root)): p.read_text() for p in sorted(root.rglob('*'))
+            if p.is_file() and p.suffix != '.fry'}
+
+
+@pytest.mark.parametrize('file', sources, ids=lambda f: str(f.relative_to(tests)))
+def test_multi_visitor_same_as_separate(tmp_path, setenv, file):
+    # 分别调用三个生成器的原有入口
+    src, copy = prepare(tmp_path / 'separate', setenv, file)
+    tree = parse(copy.read_text())
+    PyGenerator(logger).generate(tree, '0', Path('.'), copy.with_suffix('.py'))
+    js = JsGenerator(logger)
+    js.generate(tree, '0', src, copy)
+    CssGenerator(logger).collect(tree, '0', tmp_path / 'separate' / 'build' / f'{copy.stem}.attr')
+    separate = written(tmp_path / 'separate')
+
+    # FryCompiler用MultiVisitor一次遍历
+    src, copy = prepare(tmp_path / 'combined', setenv, file)
+    compiler = FryCompiler(logger)
+    curr_hash, pyfile = compiler.compile(copy, True)
+    combined = {k: v.replace(curr_hash, '0') for k, v in written(tmp_path / 'combined').items()}
+    assert combined == separate
+    assert compiler.jsgenerator.file_dependencies == js.file_dependencies
+
+
+class Recorder(NodeVisitor):
+    def __init__(self, fail=None):
+        self.fail = fail
+
+    def generic_visit(self, node, children):
+        if node.expr_name == self.fail:
+            raise ValueError(self.fail)
+        return (node.expr_name, children)
+
+
+def test_multi_visitor_results():
+    tree = parse(sources[0].read_text())
+    first, second = Recorder(), Recorder()
+    assert MultiVisitor([first, second]).visit(tree) == [first.visit(tree), second.visit(tree)]
+
+
+def test_multi_visitor_errors():
+    tree = parse(sources[0].read_text())
+    # 与NodeVisitor.visit一样把异常包装为VisitationError
+    with pytest.raises(VisitationError) as single:
+        Recorder('fry_script').visit(tree)
+    with pytest.raises(VisitationError) as multi:
+        MultiVisitor([Recorder(), Recorder('fry_script')]).visit(tree)
+    assert str(multi.value) == str(single.value)
+
+    # unwrapped_exceptions中的异常原样抛出
+    class Unwrapped(Recorder):
+        unwrapped_exceptions = (ValueError,)
+    with pytest.raises(ValueError):
+        MultiVisitor([Recorder(), Unwrapped('fry_script')]).visit(tree)
+
+    # 出错的fry文件，错误信息与单独遍历相同
+    tree = parse((tests / 'ref' / 'wrong' / 'dupref.fry').read_text())
+    generator = PyGenerator(logger)
+    generator.prepare('0', Path('.'), Path('dupref.py'))
+    with pytest.raises(VisitationError) as single:
+        generator.visit(tree)
+    generator.prepare('0', Path('.'), Path('dupref.py'))
+    with pytest.raises(VisitationError) as multi:
+        MultiVisitor([generator, Recorder()]).visit(tree)
+    assert str(multi.value) == str(single.value)